@@ -1,45 +1,107 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-import json
+import logging
 import os
+from functools import lru_cache
+from evaluator import metrics
+from evaluator.analyzers import ANALYZER_ENV, create_analyzer
+from evaluator.job_catalog import get_job_catalog
+from evaluator.scorer import SamhallScorer
+from evaluator.feedback import (
+    RADAR_CATEGORIES, STRENGTH_MESSAGES, get_strength_feedback, radar_values, to_display_scores,
+)
+from svg_charts import bar_chart_svg, radar_chart_svg
+
+# pandas / plotly / numpy は初回表示を速くするため、実際に使う時点で読み込む
+FIGURE_CACHE_SIZE = 64
+JOB_DB_PATH = 'data/job_database.json'
+logger = logging.getLogger(__name__)
+
+# 処理段階ごとの計測（OLYS_METRICS_PORT があれば /metrics を公開、OLYS_METRICS_FILE があれば評価ごとに書き出す）
+metrics.start_from_env()
 
 # ==========================================
 # 1. 強み分析・称号生成ロジック
 # ==========================================
-def get_strength_feedback(scores):
-    labels = {"reading": "読み取る力", "writing": "人との関わり", "calculation": "計算をたしかめる", "communication": "相談する力"}
-    if not scores: return "期待のプロフェッショナル", ["分析中"] * 3
-    sorted_s = sorted(scores.items(), key=lambda x: x[1], reverse=True)
-    top_key = sorted_s[0][0]
-    
-    titles = {
-        "calculation": "正確な仕事で信頼を築く実務の星",
-        "communication": "周囲と協力して進める相談の達人",
-        "writing": "相手の気持ちに寄り添う表現者",
-        "reading": "大切な情報を的確に捉える理解のリーダー"
-    }
-    return titles.get(top_key, "期待のプロフェッショナル"), [labels.get(k, k) for k, v in sorted_s[:3]]
-
-def create_radar_chart(scores):
-    categories = ["読み取る力", "人との関わり", "計算をたしかめる", "相談する力"]
-    values = [max(0.1, scores.get(k, 0.1)) for k in ["reading", "writing", "calculation", "communication"]]
+# 称号・3つの強み・レーダーチャートの軸は評価レポートと共通（evaluator.feedback）
+RESPONSE_KEYS = ('r_t_val', 'w_t_val', 'c_t_val', 'm_t_val')
+
+def load_text_analyzer():
+    # 環境変数 OLYS_ANALYZER で分析器を選べる（local なら API を使わない簡易推定）
+    if os.getenv(ANALYZER_ENV):
+        return create_analyzer()
+    # APIキーが設定されていない（secrets.toml がない）場合はデモ用のスコアを使う
+    try:
+        if "OPENAI_API_KEY" not in st.secrets:
+            return None
+    except Exception:
+        return None
+    return create_analyzer('streamlit')
+
+def analyze_progressively(analyzer, responses):
+    """
+    ストリーミングで分析し、スコアが届くたびにチャートと称号を更新する。
+    AIの結果が届くまでは、回答から推定した簡易スコア（analyzer.fallback）を先に表示する。
+    """
+    progress = st.progress(0.0, text="あなたの「強み」を分析中...")
+    live_title = st.empty()
+    live_chart = st.empty()
+    preview_analyzer = getattr(analyzer, 'fallback', None)
+    preview = preview_analyzer.analyze(responses) if preview_analyzer is not None else {}
+
+    def show(scores, note=""):
+        live_title.markdown(f"#### ✨ {get_strength_feedback(scores)[0]} ✨{note}")
+        # 途中経過は頻繁に書き換えるため、軽量な静的SVGで描く
+        live_chart.markdown(create_radar_chart(scores, render="svg"), unsafe_allow_html=True)
+
+    def on_score(skill, value, partial):
+        progress.progress(len(partial) / len(analyzer.skills), text=f"あなたの「強み」を分析中...（{len(partial)}/{len(analyzer.skills)}）")
+        show(to_display_scores({**preview, **partial}))
+
+    if preview:
+        show(to_display_scores(preview), note="（簡易推定）")
+    fallbacks = getattr(analyzer, 'fallbacks', 0)
+    try:
+        scores = to_display_scores(analyzer.analyze(responses, stream=True, on_score=on_score))
+    finally:
+        progress.empty()
+        live_title.empty()
+        live_chart.empty()
+    if getattr(analyzer, 'fallbacks', 0) > fallbacks:
+        st.warning("AI分析の結果を受け取れなかった項目は、回答から簡易的に推定したスコアで補っています。")
+    return scores
+
+@metrics.span('radar_chart')
+def create_radar_chart(scores, render="plotly"):
+    values = radar_values(scores)
+    if render == "svg":
+        return radar_chart_svg(RADAR_CATEGORIES, values)
+    return _radar_figure(values)
+
+# 再実行のたびに同じ図を作り直さないよう、スコアの組をキーにキャッシュする（Figure は変更しないこと）
+@lru_cache(maxsize=FIGURE_CACHE_SIZE)
+def _radar_figure(values):
+    import plotly.graph_objects as go
     fig = go.Figure()
-    fig.add_trace(go.Scatterpolar(r=values, theta=categories, fill='toself', fillcolor='rgba(30, 144, 255, 0.4)', line_color='#1E90FF'))
+    fig.add_trace(go.Scatterpolar(r=list(values), theta=list(RADAR_CATEGORIES), fill='toself', fillcolor='rgba(30, 144, 255, 0.4)', line_color='#1E90FF'))
     fig.update_layout(polar=dict(radialaxis=dict(visible=True, range=[0, 2])), showlegend=False, height=400)
     return fig
 
-def calculate_match_rate(user_scores, job_required_scores):
-    mapping = {"読解力": "reading", "文書作成力": "writing", "計算力": "calculation", "コミュニケーション力": "communication"}
-    match_sum, count = 0, 0
-    for jp_key, en_key in mapping.items():
-        if jp_key in job_required_scores:
-            req = job_required_scores[jp_key]
-            user = user_scores.get(en_key, 0)
-            match_sum += min(1.2, user / req if req > 0 else 1.0)
-            count += 1
-    return round((match_sum / count) * 100, 1) if count > 0 else 0
+@metrics.span('bar_chart')
+def create_match_bar_chart(matches, top_n=10, render="plotly"):
+    names = tuple(m['job']['name'] for m in matches[:top_n])
+    rates = tuple(m['match_rate'] for m in matches[:top_n])
+    if render == "svg":
+        return bar_chart_svg(names, rates)
+    return _match_bar_figure(names, rates)
+
+@lru_cache(maxsize=FIGURE_CACHE_SIZE)
+def _match_bar_figure(names, rates):
+    import pandas as pd
+    import plotly.express as px
+    df = pd.DataFrame({'職種': list(names), '適合度': list(rates)})
+    fig = px.bar(df, x='適合度', y='職種', orientation='h', color='適合度', color_continuous_scale='YlGnBu')
+    fig.update_layout(xaxis_range=[0, 110], yaxis={'categoryorder':'total ascending'})
+    return fig
 
 # ==========================================
 # 2. 初期設定 & セッション管理
@@ -74,6 +136,8 @@ with st.sidebar:
     st.header("🏃 身体・環境条件")
     st.selectbox("歩く・移動", ["制限なし", "長距離は困難", "車椅子利用"])
     st.multiselect("にがてな環境", ["騒音", "人混み", "高い場所", "外（暑さ・寒さ）"])
+    st.divider()
+    light_charts = st.toggle("軽量表示（静的なグラフ）", value=False, help="通信量と処理を減らすため、グラフを静的な画像で表示します。")
 
 # ==========================================
 # 4. ワーク・シミュレーション
@@ -102,23 +166,36 @@ if st.button("🚀 AI診断を開始（あなたの強みを発見する）", ty
     if not st.session_state['name']:
         st.error("プロフィール欄に「氏名」を入力してください。")
     else:
-        with st.spinner("あなたの「強み」を分析中..."):
+        # OLYS_PROFILE_DIR があれば、遅かった評価の cProfile の結果を保存する
+        with st.spinner("あなたの「強み」を分析中..."), metrics.profiled('evaluate'), metrics.span('evaluate'):
             try:
-                # 診断ロジック（デモ用）
-                st.session_state['scores'] = {"reading": 1.2, "writing": 1.1, "calculation": 1.5, "communication": 1.3}
+                with metrics.span('analyze'):
+                    analyzer = load_text_analyzer()
+                    if analyzer is not None:
+                        st.session_state['scores'] = analyze_progressively(analyzer, {k: st.session_state[k] for k in RESPONSE_KEYS})
+                    else:
+                        # 診断ロジック（デモ用）
+                        st.session_state['scores'] = {"reading": 1.2, "writing": 1.1, "calculation": 1.5, "communication": 1.3}
                 
-                db_path = 'data/job_database.json'
+                db_path = JOB_DB_PATH
                 if os.path.exists(db_path):
-                    with open(db_path, 'r', encoding='utf-8') as f:
-                        db_data = json.load(f)
-                        jobs = db_data.get('jobs', [])
-                        results = [{"job": j, "match_rate": calculate_match_rate(st.session_state['scores'], j.get('required_scores', {}))} for j in jobs]
-                        st.session_state['job_matches'] = sorted(results, key=lambda x: x['match_rate'], reverse=True)
-                        st.session_state['evaluated'] = True
+                    # 全セッション共有のカタログ（ファイル更新時のみ読み直し）
+                    from evaluator.skill_kernel import RATIO
+                    with metrics.span('job_catalog'):
+                        catalog = get_job_catalog(db_path)
+                    # 画面に出す上位10件だけを、要求値に対する比率の方式で検索インデックスから求める
+                    # （セッションには職種の位置とマッチ率だけを保存し、職種データは共有カタログを参照する）
+                    st.session_state['job_matches'] = SamhallScorer.match_jobs_top(st.session_state['scores'], catalog, 10, mode=RATIO, compact=True)
+                    st.session_state['evaluated'] = True
                 else:
                     st.error("job_database.json が見つかりません。")
             except Exception as e:
                 st.error(f"エラーが発生しました: {e}")
+        try:
+            metrics.write_from_env()
+        except OSError:
+            # メトリクスを書き出せなくても評価結果の表示は続ける
+            logger.exception("メトリクスをファイルに書き出せませんでした")
 
 # ==========================================
 # 6. 結果表示（すべての仕様を反映）
@@ -139,23 +216,34 @@ if st.session_state['evaluated']:
     with col1:
         st.subheader("📊 強みチャート")
         
-        st.plotly_chart(create_radar_chart(st.session_state['scores']), use_container_width=True)
+        if light_charts:
+            st.markdown(create_radar_chart(st.session_state['scores'], render="svg"), unsafe_allow_html=True)
+        else:
+            st.plotly_chart(create_radar_chart(st.session_state['scores']), use_container_width=True)
 
     with col2:
         st.subheader("💡 引き出された3つの強み")
-        st.info(f"**1. {top_3[0]}**\n現場で最も頼りにされるあなたの核となる力です。")
-        st.info(f"**2. {top_3[1]}**\n周囲との円滑な関係や、丁寧な仕事につながる力です。")
-        st.info(f"**3. {top_3[2]}**\nこれからの成長を支える、素晴らしいポテンシャルです。")
+        for i, message in enumerate(STRENGTH_MESSAGES):
+            st.info(f"**{i + 1}. {top_3[i]}**\n{message}")
 
     st.divider()
     st.subheader("🎯 力を発揮しやすいお仕事（24職種から選定）")
     matches = st.session_state['job_matches']
     if matches:
-        df = pd.DataFrame([{'職種': m['job']['name'], '適合度': m['match_rate']} for m in matches[:10]])
-        if not df.empty:
-            fig = px.bar(df, x='適合度', y='職種', orientation='h', color='適合度', color_continuous_scale='YlGnBu')
-            fig.update_layout(xaxis_range=[0, 110], yaxis={'categoryorder':'total ascending'})
-            st.plotly_chart(fig, use_container_width=True)
+        if light_charts:
+            st.markdown(create_match_bar_chart(matches, render="svg"), unsafe_allow_html=True)
+        else:
+            st.plotly_chart(create_match_bar_chart(matches), use_container_width=True)
     
     best_job = matches[0]['job']
     st.success(f"**{st.session_state['name']}さんへのアドバイス**\n\n最も適性が高いのは **{best_job['name']}** です。\n{best_job['support']}などのサポートを受けながら、あなたの「{top_3[0]}」を存分に活かしてください。")
+
+# ==========================================
+# 7. セッションのメモリ使用量（SESSION_MEMORY_REPORT=1 のときだけ表示）
+# ==========================================
+if os.getenv('SESSION_MEMORY_REPORT'):
+    from utils.memory import session_memory
+    shared = [get_job_catalog(JOB_DB_PATH)] if os.path.exists(JOB_DB_PATH) else []
+    report = session_memory(st.session_state, shared)
+    with st.sidebar.expander(f"🧮 セッションのメモリ: {report['total']:,} バイト"):
+        st.json(report['keys'])
@@ -0,0 +1,100 @@
+"""
+JobIndex（上位k件検索）と全件走査のレイテンシを、カタログ規模ごとに比較します。
+
+    python benchmarks/bench_job_index.py
+    python benchmarks/bench_job_index.py --mode ratio --skills 4 --sizes 1000 10000 50000 --queries 200
+
+既定では PENALTY（4スキル）と、app.py の画面表示と同じ RATIO（15スキル）の両方を測ります。
+default 列は、JobIndex の既定の分岐点（default_scan_below）で query が木と全件走査の
+どちらを使うかです。
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from evaluator.job_index import JobIndex, default_scan_below  # noqa: E402
+from evaluator.skill_kernel import PENALTY, RATIO  # noqa: E402
+
+# 既定で測る (方式, スキル数) の組
+DEFAULT_CASES = ((PENALTY, 4), (RATIO, 15))
+
+
+def synthetic_catalog(n_jobs, n_skills, mode, rng):
+    """job_database.json に近い分布（要求値 0.8〜1.5、0.1刻み）の要求値行列を作ります。"""
+    reqs = np.round(rng.uniform(0.8, 1.5, (n_jobs, n_skills)), 1)
+    if mode == PENALTY:
+        mask = np.ones(reqs.shape, dtype=bool)
+    else:
+        # 各職種は一部のスキルだけを要求する（最低1つ）
+        mask = rng.random(reqs.shape) < 0.5
+        mask[np.arange(n_jobs), rng.integers(0, n_skills, n_jobs)] = True
+    return reqs, mask
+
+
+def percentile_ms(samples, q):
+    return float(np.percentile(samples, q)) * 1000
+
+
+def run(mode, sizes, n_skills, queries, k, seed):
+    rng = np.random.default_rng(seed)
+    scan_below = default_scan_below(mode, n_skills)
+    print(f"mode={mode} skills={n_skills} k={k} queries={queries}")
+    print(f"{'jobs':>8} {'build(s)':>9} {'index p50':>10} {'index p99':>10} "
+          f"{'scan p50':>9} {'scan p99':>9} {'scored':>8} {'speedup':>8} {'default':>8}")
+    for n_jobs in sizes:
+        reqs, mask = synthetic_catalog(n_jobs, n_skills, mode, rng)
+        started = time.perf_counter()
+        index = JobIndex(reqs, mask, mode=mode, scan_below=0)
+        build = time.perf_counter() - started
+
+        users = np.round(rng.uniform(0.6, 1.6, (queries, n_skills)), 1)
+        index_times, scan_times, scored = [], [], []
+        for user in users:
+            started = time.perf_counter()
+            top, n_scored = index.query(user, k)
+            index_times.append(time.perf_counter() - started)
+            scored.append(n_scored)
+
+            started = time.perf_counter()
+            # 全件を NumPy で一括スコアリングし argpartition で上位k件を取る経路と比較する
+            expected = index.scan(user, k)
+            scan_times.append(time.perf_counter() - started)
+
+            if top != expected:
+                raise AssertionError(f"index result differs from full scan (jobs={n_jobs})")
+
+        speedup = np.median(scan_times) / np.median(index_times)
+        print(f"{n_jobs:>8} {build:>9.2f} {percentile_ms(index_times, 50):>8.2f}ms "
+              f"{percentile_ms(index_times, 99):>8.2f}ms {percentile_ms(scan_times, 50):>7.2f}ms "
+              f"{percentile_ms(scan_times, 99):>7.2f}ms {np.mean(scored):>8.0f} {speedup:>7.1f}x "
+              f"{'scan' if n_jobs < scan_below else 'index':>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='JobIndex と全件走査のレイテンシ比較')
+    parser.add_argument('--mode', choices=[PENALTY, RATIO],
+                        help='省略すると既定の組（penalty/4スキル と ratio/15スキル）を測る')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000, 50000])
+    parser.add_argument('--skills', type=int)
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('-k', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    if args.mode is None and args.skills is None:
+        cases = DEFAULT_CASES
+    else:
+        mode = args.mode or PENALTY
+        cases = ((mode, args.skills or dict(DEFAULT_CASES)[mode]),)
+    for i, (mode, n_skills) in enumerate(cases):
+        if i:
+            print()
+        run(mode, args.sizes, n_skills, args.queries, args.k, args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,374 @@
+"""
+採点・職種マッチングの主要経路のベンチマーク（オフライン、LLM はスタブ）。
+
+    python benchmarks/bench_matching.py                       # 既定のスケール掃引
+    python benchmarks/bench_matching.py --preset quick -o before.json
+    python benchmarks/bench_matching.py --preset quick -o after.json --baseline before.json
+    python benchmarks/bench_matching.py --candidates 1000 --jobs 24 50000 --skills 4 15
+
+合成データ（候補者 1〜100k、職種 24〜50k、スキル 4〜15）を乱数シードから決定的に生成し、
+ケースごとにスループット（ops/s）、1呼び出しあたりの p50 / p99 レイテンシ、
+ピークメモリ（tracemalloc）を計測します。呼び出しが 20 回未満の行はパーセンタイルを
+出さず（表では -）、比較にはスループットだけを使います。結果は JSON に保存でき、
+--baseline に以前の結果を渡すと同じ条件の行どうしを比較します。
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from evaluator.bulk import evaluate_batch  # noqa: E402
+from evaluator.feedback import get_strength_feedback  # noqa: E402
+from evaluator.job_catalog import JobCatalog  # noqa: E402
+from evaluator.local_analyzer import LocalAnalyzer  # noqa: E402
+from evaluator.scorer import SamhallScorer  # noqa: E402
+from evaluator.skill_kernel import RATIO  # noqa: E402
+from evaluator.skills import ENGLISH_ALIASES, SKILLS  # noqa: E402
+from tools.stub_openai_server import stub_scores  # noqa: E402
+
+# 画面で英語キーを使う4スキル（残りは TextAnalyzer と同じ日本語名のまま）
+ENGLISH_KEYS = {name: alias for alias, name in ENGLISH_ALIASES.items()}
+
+# 英語キーを持つ4スキルを先頭に並べ、--skills の数だけ先頭から使う
+SKILL_ORDER = tuple(ENGLISH_KEYS) + tuple(s for s in SKILLS if s not in ENGLISH_KEYS)
+
+CATEGORIES = ('cleaning', 'logistics', 'manufacturing', 'facility', 'retail', 'care', 'office')
+ENVIRONMENTS = ('なし', '騒音', '人混み', '高い場所', '外（暑さ・寒さ）')
+
+PRESETS = {
+    # 動作確認用の小さな掃引
+    'quick': [(100, 24, 4), (100, 1000, 4), (100, 24, 15)],
+    # 候補者数・職種数・スキル数をそれぞれ1軸ずつ伸ばす
+    'default': [(1, 24, 4), (100, 24, 4), (10000, 24, 4), (100000, 24, 4),
+                (100, 1000, 4), (100, 10000, 4), (100, 50000, 4),
+                (1000, 24, 15), (100, 10000, 15)],
+}
+
+# これより呼び出しが少ない行では、p50 / p99 を出さない（標本が少なく当てにならないため）
+MIN_PERCENTILE_CALLS = 20
+
+
+# --- 合成データ ---
+
+def synthetic_jobs(n_jobs, n_skills, rng):
+    """job_database.json と同じ形式の職種（要求スキル 3〜6 個、0.8〜1.5 の 0.1 刻み）を作ります。"""
+    skills = SKILL_ORDER[:n_skills]
+    jobs = []
+    for i in range(n_jobs):
+        n_req = int(rng.integers(min(3, n_skills), min(6, n_skills) + 1))
+        picked = rng.choice(n_skills, size=n_req, replace=False)
+        job = {
+            'id': i + 1,
+            'name': f"職種{i + 1}",
+            'category': CATEGORIES[i % len(CATEGORIES)],
+            'description': "合成データ",
+            'salary': "時給1,000〜1,200円",
+            'required_scores': {skills[j]: round(float(rng.uniform(0.8, 1.5)), 1) for j in picked},
+            'support': "作業手順書、定期フォロー",
+        }
+        if rng.random() < 0.2:
+            job['physical_level'] = 'heavy'
+        if rng.random() < 0.3:
+            job['environment'] = ENVIRONMENTS[int(rng.integers(1, len(ENVIRONMENTS)))]
+        jobs.append(job)
+    return jobs
+
+
+def synthetic_candidates(n_candidates, n_skills, rng):
+    """診断スコア（0.5〜2.0）と回答テキストを持つ候補者を作ります。"""
+    keys = [ENGLISH_KEYS.get(s, s) for s in SKILL_ORDER[:n_skills]]
+    values = np.round(rng.uniform(0.5, 2.0, (n_candidates, n_skills)), 2).tolist()
+    candidates = []
+    for i, row in enumerate(values):
+        skill_scores = dict(zip(keys, row))
+        scores = dict(skill_scores)
+        if i % 5 == 0:
+            scores['physical_info'] = '重いものは不可'
+        if i % 7 == 0:
+            scores['environment_info'] = '騒音、人混み'
+        candidates.append({
+            'id': i,
+            'scores': scores,
+            'skill_scores': skill_scores,
+            'responses': {'r_t_val': f"回答{i}", 'w_t_val': "人と関わる仕事",
+                          'c_t_val': "1200×6×20=144000", 'm_t_val': "すみません、壊してしまいました"},
+        })
+    return candidates
+
+
+class StubAnalyzer:
+    """LLM の代わりに、回答テキストから決定的なスコアを返す analyze_many の実装。"""
+
+    def analyze_many(self, text_responses_list, with_fallback=False):
+        results = [stub_scores(json.dumps(r, ensure_ascii=False, sort_keys=True))
+                   for r in text_responses_list]
+        return [(scores, False) for scores in results] if with_fallback else results
+
+
+# --- 計測ケース ---
+# 各ケースは (関数, 引数, op 数) のリストを返す。
+# レイテンシは1呼び出しごと、スループットは op（候補者・読み込み回数）/ 秒で報告する。
+
+def case_match_jobs_ratio(data):
+    # 比率方式で全職種を採点して降順に並べる
+    catalog = data['catalog']
+    return [(lambda s: SamhallScorer.match_jobs(s, catalog, mode=RATIO), c['scores'], 1)
+            for c in data['candidates']]
+
+
+def case_match_jobs_top_ratio(data):
+    # 画面（app.py）と同じ経路: 比率方式の上位10件を MatchList で受け取る
+    catalog = data['catalog']
+    return [(lambda s: SamhallScorer.match_jobs_top(s, catalog, 10, mode=RATIO, compact=True),
+             c['scores'], 1)
+            for c in data['candidates']]
+
+
+def case_match_jobs(data):
+    catalog = data['catalog']
+    return [(lambda s: SamhallScorer.match_jobs(s, catalog), c['scores'], 1)
+            for c in data['candidates']]
+
+
+def case_match_jobs_batch(data, batch_size=256):
+    catalog = data['catalog']
+    scores = [c['scores'] for c in data['candidates']]
+    batches = [scores[i:i + batch_size] for i in range(0, len(scores), batch_size)]
+    return [(lambda b: SamhallScorer.match_jobs_batch(b, catalog, top_k=10), b, len(b))
+            for b in batches]
+
+
+def case_get_strength_feedback(data):
+    # 画面と同じく、スキルのスコアだけを渡す
+    return [(get_strength_feedback, c['skill_scores'], 1) for c in data['candidates']]
+
+
+def case_load_job_database(data):
+    path = data['db_path']
+
+    def call(_):
+        return JobCatalog.load(path)
+    return [(call, None, 1)] * data['load_repeats']
+
+
+def case_pipeline(data, batch_size=32):
+    # 回答 → （スタブ）分析 → 最終スコア → 上位10件の照合。evaluator.bulk と同じ経路
+    analyzer, catalog = StubAnalyzer(), data['catalog']
+    candidates = data['candidates']
+    batches = [candidates[i:i + batch_size] for i in range(0, len(candidates), batch_size)]
+    return [(lambda b: evaluate_batch(analyzer, catalog, b, 10), b, len(b)) for b in batches]
+
+
+def case_local_analyzer(data):
+    # API を使わないローカルの推定（簡易推定・API 障害時の代わりのスコア）
+    analyzer = LocalAnalyzer()
+    return [(analyzer.analyze, c['responses'], 1) for c in data['candidates']]
+
+
+CASES = {
+    'match_jobs_ratio': case_match_jobs_ratio,
+    'match_jobs_top_ratio': case_match_jobs_top_ratio,
+    'match_jobs': case_match_jobs,
+    'match_jobs_batch': case_match_jobs_batch,
+    'get_strength_feedback': case_get_strength_feedback,
+    'load_job_database': case_load_job_database,
+    'pipeline': case_pipeline,
+    'local_analyzer': case_local_analyzer,
+}
+
+# 候補者数に依存しないケース（職種数・スキル数ごとに1回だけ計測する）
+CANDIDATE_INDEPENDENT = ('load_job_database',)
+
+
+def measure(calls, max_seconds, memory_calls, warmup_calls=3):
+    """呼び出しを順に実行して時間を計り、続けて先頭の一部を tracemalloc 下で再実行します。"""
+    # 初回呼び出し時の遅延（import・キャッシュ作成）を除くため、先頭を一度空回しする
+    for fn, arg, _ in calls[:warmup_calls]:
+        fn(arg)
+
+    latencies, ops = [], 0
+    started = time.perf_counter()
+    for fn, arg, n in calls:
+        t0 = time.perf_counter()
+        fn(arg)
+        latencies.append(time.perf_counter() - t0)
+        ops += n
+        if time.perf_counter() - started > max_seconds:
+            break
+    elapsed = time.perf_counter() - started
+
+    # tracemalloc は実行を遅くするため、時間計測とは別に行う
+    tracemalloc.start()
+    try:
+        for fn, arg, _ in calls[:memory_calls]:
+            fn(arg)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    samples = np.array(latencies) * 1000
+    enough = len(samples) >= MIN_PERCENTILE_CALLS
+    return {
+        'calls': len(latencies),
+        'ops': ops,
+        'truncated': len(latencies) < len(calls),
+        'seconds': round(elapsed, 4),
+        'throughput': round(ops / elapsed, 2) if elapsed > 0 else None,
+        'p50_ms': round(float(np.percentile(samples, 50)), 4) if enough else None,
+        'p99_ms': round(float(np.percentile(samples, 99)), 4) if enough else None,
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def run(scenarios, cases, seed=0, max_seconds=10.0, memory_calls=20, load_repeats=5):
+    results = []
+    measured_once = set()
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_candidates, n_jobs, n_skills in scenarios:
+            # シナリオごとに同じシードから生成するため、実行のたびに同じデータになる
+            rng = np.random.default_rng(seed)
+            jobs = synthetic_jobs(n_jobs, n_skills, rng)
+            db_path = os.path.join(tmp, f"jobs_{n_jobs}_{n_skills}.json")
+            with open(db_path, 'w', encoding='utf-8') as f:
+                json.dump({'job_categories': {c: c for c in CATEGORIES}, 'jobs': jobs},
+                          f, ensure_ascii=False)
+            data = {
+                'jobs': jobs,
+                'catalog': JobCatalog.load(db_path),
+                'db_path': db_path,
+                'candidates': synthetic_candidates(n_candidates, n_skills, rng),
+                'load_repeats': load_repeats,
+            }
+            for name in cases:
+                if name in CANDIDATE_INDEPENDENT:
+                    if (name, n_jobs, n_skills) in measured_once:
+                        continue
+                    measured_once.add((name, n_jobs, n_skills))
+                calls = CASES[name](data)
+                row = {'case': name, 'candidates': n_candidates, 'jobs': n_jobs, 'skills': n_skills}
+                if name in CANDIDATE_INDEPENDENT:
+                    row['candidates'] = None
+                row.update(measure(calls, max_seconds, memory_calls))
+                results.append(row)
+                print_row(row)
+    return results
+
+
+def result_key(row):
+    return (row['case'], row['candidates'], row['jobs'], row['skills'])
+
+
+def print_header():
+    print(f"{'case':<22} {'cand':>7} {'jobs':>6} {'sk':>3} {'ops/s':>12} "
+          f"{'p50(ms)':>9} {'p99(ms)':>9} {'peak(KiB)':>10}")
+
+
+def _ms(value):
+    return '-' if value is None else f"{value:.3f}"
+
+
+def print_row(row):
+    cand = '-' if row['candidates'] is None else row['candidates']
+    mark = '*' if row['truncated'] else ''
+    print(f"{row['case']:<22} {cand:>7} {row['jobs']:>6} {row['skills']:>3} "
+          f"{row['throughput']:>12,.1f} {_ms(row['p50_ms']):>9} {_ms(row['p99_ms']):>9} "
+          f"{row['peak_kib']:>10.1f}{mark}")
+
+
+def compare(results, baseline, threshold):
+    """
+    同じ条件の行どうしで p50 とスループットを比較し、
+    threshold（割合）以上遅くなった行の数を返します。
+    どちらかの p50 がない（呼び出しが少ない）行は、スループットだけで判定します。
+    """
+    previous = {result_key(r): r for r in baseline.get('results', [])}
+    regressions = 0
+    print(f"\n{'case':<22} {'cand':>7} {'jobs':>6} {'sk':>3} {'p50 ratio':>10} {'ops/s ratio':>12}")
+    for row in results:
+        old = previous.get(result_key(row))
+        if old is None or not old.get('throughput') or not row['throughput']:
+            continue
+        p50_ratio = row['p50_ms'] / old['p50_ms'] if row['p50_ms'] and old.get('p50_ms') else None
+        tp_ratio = row['throughput'] / old['throughput']
+        slower = tp_ratio < 1 / (1 + threshold) and (p50_ratio is None or p50_ratio > 1 + threshold)
+        regressions += slower
+        cand = '-' if row['candidates'] is None else row['candidates']
+        p50_text = '-' if p50_ratio is None else f"{p50_ratio:.2f}x"
+        print(f"{row['case']:<22} {cand:>7} {row['jobs']:>6} {row['skills']:>3} "
+              f"{p50_text:>10} {tp_ratio:>11.2f}x{'  REGRESSION' if slower else ''}")
+    return regressions
+
+
+def environment_info():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='採点・マッチング経路のベンチマーク')
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='default')
+    parser.add_argument('--candidates', type=int, nargs='+',
+                        help='指定すると --jobs / --skills との全組み合わせで計測（プリセットより優先）')
+    parser.add_argument('--jobs', type=int, nargs='+', default=[24])
+    parser.add_argument('--skills', type=int, nargs='+', default=[4])
+    parser.add_argument('--cases', nargs='+', choices=list(CASES), default=list(CASES))
+    parser.add_argument('--max-seconds', type=float, default=10.0,
+                        help='1ケースあたりの計測時間の上限（超えた行は * 付きで途中までの値）')
+    parser.add_argument('--memory-calls', type=int, default=20,
+                        help='ピークメモリ計測で実行する呼び出し数')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', help='結果を保存する JSON ファイル')
+    parser.add_argument('--baseline', help='比較対象の結果 JSON')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='回帰とみなす悪化の割合（既定 0.10 = 10%%）')
+    args = parser.parse_args()
+
+    if args.candidates:
+        scenarios = [(c, j, s) for c in args.candidates for j in args.jobs for s in args.skills]
+    else:
+        scenarios = PRESETS[args.preset]
+    for _, _, n_skills in scenarios:
+        if not 1 <= n_skills <= len(SKILL_ORDER):
+            parser.error(f"--skills must be between 1 and {len(SKILL_ORDER)}")
+
+    print_header()
+    results = run(scenarios, args.cases, seed=args.seed, max_seconds=args.max_seconds,
+                  memory_calls=args.memory_calls)
+    report = {'environment': environment_info(), 'seed': args.seed,
+              'scenarios': [list(s) for s in scenarios], 'results': results}
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nsaved {len(results)} results to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
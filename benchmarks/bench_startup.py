@@ -0,0 +1,139 @@
+"""
+起動時に読み込むモジュールの import 時間を計測します（python -X importtime を利用）。
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --budget 300 --repeat 5
+
+計測するのは app.py がトップレベルで import するこのリポジトリのモジュールです
+（app.py から毎回読み取るため、app.py の import を変えても一覧を直す必要はありません）。
+毎回新しいプロセスで計測するため、キャッシュの影響を受けない「コールドスタート」の値です。
+起動時に pandas / plotly / openai / numpy が読み込まれていれば、重いモジュールとして報告します
+（これらは図の作成や照合・AI分析の時点で読み込まれるべきものです）。
+合計が --budget（既定 100ms）を超えた場合は終了コード 1 を返すため、CI での回帰検知にも使えます。
+"""
+import argparse
+import ast
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, 'app.py')
+
+# 合計の上限（ms）の既定値。現状は 20ms 前後で、numpy など重いパッケージを
+# 起動時に読み込むようになると大きく超える
+DEFAULT_BUDGET_MS = 100.0
+
+# 起動時に読み込まれてはいけない重いパッケージ
+HEAVY_PACKAGES = ('numpy', 'pandas', 'plotly', 'openai')
+
+# Streamlit 自体は app.py の実行に必須なので、別枠で計測する
+FRAMEWORK_PACKAGES = ('streamlit',)
+
+
+def _is_local(module):
+    path = os.path.join(ROOT, *module.split('.'))
+    return os.path.isdir(path) or os.path.isfile(path + '.py')
+
+
+def startup_modules(app_path=APP_PATH):
+    """
+    app.py の起動時（ボタンを押す前）に読み込まれる、このリポジトリのモジュールを返します。
+    関数の中の import（使う時点で読み込むもの）は含めません。
+    """
+    with open(app_path, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=app_path)
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            # from evaluator import metrics は evaluator.metrics を読み込む
+            names = [f"{node.module}.{alias.name}" if _is_local(f"{node.module}.{alias.name}")
+                     else node.module for alias in node.names]
+        else:
+            continue
+        modules.extend(n for n in names if _is_local(n) and n not in modules)
+    return modules
+
+
+def import_times(modules):
+    """
+    新しいインタプリタで modules を import し、-X importtime の出力を
+    {モジュール名: (self_us, cumulative_us)} にして返します。
+    """
+    code = 'import ' + ', '.join(modules)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    times = {}
+    for line in result.stderr.splitlines():
+        # 形式: "import time:   self [us] |  cumulative | imported package"
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        name = fields[2].strip()
+        times[name] = (int(fields[0]), int(fields[1]))
+    return times
+
+
+def top_level_total(times, modules):
+    """modules（とその依存）の読み込みに掛かった合計時間（ms）。"""
+    return sum(times[m][1] for m in modules if m in times) / 1000
+
+
+def loaded_packages(times, packages):
+    """読み込まれたパッケージごとの累積時間（ms）。"""
+    return {p: times[p][1] / 1000 for p in packages if p in times}
+
+
+def run(modules, repeat, budget):
+    totals, heavy = [], {}
+    per_module = {m: [] for m in modules}
+    for _ in range(repeat):
+        times = import_times(modules)
+        totals.append(top_level_total(times, modules))
+        heavy.update(loaded_packages(times, HEAVY_PACKAGES))
+        for m in modules:
+            # 他のモジュールが先に読み込んだ依存は含まれないため、単独の値ではない点に注意
+            per_module[m].append(times.get(m, (0, 0))[1] / 1000)
+
+    print(f"{'module':<40} {'median(ms)':>10}")
+    for m in modules:
+        print(f"{m:<40} {statistics.median(per_module[m]):>10.1f}")
+    total = statistics.median(totals)
+    print(f"{'total':<40} {total:>10.1f}")
+
+    framework = loaded_packages(import_times(FRAMEWORK_PACKAGES), FRAMEWORK_PACKAGES)
+    for p, ms in framework.items():
+        print(f"{p + ' (framework, reference)':<40} {ms:>10.1f}")
+
+    ok = True
+    if heavy:
+        ok = False
+        for p, ms in sorted(heavy.items(), key=lambda x: -x[1]):
+            print(f"heavy package loaded at startup: {p} ({ms:.1f}ms)")
+    if budget is not None and total > budget:
+        ok = False
+        print(f"startup import time {total:.1f}ms exceeds budget {budget:.1f}ms")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description='起動時 import 時間の計測')
+    parser.add_argument('modules', nargs='*',
+                        help='計測するモジュール（省略すると app.py のトップレベルの import）')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET_MS,
+                        help='合計の上限（ms、0 で無効）')
+    args = parser.parse_args()
+    modules = args.modules or startup_modules()
+    sys.exit(0 if run(modules, args.repeat, args.budget or None) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+what-if シミュレーター（evaluator.what_if.simulate）のレイテンシを、カタログ規模ごとに測ります。
+比較のため、スコアを書き換えて match_jobs を呼び直す素朴な方法の時間も測り、結果が同じことを確かめます。
+
+    python benchmarks/bench_what_if.py
+    python benchmarks/bench_what_if.py --mode ratio --sizes 1000 10000 50000 --repeats 20
+
+画面の操作に合わせ、5万件までのカタログでは p50 を --budget（既定 100ms）以内に収めます。
+超えた場合は終了コード 1 を返すため、CI での回帰検知にも使えます（--budget 0 で無効）。
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_matching import synthetic_jobs  # noqa: E402
+from evaluator.job_catalog import JobCatalog  # noqa: E402
+from evaluator.scorer import SamhallScorer  # noqa: E402
+from evaluator.skill_kernel import PENALTY, RATIO  # noqa: E402
+from evaluator.skills import SKILLS  # noqa: E402
+from evaluator.what_if import DEFAULT_STEPS, simulate  # noqa: E402
+
+# p50 の上限（ms）と、上限を適用するカタログの最大件数
+BUDGET_MS = 100.0
+BUDGET_MAX_JOBS = 50000
+
+
+def percentile_ms(samples, q):
+    return float(np.percentile(samples, q)) * 1000
+
+
+def naive(user_scores, catalog, steps, top_k, mode):
+    """スキル × 変化量 ごとに match_jobs を呼び、上位 top_k 件の平均を返します。"""
+    means = {}
+    for skill in SKILLS:
+        if skill not in user_scores:
+            continue
+        for step in steps:
+            changed = dict(user_scores)
+            changed[skill] = min(2.0, max(0.0, user_scores[skill] + step))
+            rates = [m['match_rate'] for m in SamhallScorer.match_jobs(changed, catalog, mode)[:top_k]]
+            means[skill, step] = round(float(np.mean(rates)), 2) if rates else 0.0
+    return means
+
+
+def run(mode, sizes, repeats, top_k, seed, budget=BUDGET_MS):
+    rng = np.random.default_rng(seed)
+    steps = DEFAULT_STEPS
+    print(f"mode={mode} skills={len(SKILLS)} steps={steps} k={top_k} repeats={repeats}")
+    print(f"{'jobs':>8} {'what-if p50':>12} {'what-if p99':>12} {'naive':>10} {'speedup':>8}")
+    over = []
+    for n_jobs in sizes:
+        catalog = JobCatalog({'jobs': synthetic_jobs(n_jobs, len(SKILLS), rng)})
+        users = [{s: round(float(v), 2) for s, v in zip(SKILLS, rng.uniform(0.5, 1.8, len(SKILLS)))}
+                 for _ in range(repeats)]
+        simulate(users[0], catalog, steps, top_k, mode=mode)
+
+        times = []
+        for user in users:
+            started = time.perf_counter()
+            result = simulate(user, catalog, steps, top_k, mode=mode)
+            times.append(time.perf_counter() - started)
+
+        # 素朴な方法は1人分だけ測り、結果が一致することを確かめる
+        started = time.perf_counter()
+        expected = naive(users[-1], catalog, steps, top_k, mode)
+        naive_time = time.perf_counter() - started
+        got = {(r['skill'], e['step']): e['top_k_mean'] for r in result['skills'] for e in r['steps']}
+        if got != expected:
+            raise AssertionError(f"what-if result differs from match_jobs (jobs={n_jobs})")
+
+        print(f"{n_jobs:>8} {percentile_ms(times, 50):>10.2f}ms {percentile_ms(times, 99):>10.2f}ms "
+              f"{naive_time * 1000:>8.0f}ms {naive_time / np.median(times):>7.1f}x")
+        if budget and n_jobs <= BUDGET_MAX_JOBS and percentile_ms(times, 50) > budget:
+            over.append((n_jobs, percentile_ms(times, 50)))
+
+    for n_jobs, p50 in over:
+        print(f"what-if p50 {p50:.1f}ms exceeds budget {budget:.1f}ms (jobs={n_jobs})")
+    return not over
+
+
+def main():
+    parser = argparse.ArgumentParser(description='what-if シミュレーターのレイテンシ')
+    parser.add_argument('--mode', choices=[PENALTY, RATIO], default=PENALTY)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000, 50000])
+    parser.add_argument('--repeats', type=int, default=10)
+    parser.add_argument('-k', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--budget', type=float, default=BUDGET_MS,
+                        help=f'{BUDGET_MAX_JOBS}件までの p50 の上限（ms、0 で無効）')
+    args = parser.parse_args()
+    sys.exit(0 if run(args.mode, args.sizes, args.repeats, args.k, args.seed, args.budget) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+
+DEFAULT_CACHE_PATH = os.getenv('ANALYSIS_CACHE_PATH', 'data/cache/analysis_cache.sqlite3')
+
+
+def _normalize(value):
+    # 表記ゆれ（全角/半角、前後や連続する空白）で別キーにならないよう正規化する
+    if isinstance(value, str):
+        return ' '.join(unicodedata.normalize('NFKC', value).split())
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+class _Flight:
+    """同一キーの実行中リクエスト（single-flight 用）。"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class AnalysisCache:
+    """
+    TextAnalyzer.analyze の結果を保存する、内容アドレス方式のディスクキャッシュ。
+
+    キーは正規化した回答・プロンプトテンプレート・モデル・temperature のハッシュです。
+    件数／容量／経過時間による LRU 削除と、同一リクエストの同時実行を
+    1回の API 呼び出しにまとめる single-flight に対応しています。
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=10000, max_bytes=None, max_age=None):
+        """
+        Args:
+            path (str): SQLite ファイルのパス（':memory:' も可）
+            max_entries (int): 保持する最大件数（None で無制限）
+            max_bytes (int): 保存する値の合計バイト数の上限（None で無制限）
+            max_age (float): エントリの有効期間（秒、None で無期限）
+        """
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._stats = {'hits': 0, 'misses': 0, 'coalesced': 0, 'stores': 0, 'evictions': 0}
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS analysis_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS idx_analysis_cache_accessed ON analysis_cache(accessed_at)')
+
+    @staticmethod
+    def make_key(text_responses, prompt_template, model, temperature):
+        """キャッシュキー（SHA-256）を作成します。"""
+        payload = json.dumps({
+            'responses': _normalize(text_responses),
+            'prompt': prompt_template,
+            'model': model,
+            'temperature': temperature,
+        }, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """キャッシュ済みの結果を返します。なければ None。"""
+        with self._lock:
+            value = self._lookup(key)
+            self._stats['hits' if value is not None else 'misses'] += 1
+        return value
+
+    def _lookup(self, key):
+        # 呼び出し側で self._lock を保持していること
+        now = time.time()
+        try:
+            row = self._conn.execute(
+                'SELECT value, created_at FROM analysis_cache WHERE key = ?', (key,)).fetchone()
+            if row is not None and self.max_age is not None and now - row[1] > self.max_age:
+                self._conn.execute('DELETE FROM analysis_cache WHERE key = ?', (key,))
+                self._stats['evictions'] += 1
+                row = None
+            if row is not None:
+                self._conn.execute(
+                    'UPDATE analysis_cache SET accessed_at = ? WHERE key = ?', (now, key))
+        except sqlite3.Error:
+            row = None
+        return json.loads(row[0]) if row is not None else None
+
+    def put(self, key, value):
+        """結果を保存し、上限を超えた分を古い順に削除します。"""
+        data = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            try:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO analysis_cache (key, value, size, created_at, accessed_at) '
+                    'VALUES (?, ?, ?, ?, ?)', (key, data, len(data.encode('utf-8')), now, now))
+                self._stats['stores'] += 1
+                self._evict(now)
+            except sqlite3.Error:
+                pass
+
+    def _evict(self, now):
+        removed = 0
+        if self.max_age is not None:
+            removed += self._conn.execute(
+                'DELETE FROM analysis_cache WHERE created_at < ?', (now - self.max_age,)).rowcount
+        if self.max_entries is not None:
+            count = self._conn.execute('SELECT COUNT(*) FROM analysis_cache').fetchone()[0]
+            if count > self.max_entries:
+                removed += self._conn.execute(
+                    'DELETE FROM analysis_cache WHERE key IN ('
+                    'SELECT key FROM analysis_cache ORDER BY accessed_at LIMIT ?)',
+                    (count - self.max_entries,)).rowcount
+        if self.max_bytes is not None:
+            total = self._conn.execute(
+                'SELECT COALESCE(SUM(size), 0) FROM analysis_cache').fetchone()[0]
+            rows = self._conn.execute(
+                'SELECT key, size FROM analysis_cache ORDER BY accessed_at').fetchall() \
+                if total > self.max_bytes else []
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                self._conn.execute('DELETE FROM analysis_cache WHERE key = ?', (key,))
+                total -= size
+                removed += 1
+        self._stats['evictions'] += removed
+
+    def get_or_compute(self, key, compute):
+        """
+        キャッシュにあればそれを返し、なければ compute() を実行して保存します。
+
+        同じキーで同時に呼ばれた場合、compute() は1回だけ実行され、
+        他の呼び出しはその結果を待ちます。compute() が例外を送出した場合は
+        何も保存せず、待っていた呼び出しにも同じ例外を送出します。
+        """
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                # 直前に別の呼び出しが完了・保存していれば、それを使う
+                cached = self._lookup(key)
+                if cached is not None:
+                    self._stats['coalesced'] += 1
+                    return cached
+                flight = self._inflight[key] = _Flight()
+            else:
+                self._stats['coalesced'] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = compute()
+            self.put(key, flight.result)
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    def stats(self):
+        """ヒット／ミスなどのカウンタと現在の件数を返します。"""
+        with self._lock:
+            stats = dict(self._stats)
+            try:
+                stats['entries'] = self._conn.execute(
+                    'SELECT COUNT(*) FROM analysis_cache').fetchone()[0]
+            except sqlite3.Error:
+                stats['entries'] = None
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        """すべてのエントリを削除します。"""
+        with self._lock:
+            self._conn.execute('DELETE FROM analysis_cache')
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_analysis_cache():
+    """プロセス内で共有する既定のキャッシュを返します。"""
+    global _default_cache
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = AnalysisCache()
+    return _default_cache
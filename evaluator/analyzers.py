@@ -0,0 +1,59 @@
+"""
+回答 → 15スキルのスコアを求める分析器の選択。
+
+    analyzer = create_analyzer('local')      # API を使わないローカルの推定
+    analyzer = create_analyzer()             # 環境変数 OLYS_ANALYZER（既定: openai）
+
+登録済みの名前:
+    openai     環境変数の APIキーを使う TextAnalyzer（evaluator.evaluator.text_analyzer。一括評価の既定）
+    streamlit  Streamlit の Secrets の APIキーを使う TextAnalyzer（evaluator.text_analyzer。app.py）
+    local      回答テキストの特徴から推定する LocalAnalyzer（API を使わない）
+
+analyze(text_responses) -> dict を持つ分析器であれば register_analyzer で追加できます。
+各分析器のモジュールは、作成する時点で読み込みます。
+"""
+import os
+
+ANALYZER_ENV = 'OLYS_ANALYZER'
+DEFAULT_ANALYZER = 'openai'
+
+
+def _openai(**kwargs):
+    from .evaluator.text_analyzer import TextAnalyzer
+    return TextAnalyzer(**kwargs)
+
+
+def _streamlit(**kwargs):
+    from .text_analyzer import TextAnalyzer
+    return TextAnalyzer(**kwargs)
+
+
+def _local(**kwargs):
+    from .local_analyzer import LocalAnalyzer
+    return LocalAnalyzer(**kwargs)
+
+
+ANALYZERS = {
+    'openai': _openai,
+    'streamlit': _streamlit,
+    'local': _local,
+}
+
+
+def register_analyzer(name, factory):
+    """分析器を名前で登録します（factory はキーワード引数を受け取り、分析器を返す関数）。"""
+    ANALYZERS[name] = factory
+
+
+def analyzer_name(name=None):
+    """name、環境変数 OLYS_ANALYZER、既定値（openai）の順に、使う分析器の名前を決めます。"""
+    return name or os.getenv(ANALYZER_ENV) or DEFAULT_ANALYZER
+
+
+def create_analyzer(name=None, **kwargs):
+    """名前で分析器を作成します。未登録の名前なら ValueError を送出します。"""
+    name = analyzer_name(name)
+    factory = ANALYZERS.get(name)
+    if factory is None:
+        raise ValueError(f"unknown analyzer: {name} (available: {', '.join(sorted(ANALYZERS))})")
+    return factory(**kwargs)
@@ -0,0 +1,121 @@
+import numpy as np
+
+from .skill_kernel import (
+    HEAVY_NG_PHRASE, PENALTY, JobVectors, condition_multiplier, encode_scores, finish_rates,
+    scoring_skills, skill_terms, top_k_indices,
+)
+from .skills import N_SKILLS
+
+
+def build_candidate_matrix(candidates):
+    """
+    候補者スコア（dictのリスト）を 候補者×15スキル の行列に変換します。
+    評価されていないスキルは 0 です（match_jobs と同じ）。
+
+    Returns:
+        tuple: (スキル行列, 照合するスキル（scoring_skills）のリスト,
+        physical_info のリスト, environment_info のリスト)
+    """
+    matrix = np.zeros((len(candidates), N_SKILLS), dtype=np.float64)
+    skills, physical, environment = [], [], []
+    for i, scores in enumerate(candidates):
+        matrix[i], _ = encode_scores(scores)
+        skills.append(scoring_skills(scores))
+        physical.append(str(scores.get('physical_info', '')))
+        environment.append(str(scores.get('environment_info', '')))
+    return matrix, skills, physical, environment
+
+
+def prepare_jobs(job_db):
+    """
+    職種データベースを (職種のリスト, JobVectors) にします。
+    dict以外のエントリは match_jobs と同様に除外されます。
+    JobCatalog が渡された場合は前計算済みの配列をそのまま使います。
+    """
+    vectors = getattr(job_db, 'vectors', None)
+    if vectors is not None:
+        return list(job_db.jobs), vectors
+    jobs = [job for job in job_db if isinstance(job, dict)]
+    return jobs, JobVectors(jobs)
+
+
+def build_condition_masks(physical, environment, vectors, rows=None):
+    """
+    身体・環境条件を 候補者×職種 のブールマスクとして求めます。
+    rows を指定すると、その職種（vectors の行）だけを対象にします。
+
+    Returns:
+        tuple: (重量物NGマスク, 避けるべき環境マスク)
+    """
+    job_heavy = vectors.heavy if rows is None else vectors.heavy[rows]
+    cand_heavy_ng = np.fromiter(
+        (HEAVY_NG_PHRASE in p for p in physical), dtype=bool, count=len(physical))
+    heavy_mask = cand_heavy_ng[:, None] & job_heavy[None, :]
+
+    # 同じ環境条件の候補者は1回だけ調べる
+    env_mask = np.zeros((len(environment), len(job_heavy)), dtype=bool)
+    hits_by_info = {}
+    for i, info in enumerate(environment):
+        if info not in hits_by_info:
+            hits_by_info[info] = vectors.env_mask(info, rows)
+        hits = hits_by_info[info]
+        if hits is not None:
+            env_mask[i] = hits
+    return heavy_mask, env_mask
+
+
+def match_rate_matrix(candidate_matrix, vectors, heavy_mask=None, env_mask=None, rows=None,
+                      skills=None):
+    """
+    候補者×職種 のマッチ率行列（丸め前、非対称ペナルティ方式）を一括で計算します。
+    スキルの項とマッチ率は skill_kernel の skill_terms / finish_rates で求めるため、
+    1人ずつ match_jobs を呼んだ場合と同じ値になります。
+    rows を指定すると、その職種（vectors の行）とだけ照合します。
+    skills は候補者ごとの照合するスキル（build_candidate_matrix の戻り値）で、
+    組が異なる候補者は組ごとに分けて計算します。
+    """
+    cand = np.asarray(candidate_matrix, dtype=np.float64)
+    groups = {}
+    for i, scope in enumerate(skills or ()):
+        groups.setdefault(scope, []).append(i)
+    if len(groups) > 1:
+        rates = np.empty((cand.shape[0], len(vectors) if rows is None else len(rows)))
+        for scope, idx in groups.items():
+            rates[idx] = match_rate_matrix(
+                cand[idx], vectors, None if heavy_mask is None else heavy_mask[idx],
+                None if env_mask is None else env_mask[idx], rows, [scope])
+        return rates
+
+    columns = vectors.columns(rows, next(iter(groups), None))
+    total = np.zeros((cand.shape[0], len(columns.count)), dtype=np.float64)
+
+    # スキルの並び順に1列ずつ加算して、1人ずつ計算した場合と同じ浮動小数点の結果を得る
+    # （候補者×職種×スキル の配列は作らない）
+    for q, skill in enumerate(columns.cols.tolist()):
+        total += skill_terms(cand[:, skill], columns, PENALTY, col=q)
+    return finish_rates(total, columns, PENALTY,
+                        condition_multiplier(heavy_mask, env_mask, total.shape))
+
+
+def match_jobs_batch(candidates, job_db, top_k=10):
+    """
+    複数の候補者を職種データベース全体と一括で照合し、
+    候補者ごとの上位k件を match_jobs と同じ形式で返します。
+    """
+    results = [[] for _ in candidates]
+    # match_jobs と同様、dict以外の候補者は空の結果とする
+    valid = [i for i, c in enumerate(candidates) if isinstance(c, dict)]
+    jobs, vectors = prepare_jobs(job_db)
+    if not jobs or not valid:
+        return results
+
+    cand_matrix, skills, physical, environment = build_candidate_matrix(
+        [candidates[i] for i in valid])
+    heavy_mask, env_mask = build_condition_masks(physical, environment, vectors)
+    rates = match_rate_matrix(cand_matrix, vectors, heavy_mask, env_mask, skills=skills)
+
+    for row, idx in enumerate(top_k_indices(rates, top_k)):
+        results[valid[row]] = [
+            {'job': jobs[j], 'match_rate': round(float(rates[row, j]), 1)} for j in idx
+        ]
+    return results
@@ -0,0 +1,161 @@
+"""
+複数人の回答を1回の Chat Completions（JSON モード）で分析するための部品。
+
+システムプロンプト・評価項目・指示文は1リクエストにつき1回だけ送り、
+回答は候補者ごとの ID（キャッシュキーの先頭）をつけて並べます。
+返ってきたスコアは候補者ごとに検証し、不正・欠落した候補者だけを
+呼び出し側で個別に再分析します。
+"""
+import json
+from collections import deque
+
+BATCH_PROMPT_TEMPLATE = """
+以下は複数人分の「O-lys」評価の回答です。候補者ごとに独立して分析し、
+各スキルのスコアを{low}から{high}の間で算出してください。
+
+【評価項目】
+{skills}
+
+【回答データ】（1行に1人。id は出力でもそのまま使ってください）
+{candidates}
+
+【出力形式】
+JSON形式で、"results" に id をキー、各スキルのスコア（項目名をキー、数値を値）を値として出力してください。
+全員・全項目を必ず含め、解説は不要です。
+例: {{"results": {{"{example_id}": {{"読解力": 1.5, "計算力": 1.2, ...}}, ...}}}}
+"""
+
+# 候補者ごとの ID の長さ（キャッシュキー = SHA-256 の16進表記の先頭）
+ID_LENGTH = 12
+
+# 候補者1行あたりの、回答以外の文字数（id・括弧など）の見積もり
+ITEM_OVERHEAD_TOKENS = 30
+
+
+def candidate_id(key):
+    """キャッシュキーから、プロンプト内で使う候補者 ID を作ります。"""
+    return key[:ID_LENGTH]
+
+
+def build_batch_prompt(items, skills, score_range):
+    """
+    Args:
+        items (list): (候補者 ID, 回答 dict) のリスト
+        skills (list): 評価するスキル名
+        score_range (tuple): (下限, 上限)
+    """
+    lines = [json.dumps({'id': cid, 'responses': responses}, ensure_ascii=False)
+             for cid, responses in items]
+    return BATCH_PROMPT_TEMPLATE.format(
+        low=score_range[0], high=score_range[1],
+        skills=", ".join(skills),
+        candidates="\n".join(lines),
+        example_id=items[0][0] if items else "id",
+    )
+
+
+def item_tokens(responses, expected_output_tokens):
+    """候補者1人がバッチに加わることで増えるトークン数（入力 + 出力）の見積もり。"""
+    return (len(json.dumps(responses, ensure_ascii=False)) + ITEM_OVERHEAD_TOKENS
+            + expected_output_tokens)
+
+
+def validate_scores(scores, skills, score_range):
+    """
+    1人分のスコアを検証します。
+
+    Returns:
+        dict: 全スキルが数値かつ範囲内ならスキル名 → float、そうでなければ None
+    """
+    if not isinstance(scores, dict):
+        return None
+    low, high = score_range
+    result = {}
+    for skill in skills:
+        value = scores.get(skill)
+        # bool は int の派生型なので明示的に除外する
+        if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+            return None
+        try:
+            value = float(value)
+        except ValueError:
+            return None
+        if not low <= value <= high:
+            return None
+        result[skill] = value
+    return result
+
+
+def parse_batch_response(content, ids, skills, score_range):
+    """
+    バッチの応答を候補者ごとに検証します。
+    応答全体が JSON として読めない場合は、全員を失敗として扱います。
+
+    Returns:
+        tuple: (候補者 ID → スコアの dict, 失敗した候補者 ID のリスト)
+    """
+    try:
+        data = json.loads(content)
+    except (TypeError, ValueError):
+        return {}, list(ids)
+    results = data.get('results', data) if isinstance(data, dict) else None
+    if not isinstance(results, dict):
+        return {}, list(ids)
+
+    valid, failed = {}, []
+    for cid in ids:
+        scores = validate_scores(results.get(cid), skills, score_range)
+        if scores is None:
+            failed.append(cid)
+        else:
+            valid[cid] = scores
+    return valid, failed
+
+
+class BatchPlanner:
+    """
+    未処理の候補者を、トークン予算と現在のバッチ上限に収まるように切り出します。
+
+    バッチ上限は AIMD で調整します。応答の半数以上が不正だった（または
+    リクエスト自体が失敗した）バッチのあとは上限を半分にし、
+    全員が有効だったバッチのあとは1ずつ戻します。
+    """
+
+    def __init__(self, token_budget, max_batch_size, fixed_tokens):
+        """
+        Args:
+            token_budget (int): 1リクエストあたりの入力 + 出力トークン数の上限
+            max_batch_size (int): 1リクエストに含める最大人数
+            fixed_tokens (int): システムプロンプト・指示文など、人数によらない分
+        """
+        self.token_budget = token_budget
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.fixed_tokens = fixed_tokens
+        self.limit = self.max_batch_size
+        self._pending = deque()
+
+    def add(self, items):
+        """(候補者 ID, 回答, 見積もりトークン数) を未処理の列に加えます。"""
+        self._pending.extend(items)
+
+    def __bool__(self):
+        return bool(self._pending)
+
+    def next_batch(self):
+        """次のバッチを返します。1人目は予算を超えても必ず含めます。"""
+        batch = []
+        used = self.fixed_tokens
+        while self._pending and len(batch) < self.limit:
+            tokens = self._pending[0][2]
+            if batch and used + tokens > self.token_budget:
+                break
+            batch.append(self._pending.popleft())
+            used += tokens
+        return batch
+
+    def record(self, size, failed):
+        """バッチの結果（人数・失敗人数）を上限の調整に反映します。"""
+        if size > 1 and failed * 2 >= size:
+            self.limit = max(1, min(self.limit, size) // 2)
+        elif failed == 0:
+            self.limit = min(self.max_batch_size, self.limit + 1)
@@ -0,0 +1,267 @@
+"""
+JSONL の回答データを一括で評価するコマンドラインツール。
+
+    python -m evaluator.bulk answers.jsonl -o results.jsonl
+    cat answers.jsonl | python -m evaluator.bulk - -o results.jsonl
+
+入力は1行1人の JSON です。`responses`（回答の dict）があればそれを、
+なければ app.py と同じ `r_t_val` / `w_t_val` / `c_t_val` / `m_t_val` を回答として使います。
+処理済みの位置をチェックポイントに保存するため、中断しても同じコマンドで再開できます。
+JSON として読めない行は評価せず、その行の位置とエラーを出力に記録して処理を続けます。
+出力の各レコードの `fallback` は、API の結果を得られずローカルの推定で補ったかどうかです。
+--batched-prompts を指定すると、複数人の回答を1回の API 呼び出しで分析します（analyze_batched）。
+--analyzer local を指定すると、API を使わずにローカルの推定（LocalAnalyzer）で評価します。
+--metrics-file を指定すると、段階ごとの処理時間や API 呼び出しの件数を Prometheus のテキスト形式で書き出します。
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from . import metrics
+from .analyzers import ANALYZERS, ANALYZER_ENV, analyzer_name, create_analyzer
+from .job_catalog import DEFAULT_DB_PATH, get_job_catalog
+from .scorer import SamhallScorer
+
+RESPONSE_KEYS = ('r_t_val', 'w_t_val', 'c_t_val', 'm_t_val')
+
+
+class CheckpointMismatch(ValueError):
+    """チェックポイントと出力ファイルが食い違っていて再開できない。"""
+
+
+def extract_responses(record):
+    """入力レコードから TextAnalyzer に渡す回答を取り出します。"""
+    if isinstance(record.get('responses'), dict):
+        return record['responses']
+    return {key: record.get(key, '') for key in RESPONSE_KEYS}
+
+
+def load_checkpoint(path):
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_checkpoint(path, state):
+    # 書きかけのファイルを残さないよう、一時ファイルから置き換える
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def iter_records(stream, offset=0, skip=0):
+    """
+    (次の行の先頭バイト位置, レコード, エラー) を1件ずつ返します。
+    空行は読み飛ばし、skip 件（空行を除く）を読み飛ばしてから返し始めます。
+    JSON のオブジェクトとして読めない行は、レコードを None、エラーを
+    {'error': 理由, 'input_offset': その行の先頭バイト位置} として返します。
+    """
+    position = offset
+    for line in stream:
+        start = position
+        position += len(line)
+        if not line.strip():
+            continue
+        if skip > 0:
+            skip -= 1
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield position, None, {'error': f"invalid JSON: {e}", 'input_offset': start}
+            continue
+        if not isinstance(record, dict):
+            yield position, None, {'error': f"expected a JSON object, got {type(record).__name__}",
+                                   'input_offset': start}
+            continue
+        yield position, record, None
+
+
+def iter_batches(records, size):
+    batch = []
+    for item in records:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Progress:
+    """処理件数・スループット・残り時間（ETA）を標準エラーに表示します。"""
+
+    def __init__(self, total_bytes=None, start_bytes=0, interval=5.0, stream=sys.stderr):
+        self.total_bytes = total_bytes
+        self.start_bytes = start_bytes
+        self.interval = interval
+        self.stream = stream
+        self.started = time.monotonic()
+        self.last_report = 0.0
+        self.count = 0
+
+    def update(self, count, position, force=False):
+        self.count += count
+        now = time.monotonic()
+        if not force and now - self.last_report < self.interval:
+            return
+        self.last_report = now
+        elapsed = max(now - self.started, 1e-9)
+        message = f"[bulk] {self.count} records, {self.count / elapsed:.1f} rec/s"
+        if self.total_bytes and position > self.start_bytes:
+            done = position - self.start_bytes
+            remaining = max(0, self.total_bytes - position)
+            eta = remaining / (done / elapsed)
+            message += f", {position / self.total_bytes:.1%} done, ETA {eta:.0f}s"
+        print(message, file=self.stream, flush=True)
+
+
+def evaluate_batch(analyzer, catalog, records, top_k, batched_prompts=False):
+    """1バッチ分のレコードを 分析 → 最終スコア → 職種マッチング します。"""
+    responses = [extract_responses(r) for r in records]
+    with metrics.span('bulk_analyze'):
+        if batched_prompts:
+            analyzed = analyzer.analyze_batched(responses, with_fallback=True)
+        else:
+            analyzed = analyzer.analyze_many(responses, with_fallback=True)
+    final_scores = [SamhallScorer.calculate_final_scores(s) for s, _ in analyzed]
+    matches = SamhallScorer.match_jobs_batch(final_scores, catalog, top_k=top_k)
+    metrics.inc('bulk_records_total', len(records))
+
+    results = []
+    for record, scores, (_, fallback), top in zip(records, final_scores, analyzed, matches):
+        results.append({
+            'id': record.get('id'),
+            'scores': scores,
+            'fallback': fallback,
+            'matches': [{'job_id': m['job'].get('id'), 'name': m['job'].get('name'),
+                         'match_rate': m['match_rate']} for m in top],
+        })
+    return results
+
+
+def run(input_path, output_path, checkpoint_path=None, batch_size=32, top_k=10,
+        db_path=DEFAULT_DB_PATH, analyzer=None, progress_interval=5.0, batched_prompts=False,
+        metrics_file=None):
+    """
+    一括評価を実行します。checkpoint_path があれば中断位置から再開します。
+    出力ファイルがないか、チェックポイントの位置より短い場合は再開できないため
+    CheckpointMismatch を送出します。
+    metrics_file があれば、バッチごとと終了時に計測値を書き出します。
+
+    Returns:
+        int: 今回の実行で処理したレコード数
+    """
+    if analyzer is None:
+        analyzer = create_analyzer()
+    catalog = get_job_catalog(db_path)
+    use_stdin = input_path == '-'
+
+    state = load_checkpoint(checkpoint_path) or {'input_offset': 0, 'records_done': 0,
+                                                 'output_size': 0}
+
+    if state['output_size']:
+        size = os.path.getsize(output_path) if os.path.exists(output_path) else None
+        if size is None or size < state['output_size']:
+            # 足りない部分を埋めて続けると、出力が NUL で埋まった壊れたファイルになる
+            raise CheckpointMismatch(
+                f"output {output_path} is {'missing' if size is None else f'{size} bytes'}, "
+                f"but the checkpoint expects {state['output_size']} bytes; "
+                f"delete the checkpoint {checkpoint_path} to start over")
+
+    # 前回のチェックポイント以降に書かれた出力は破棄して、その位置から書き直す
+    out = open(output_path, 'r+b' if state['output_size'] else 'wb')
+    out.truncate(state['output_size'])
+    out.seek(state['output_size'])
+
+    if use_stdin:
+        # 標準入力はシークできないため、処理済みの件数分を読み飛ばす
+        stream = sys.stdin.buffer
+        records = iter_records(stream, skip=state['records_done'])
+        total_bytes = None
+    else:
+        stream = open(input_path, 'rb')
+        stream.seek(state['input_offset'])
+        records = iter_records(stream, offset=state['input_offset'])
+        total_bytes = os.path.getsize(input_path)
+
+    progress = Progress(total_bytes, state['input_offset'], progress_interval)
+    processed = 0
+    try:
+        for batch in iter_batches(records, batch_size):
+            positions = [pos for pos, _, _ in batch]
+            valid = [rec for _, rec, _ in batch if rec is not None]
+            results = []
+            if valid:
+                with metrics.profiled('bulk_batch'):
+                    results = evaluate_batch(analyzer, catalog, valid, top_k, batched_prompts)
+            results = iter(results)
+            for _, record, error in batch:
+                if error is not None:
+                    # 不正な行は評価せず、入力と同じ順序でエラーとして記録する
+                    metrics.inc('bulk_invalid_lines_total')
+                    print(f"[bulk] skipped line at byte {error['input_offset']}: {error['error']}",
+                          file=sys.stderr, flush=True)
+                    result = {'id': None, **error}
+                else:
+                    result = next(results)
+                out.write(json.dumps(result, ensure_ascii=False).encode('utf-8') + b'\n')
+            out.flush()
+            os.fsync(out.fileno())
+
+            processed += len(batch)
+            state = {
+                'input_offset': positions[-1],
+                'records_done': state['records_done'] + len(batch),
+                'output_size': out.tell(),
+            }
+            if checkpoint_path:
+                save_checkpoint(checkpoint_path, state)
+            progress.update(len(batch), positions[-1])
+            if metrics_file:
+                metrics.write_prometheus(metrics_file)
+    finally:
+        out.close()
+        if not use_stdin:
+            stream.close()
+        if metrics_file:
+            metrics.write_prometheus(metrics_file)
+
+    progress.update(0, state['input_offset'], force=True)
+    return processed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='JSONL の回答データを一括評価します')
+    parser.add_argument('input', help="入力 JSONL（'-' で標準入力）")
+    parser.add_argument('-o', '--output', required=True, help='出力 JSONL')
+    parser.add_argument('--checkpoint', help='チェックポイントファイル（既定: <output>.ckpt）')
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help='job_database.json のパス')
+    parser.add_argument('--progress-interval', type=float, default=5.0)
+    parser.add_argument('--batched-prompts', action='store_true',
+                        help='複数人の回答を1回の API 呼び出しで分析する')
+    parser.add_argument('--analyzer', choices=sorted(ANALYZERS), default=analyzer_name(),
+                        help=f'使う分析器（既定: 環境変数 {ANALYZER_ENV}、なければ openai）')
+    parser.add_argument('--metrics-file', default=os.getenv(metrics.METRICS_FILE_ENV),
+                        help=f'計測値を書き出すファイル（既定: 環境変数 {metrics.METRICS_FILE_ENV}）')
+    args = parser.parse_args(argv)
+
+    try:
+        run(args.input, args.output, checkpoint_path=args.checkpoint or f"{args.output}.ckpt",
+            batch_size=args.batch_size, top_k=args.top_k, db_path=args.db,
+            analyzer=create_analyzer(args.analyzer), progress_interval=args.progress_interval,
+            batched_prompts=args.batched_prompts, metrics_file=args.metrics_file)
+    except CheckpointMismatch as e:
+        parser.error(str(e))
+
+
+if __name__ == '__main__':
+    main()
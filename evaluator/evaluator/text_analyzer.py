@@ -1,23 +1,10 @@
 import os
 import json
-from openai import OpenAI
 
-class TextAnalyzer:
-    def __init__(self):
-        api_key = os.getenv('OPENAI_API_KEY')
-        if not api_key:
-            raise ValueError("OpenAI API key not found")
-        self.client = OpenAI(api_key=api_key)
-        
-        self.skills = [
-            "読解力", "文書作成力", "計算力", "時間管理能力",
-            "容儀", "運動能力", "モビリティ", "身体的耐性",
-            "集中力", "問題解決力", "協力・チーム力", "コミュニケーション力",
-            "柔軟性", "個人業務遂行力", "サービスパフォーマンス"
-        ]
-    
-    def analyze(self, text_responses):
-        prompt = f"""
+from evaluator.llm_analyzer import LLMTextAnalyzer
+
+class TextAnalyzer(LLMTextAnalyzer):
+    PROMPT_TEMPLATE = """
 以下のテキスト回答から、15項目のスキルを0.0〜2.0で評価してください。
 
 評価基準:
@@ -26,10 +13,10 @@ class TextAnalyzer:
 - 1.5-2.0: 高い (High) - 複雑な業務も優れた能力で遂行
 
 15項目:
-{', '.join(self.skills)}
+{skills}
 
 テキスト回答:
-{json.dumps(text_responses, ensure_ascii=False, indent=2)}
+{responses}
 
 JSON形式で出力してください:
 {{
@@ -38,32 +25,23 @@ JSON形式で出力してください:
   ...
 }}
 """
-        
-        try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "あなたは障害者雇用の専門家です。"},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3
-            )
-            
-            content = response.choices[0].message.content
-            json_str = content.strip()
-            if '```json' in json_str:
-                json_str = json_str.split('```json')[1].split('```')[0].strip()
-            elif '```' in json_str:
-                json_str = json_str.split('```')[1].split('```')[0].strip()
-            
-            scores = json.loads(json_str)
-            
-            result = {}
-            for skill in self.skills:
-                result[skill] = float(scores.get(skill, 1.0))
-            
-            return result
-            
-        except Exception as e:
-            print(f"Error in text analysis: {e}")
-            return {skill: 1.0 for skill in self.skills}
+    SYSTEM_PROMPT = "あなたは障害者雇用の専門家です。"
+    MODEL = "gpt-4o-mini"
+    TEMPERATURE = 0.3
+    EXPECTED_OUTPUT_TOKENS = 250
+    SCORE_RANGE = (0.0, 2.0)
+    
+    def _load_api_key(self):
+        api_key = os.getenv('OPENAI_API_KEY')
+        if not api_key:
+            raise ValueError("OpenAI API key not found")
+        return api_key
+    
+    def _report_error(self, error):
+        print(f"Error in text analysis: {error}")
+    
+    def _build_prompt(self, text_responses):
+        return self.PROMPT_TEMPLATE.format(
+            skills=', '.join(self.skills),
+            responses=json.dumps(text_responses, ensure_ascii=False, indent=2),
+        )
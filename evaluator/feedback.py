@@ -0,0 +1,53 @@
+"""
+結果画面（app.py）と評価レポート（utils.report_export）で共通の表示ロジック。
+
+称号・3つの強み・レーダーチャートの軸は、画面で使う英語キーの4スキル
+（reading / writing / calculation / communication）を基準にしています。
+AI分析の日本語のスキル名は to_display_scores で英語キーに揃えてから渡してください。
+"""
+from .skills import ENGLISH_ALIASES
+
+STRENGTH_LABELS = {"reading": "読み取る力", "writing": "人との関わり", "calculation": "計算をたしかめる", "communication": "相談する力"}
+
+TITLES = {
+    "calculation": "正確な仕事で信頼を築く実務の星",
+    "communication": "周囲と協力して進める相談の達人",
+    "writing": "相手の気持ちに寄り添う表現者",
+    "reading": "大切な情報を的確に捉える理解のリーダー"
+}
+DEFAULT_TITLE = "期待のプロフェッショナル"
+
+# 3つの強みそれぞれに添える説明（上から順に）
+STRENGTH_MESSAGES = (
+    "現場で最も頼りにされるあなたの核となる力です。",
+    "周囲との円滑な関係や、丁寧な仕事につながる力です。",
+    "これからの成長を支える、素晴らしいポテンシャルです。",
+)
+
+RADAR_KEYS = ("reading", "writing", "calculation", "communication")
+RADAR_CATEGORIES = tuple(STRENGTH_LABELS[k] for k in RADAR_KEYS)
+
+# AI分析のスコア（日本語のスキル名）を画面用の英語キーに揃える（その他のスキルは日本語名のまま）
+DISPLAY_KEYS = {name: alias for alias, name in ENGLISH_ALIASES.items()}
+
+
+def to_display_scores(scores):
+    return {DISPLAY_KEYS.get(k, k): v for k, v in scores.items()}
+
+
+def get_strength_feedback(scores):
+    """
+    スコアから称号と上位3つの強み（表示名）を返します。
+
+    Returns:
+        tuple: (称号, 強みの表示名のリスト)
+    """
+    if not scores: return DEFAULT_TITLE, ["分析中"] * 3
+    sorted_s = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+    top_key = sorted_s[0][0]
+    return TITLES.get(top_key, DEFAULT_TITLE), [STRENGTH_LABELS.get(k, k) for k, v in sorted_s[:3]]
+
+
+def radar_values(scores):
+    """レーダーチャートの各軸の値（表示のため最小0.1）を返します。"""
+    return tuple(max(0.1, scores.get(k, 0.1)) for k in RADAR_KEYS)
@@ -0,0 +1,174 @@
+import json
+import logging
+import os
+import threading
+from types import MappingProxyType
+
+from . import metrics
+from .skills import SKILL_INDEX, SKILLS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                               'data', 'job_database.json')
+
+
+class JobCatalog:
+    """
+    job_database.json を一度だけ読み込み、照合に必要な索引を前計算した
+    読み取り専用の職種カタログ。
+
+    プロセス内の全セッションで共有されるため、生成後に変更してはいけません。
+    ファイルが更新された場合は get_job_catalog が新しいインスタンスに差し替えます。
+    """
+
+    def __init__(self, data, path=None, signature=None):
+        self.path = path
+        self.signature = signature
+        self.job_categories = MappingProxyType(dict(data.get('job_categories', {})))
+        self.jobs = tuple(job for job in data.get('jobs', []) if isinstance(job, dict))
+
+        # スキルは skills.SKILLS の固定インデックス（英語の別名も同じ番号）で扱う
+        self.skills = SKILLS
+        self.skill_index = MappingProxyType(SKILL_INDEX)
+
+        # 索引（値は self.jobs の位置）
+        self.index_by_id = MappingProxyType(
+            {job['id']: i for i, job in enumerate(self.jobs) if 'id' in job})
+        by_category = {}
+        for i, job in enumerate(self.jobs):
+            by_category.setdefault(job.get('category'), []).append(i)
+        self.indices_by_category = MappingProxyType(
+            {cat: tuple(idx) for cat, idx in by_category.items()})
+
+        # スコアリングカーネル用の配列（書き込み不可にして全セッションで共有）
+        # NumPy は初めてカタログを作る時点で読み込む
+        from .skill_kernel import JobVectors
+        self.vectors = JobVectors(self.jobs)
+        self.requirement_matrix = self.vectors.values
+        self.required_mask = self.vectors.required
+        self.heavy = self.vectors.heavy
+        self.environments = self.vectors.environments
+
+        # 上位k件検索用のインデックス（初回使用時に作成）
+        self._indexes = {}
+        self._index_lock = threading.Lock()
+
+    @classmethod
+    @metrics.span('job_db_load')
+    def load(cls, path=DEFAULT_DB_PATH):
+        """ファイルから JobCatalog を生成します。"""
+        stat = os.stat(path)
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data, path=path, signature=(stat.st_mtime_ns, stat.st_size))
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def __iter__(self):
+        return iter(self.jobs)
+
+    def __getitem__(self, index):
+        return self.jobs[index]
+
+    def get(self, job_id, default=None):
+        """職種IDから職種を取得します。"""
+        idx = self.index_by_id.get(job_id)
+        return self.jobs[idx] if idx is not None else default
+
+    def jobs_in_category(self, category):
+        """カテゴリに属する職種を返します。"""
+        return [self.jobs[i] for i in self.indices_by_category.get(category, ())]
+
+    def job_index(self, mode='penalty', skills=None):
+        """
+        上位k件検索用の JobIndex を返します（mode / skills ごとに一度だけ作成）。
+        skills はスキルのインデックスまたは名前の列で、省略すると15スキルすべてを使います。
+        """
+        key = (mode, tuple(SKILL_INDEX.get(s, s) for s in skills) if skills else None)
+        index = self._indexes.get(key)
+        if index is None:
+            from .job_index import JobIndex
+            with self._index_lock:
+                index = self._indexes.get(key)
+                if index is None:
+                    index = JobIndex.from_catalog(self, mode=mode, skills=key[1])
+                    self._indexes[key] = index
+        return index
+
+    def category_name(self, category):
+        """カテゴリキーの表示名（job_categories）を返します。"""
+        return self.job_categories.get(category, category)
+
+
+_catalogs = {}
+# 読み直しのロックはパスごと（別のファイルの読み直しを待たせない）
+_reload_locks = {}
+_reload_locks_guard = threading.Lock()
+# 読み込みに失敗したファイルの mtime / サイズ（変わるまで読み直さない）
+_failed_signatures = {}
+
+
+def _signature(path):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _reload_lock(key):
+    lock = _reload_locks.get(key)
+    if lock is None:
+        with _reload_locks_guard:
+            lock = _reload_locks.setdefault(key, threading.Lock())
+    return lock
+
+
+def get_job_catalog(path=DEFAULT_DB_PATH):
+    """
+    共有の JobCatalog を返します。
+
+    ファイルの mtime / サイズが変わっていれば読み直し、参照を丸ごと差し替えます。
+    読み直し中も他のセッションは直前のカタログをそのまま使い続けるため、
+    照合処理がブロックされることはありません。
+    書き込み途中などで読み直しに失敗した場合は、ログに残して直前のカタログを使い続け、
+    ファイルがもう一度変わったときに読み直します（初回の読み込みの失敗だけは例外を送出します）。
+    """
+    key = os.path.abspath(path)
+    current = _catalogs.get(key)
+    if current is not None:
+        try:
+            signature = _signature(key)
+        except OSError:
+            # 置き換えの途中などでファイルが一時的に見えない
+            return current
+        if signature == current.signature or signature == _failed_signatures.get(key):
+            return current
+
+    # 別スレッドが読み直し中なら、古いカタログで処理を続ける
+    lock = _reload_lock(key)
+    if not lock.acquire(blocking=current is None):
+        return current
+    try:
+        current = _catalogs.get(key)
+        try:
+            signature = _signature(key)
+        except OSError:
+            if current is None:
+                raise
+            return current
+        if current is not None and signature in (current.signature, _failed_signatures.get(key)):
+            return current
+        try:
+            catalog = JobCatalog.load(key)
+        except Exception as e:
+            if current is None:
+                raise
+            logger.error("職種データベースを読み直せませんでした。直前のカタログを使い続けます: %s (%s)",
+                         key, e)
+            _failed_signatures[key] = signature
+            return current
+        _catalogs[key] = catalog
+        _failed_signatures.pop(key, None)
+        return catalog
+    finally:
+        lock.release()
@@ -0,0 +1,292 @@
+"""
+大規模な職種カタログから、上位k件のマッチを全件スコアリングせずに求める検索インデックス。
+
+職種の要求値ベクトルを k-d 木（葉は数十件）に分割し、各ノードには
+配下の職種の要求値の範囲（箱）を持たせます。スコアは要求値に対して単調な
+区分線形関数なので、箱の範囲から「このノード内で取り得る最高マッチ率」を
+上から押さえられます。上界の高いノードから順に調べ、上界が現在の k 位に
+届かないノードは丸ごと読み飛ばします（結果は全件走査と完全に一致します）。
+"""
+import heapq
+import math
+from itertools import count
+
+import numpy as np
+
+from .skill_kernel import (
+    BASE_RATE, CAP_RATE, DIFF_WEIGHT, FLOOR_RATE, NO_ENVIRONMENT, OVER_BONUS, PENALTY, RATIO,
+    RATIO_CAP, UNDER_PENALTY, JobVectors, match_rates, top_k_indices,
+)
+from .skills import N_SKILLS, SKILL_INDEX
+
+# 上界とスコアの計算順の違いによる浮動小数点誤差の吸収分
+_BOUND_EPS = 1e-9
+
+# 職種数がこれ未満なら、木をたどるより NumPy の全件走査のほうが速い（方式ごとの実測の分岐点）。
+# benchmarks/bench_job_index.py の実測では、PENALTY（4スキル）は 2万件で 0.9倍・5万件で 2.6倍、
+# RATIO は 15スキルで 5万件でも 0.7倍と木のほうが遅いため、既定では常に全件走査にする
+DEFAULT_SCAN_BELOW = {PENALTY: 50000, RATIO: math.inf}
+
+# 照合するスキルの列がこれより多いと箱の上界が緩く、10万件でも全件走査のほうが速い
+# （PENALTY の実測で 6列は 10万件で 1.8倍、8列以上は 0.7倍以下）
+MAX_INDEX_SKILLS = 6
+
+
+def default_scan_below(mode, n_skills):
+    """方式と照合するスキルの列数から、全件走査に切り替える職種数の既定値を返します。"""
+    if n_skills > MAX_INDEX_SKILLS:
+        return math.inf
+    return DEFAULT_SCAN_BELOW[mode]
+
+
+class _Node:
+    """
+    木のノード。子を持つノードは子の箱を行列にまとめて持ち、
+    子の上界を一度の NumPy 演算で求められるようにします。
+    """
+    __slots__ = ('lo', 'hi', 'all_required', 'any_required', 'min_required', 'min_index',
+                 'indices', 'children', 'child_boxes')
+
+
+class _Cursor:
+    """子ノードを上界の高い順に1つずつ取り出すための位置（遅延展開用）。"""
+    __slots__ = ('node', 'bounds', 'order', 'pos')
+
+    def __init__(self, node, bounds, order):
+        self.node = node
+        self.bounds = bounds
+        self.order = order
+        self.pos = 0
+
+
+def _box_bounds(mode, lo, hi, all_required, any_required, min_required, user):
+    """
+    箱（1行が1ノード）に対する最高マッチ率の上界をまとめて求めます。
+    lo / hi / all_required / any_required は ノード×スキル、min_required は ノード数 の配列です。
+    """
+    if mode == PENALTY:
+        # 各スキルで、箱 [lo, hi] 内の要求値に対する最小ペナルティを足し合わせる
+        with np.errstate(invalid='ignore'):
+            below = np.where(user < lo, (lo - user) * UNDER_PENALTY, 0.0)
+            above = np.where(user > hi, (user - hi) * OVER_BONUS, 0.0)
+        # 要求しない職種を含むスキルは、ペナルティ0の職種があり得る
+        diff = np.where(all_required, below + above, 0.0).sum(axis=1)
+        # マルチプライヤーは1以下なので、上界では無視できる（要求スキルのない職種の 45% もこれ以下）
+        return np.minimum(CAP_RATE, np.maximum(FLOOR_RATE, BASE_RATE - diff * DIFF_WEIGHT))
+
+    # RATIO: 項 min(1.2, u/r) は r が小さいほど大きいので、各スキルの上界は lo で決まる。
+    # 要求スキル数が c 個の職種の平均は「上界の大きい順に c 個の平均」以下で、
+    # これは c が小さいほど大きいため、ノード内の最小要求数で押さえられる
+    with np.errstate(divide='ignore', invalid='ignore'):
+        terms = np.where((lo > 0) & (user >= 0), np.minimum(RATIO_CAP, user / lo), RATIO_CAP)
+    terms = np.where(any_required, terms, 0.0)
+    ranked = -np.sort(-terms, axis=1)
+    c = np.clip(min_required, 1, ranked.shape[1])
+    top_sum = np.cumsum(ranked, axis=1)[np.arange(len(c)), c - 1]
+    return np.where(any_required.any(axis=1), top_sum / c * 100, 0.0)
+
+
+class JobIndex:
+    """
+    職種の要求値行列に対する上位k件検索用のインデックス。
+
+    Args:
+        requirement_matrix: 職種×スキルの要求値
+        required_mask: 職種×スキルの「要求あり」フラグ（None なら全て要求あり）
+        heavy: 職種ごとの physical_level == 'heavy' フラグ（PENALTY のみ使用）
+        environments: 職種ごとの環境条件（PENALTY のみ使用）
+        mode: PENALTY または RATIO
+        leaf_size: 葉ノードに入れる職種数
+        scan_below: 職種数がこれ未満なら query は全件走査で答える
+            （None なら default_scan_below の既定値。全件走査で答える場合は木を作らない）
+    """
+
+    def __init__(self, requirement_matrix, required_mask=None, heavy=None, environments=None,
+                 mode=PENALTY, leaf_size=32, scan_below=None):
+        if mode not in (PENALTY, RATIO):
+            raise ValueError(f"unknown mode: {mode}")
+        self.mode = mode
+        self.requirements = np.asarray(requirement_matrix, dtype=np.float64)
+        n_jobs = self.requirements.shape[0]
+        self.required = (np.ones(self.requirements.shape, dtype=bool) if required_mask is None
+                         else np.asarray(required_mask, dtype=bool))
+        self.heavy = (np.zeros(n_jobs, dtype=bool) if heavy is None
+                      else np.asarray(heavy, dtype=bool))
+        self.environments = list(environments) if environments is not None \
+            else [NO_ENVIRONMENT] * n_jobs
+        # 葉の正確なスコアは skill_kernel.match_rates で求める（match_jobs と同じ値になる）
+        self.vectors = JobVectors.from_arrays(self.requirements, self.required, self.heavy,
+                                              self.environments)
+        self.leaf_size = max(1, int(leaf_size))
+        self.scan_below = (default_scan_below(mode, self.requirements.shape[1])
+                           if scan_below is None else scan_below)
+        self.root = (self._build_root(np.arange(n_jobs))
+                     if n_jobs and n_jobs >= self.scan_below else None)
+
+    def __len__(self):
+        return self.requirements.shape[0]
+
+    @classmethod
+    def from_catalog(cls, catalog, mode=PENALTY, skills=None, leaf_size=32):
+        """
+        JobCatalog からインデックスを作ります。
+
+        skills（スキルのインデックスまたは名前の列）を指定すると、その列だけを使います。
+        候補者が評価されていないスキルを除くときに使い、query にも同じ列の値を渡します。
+        """
+        cols = list(range(N_SKILLS)) if skills is None else [SKILL_INDEX.get(s, s) for s in skills]
+        matrix = catalog.requirement_matrix[:, cols]
+        mask = catalog.required_mask[:, cols]
+        return cls(matrix, mask, heavy=catalog.heavy, environments=catalog.environments,
+                   mode=mode, leaf_size=leaf_size)
+
+    # ------------------------------------------------------------------
+    # 構築
+    # ------------------------------------------------------------------
+    def _build_root(self, indices):
+        # 職種ごとに要求スキルの組が違うと箱の上界が緩むため、まず要求スキルの組で分ける。
+        # 組ごとの部分木では対象スキルが固定され、PENALTY はスキルごとの最小ペナルティの和、
+        # RATIO は各スキルの上界の平均まで上界が締まる
+        patterns = {}
+        for i, row in zip(indices.tolist(), self.required[indices]):
+            patterns.setdefault(row.tobytes(), []).append(i)
+        if len(patterns) == 1:
+            return self._build(indices)
+        root = self._make_node(indices)
+        self._attach(root, [self._build(np.array(group)) for group in patterns.values()])
+        return root
+
+    def _make_node(self, indices):
+        node = _Node()
+        reqs = self.requirements[indices]
+        mask = self.required[indices]
+        # 要求のないスキルは範囲計算から除外する
+        node.lo = np.where(mask, reqs, np.inf).min(axis=0)
+        node.hi = np.where(mask, reqs, -np.inf).max(axis=0)
+        node.all_required = mask.all(axis=0)
+        node.any_required = mask.any(axis=0)
+        node.min_required = int(mask.sum(axis=1).min())
+        node.min_index = int(indices.min())
+        node.indices = indices
+        node.children = None
+        node.child_boxes = None
+        return node
+
+    @staticmethod
+    def _attach(node, children):
+        node.children = tuple(children)
+        node.child_boxes = (
+            np.stack([c.lo for c in children]),
+            np.stack([c.hi for c in children]),
+            np.stack([c.all_required for c in children]),
+            np.stack([c.any_required for c in children]),
+            np.array([c.min_required for c in children]),
+        )
+
+    def _build(self, indices):
+        node = self._make_node(indices)
+        if len(indices) <= self.leaf_size:
+            return node
+
+        reqs = self.requirements[indices]
+        mask = self.required[indices]
+        spread = np.where(node.any_required, node.hi - node.lo, -1.0)
+        dim = int(np.argmax(spread))
+        if spread[dim] > 0:
+            values = np.where(mask[:, dim], reqs[:, dim], node.lo[dim])
+            order = np.argsort(values, kind='stable')
+            half = len(order) // 2
+            self._attach(node, [self._build(indices[order[:half]]),
+                                self._build(indices[order[half:]])])
+        return node
+
+    # ------------------------------------------------------------------
+    # 正確なスコア（葉）
+    # ------------------------------------------------------------------
+    def _exact(self, indices, user, physical_info, environment_info):
+        return match_rates(user, self.vectors, self.mode, physical_info, environment_info,
+                           rows=indices)
+
+    # ------------------------------------------------------------------
+    # 検索
+    # ------------------------------------------------------------------
+    def query(self, user_vector, k=10, physical_info='', environment_info=''):
+        """
+        上位k件を (職種インデックス, 丸めたマッチ率) のリストで返します。
+        並びは全件走査と同じ（マッチ率の降順、同率は職種の並び順）です。
+
+        Returns:
+            tuple: (結果のリスト, 正確にスコアリングした職種数)
+        """
+        if not len(self) or k <= 0:
+            return [], 0
+        if self.root is None:
+            return self.scan(user_vector, k, physical_info, environment_info), len(self)
+        user = np.asarray(user_vector, dtype=np.float64)
+
+        # best: (丸めたマッチ率, -職種インデックス) の最小ヒープ（先頭が k 位）
+        best = []
+        scored = 0
+        tie = count()
+
+        def rate_can_enter(bound):
+            return len(best) < k or round(bound + _BOUND_EPS, 1) >= best[0][0]
+
+        def can_enter(bound, node):
+            # ノード内の最高マッチ率（丸め後）が k 位に勝てるか（同率なら職種の並び順で比べる）
+            if len(best) < k:
+                return True
+            best_rate = round(bound + _BOUND_EPS, 1)
+            kth_rate, kth_neg_idx = best[0]
+            return best_rate > kth_rate or (best_rate == kth_rate and -node.min_index > kth_neg_idx)
+
+        root = self.root
+        root_bound = _box_bounds(self.mode, root.lo[None], root.hi[None], root.all_required[None],
+                                 root.any_required[None], np.array([root.min_required]), user)[0]
+        frontier = [(-float(root_bound), next(tie), root)]
+
+        while frontier:
+            neg_bound, _, item = heapq.heappop(frontier)
+            if not rate_can_enter(-neg_bound):
+                # 残りはすべて上界がこれ以下なので打ち切る
+                break
+
+            if isinstance(item, _Cursor):
+                # 子を上界の高い順に1つ取り出し、カーソルは次の子の上界で積み直す
+                pos = item.order[item.pos]
+                child = item.node.children[pos]
+                if can_enter(float(item.bounds[pos]), child):
+                    heapq.heappush(frontier, (neg_bound, next(tie), child))
+                item.pos += 1
+                if item.pos < len(item.order):
+                    heapq.heappush(frontier, (-float(item.bounds[item.order[item.pos]]),
+                                              next(tie), item))
+                continue
+
+            node = item
+            if not can_enter(-neg_bound, node):
+                continue
+            if node.children is not None:
+                bounds = _box_bounds(self.mode, *node.child_boxes, user)
+                order = np.argsort(-bounds, kind='stable')
+                heapq.heappush(frontier, (-float(bounds[order[0]]), next(tie),
+                                          _Cursor(node, bounds, order)))
+                continue
+
+            rates = self._exact(node.indices, user, physical_info, environment_info)
+            scored += len(node.indices)
+            for idx, rate in zip(node.indices.tolist(), rates.tolist()):
+                entry = (round(rate, 1), -idx)
+                if len(best) < k:
+                    heapq.heappush(best, entry)
+                elif entry > best[0]:
+                    heapq.heapreplace(best, entry)
+
+        ordered = sorted(best, reverse=True)
+        return [(-neg_idx, rate) for rate, neg_idx in ordered], scored
+
+    def scan(self, user_vector, k=10, physical_info='', environment_info=''):
+        """比較用: 全職種をスコアリングしてソートする全件走査。"""
+        user = np.asarray(user_vector, dtype=np.float64)
+        rates = self._exact(None, user, physical_info, environment_info)
+        return [(i, round(float(rates[i]), 1)) for i in top_k_indices(rates[None, :], k)[0]]
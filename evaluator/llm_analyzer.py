@@ -0,0 +1,453 @@
+"""
+OpenAI の Chat Completions で回答を分析する TextAnalyzer の共通部分。
+
+キャッシュ・一括分析（analyze_many / analyze_batched）・ストリーミング・
+API が使えないときのローカルの推定・計測はここにまとめ、
+app.py 用（evaluator.text_analyzer）と一括評価用（evaluator.evaluator.text_analyzer）の
+TextAnalyzer は次の部分だけを定義します。
+
+    _load_api_key()        APIキーの取得元（Streamlit の Secrets / 環境変数）
+    PROMPT_TEMPLATE など   プロンプト・モデル・temperature・スコアの範囲
+    _report_error(error)   エラーの伝え方（画面に表示 / 標準出力）
+"""
+import json
+import asyncio
+import time
+
+from . import metrics
+from .analysis_cache import AnalysisCache, get_analysis_cache
+from .batch_prompt import (
+    BATCH_PROMPT_TEMPLATE, BatchPlanner, build_batch_prompt, candidate_id, item_tokens,
+    parse_batch_response,
+)
+from .local_analyzer import LocalAnalyzer
+from .rate_limit import RateLimiter, gather_bounded, retry_async
+from .score_stream import IncompleteScores, ScoreStreamParser, parse_scores
+from .skills import SKILLS
+
+
+class LLMTextAnalyzer:
+    """TextAnalyzer の基底クラス。サブクラスでプロンプトと _load_api_key / _report_error を定義します。"""
+    PROMPT_TEMPLATE = None
+    SYSTEM_PROMPT = None
+    MODEL = "gpt-4o-mini"
+    TEMPERATURE = None
+    # JSON モード（response_format）。temperature と同じく、指定したクラスだけ送る
+    RESPONSE_FORMAT = None
+    # analyze_batched の応答は複数人分の JSON なので、クラスによらず JSON モードで受け取る
+    BATCH_RESPONSE_FORMAT = {"type": "json_object"}
+    EXPECTED_OUTPUT_TOKENS = 200
+    SCORE_RANGE = (0.5, 2.0)
+    # analyze_batched: 1リクエストあたりのトークン数（入力 + 出力）と人数の上限
+    BATCH_TOKEN_BUDGET = 12000
+    MAX_BATCH_SIZE = 20
+
+    def __init__(self, cache=None, max_concurrency=8, requests_per_minute=500,
+                 tokens_per_minute=200000, max_retries=5, fallback=None):
+        # （openai は起動時間を抑えるため、クライアントを作る時点で読み込む）
+        self.api_key = self._load_api_key()
+        self._client = None
+        self._async_client = None
+
+        # 評価する15スキル（スコアリングカーネルと共通の一覧）
+        self.skills = list(SKILLS)
+
+        # 分析結果のキャッシュ（既定はプロセス共有のディスクキャッシュ）
+        self.cache = cache if cache is not None else get_analysis_cache()
+
+        # 一括分析（analyze_many）の同時実行数・レート制限・再試行回数
+        self.max_concurrency = max_concurrency
+        self.rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        self.max_retries = max_retries
+        # analyze_batched の累計（リクエスト数・バッチで得た人数・個別に再分析した人数）
+        self.batch_stats = {'batches': 0, 'batched': 0, 'retried': 0}
+
+        # API が使えないときにスコアを推定する分析器（既定は LocalAnalyzer）と、使った回数
+        self.fallback = fallback if fallback is not None else LocalAnalyzer()
+        self.fallbacks = 0
+
+    def _load_api_key(self):
+        raise NotImplementedError
+
+    def _report_error(self, error):
+        raise NotImplementedError
+
+    def analyze(self, text_responses, stream=False, on_score=None):
+        """
+        OpenAI APIを使用して回答を分析します。
+        個人情報は一切含めず、テキスト回答のみを送信します。
+        同じ回答の結果はキャッシュから返し、API は呼び出しません。
+
+        stream=True の場合は回答をストリーミングで受け取り、スコアが1項目届くごとに
+        on_score(スキル名, 値, ここまでのスコアの dict) を呼び出します。
+        """
+        prompt = self._build_prompt(text_responses)
+        if stream:
+            return self._analyze_stream(text_responses, prompt, on_score)
+
+        try:
+            key = self._cache_key(text_responses)
+            return dict(self.cache.get_or_compute(key, lambda: self._request_scores(prompt)))
+
+        except IncompleteScores as e:
+            # 途中で途切れた回答は、読み取れた項目だけを使う（不足分はローカルの推定で補い、キャッシュしない）
+            return self._fill_scores(text_responses, e.scores)
+
+        except Exception as e:
+            self._report_error(e)
+            # エラー時は回答からローカルに推定したスコアを返す（この結果はキャッシュしない）
+            return self._fallback_scores(text_responses)
+
+    def _analyze_stream(self, text_responses, prompt, on_score):
+        # 同じ回答のストリーミングが同時に来た場合も API の呼び出しは1回にまとめる（single-flight）。
+        # 待っていた呼び出しと、キャッシュから返す場合は、届いた項目を順に on_score に渡し直す
+        key = self._cache_key(text_responses)
+        partial = {}
+        streamed = False
+        started = time.perf_counter()
+
+        def emit(pairs):
+            for skill, value in pairs:
+                if skill in self.skills and skill not in partial:
+                    if not partial:
+                        metrics.observe('llm_first_score_seconds', time.perf_counter() - started)
+                    partial[skill] = value
+                    if on_score is not None:
+                        on_score(skill, value, dict(partial))
+
+        def compute():
+            nonlocal streamed
+            streamed = True
+            try:
+                complete = self._request_scores_stream(prompt, emit)
+            except Exception as e:
+                if not partial:
+                    raise
+                raise IncompleteScores(dict(partial), self.skills) from e
+            if not partial:
+                metrics.inc('parse_failures_total', call='stream')
+                raise ValueError("no scores found in the response")
+            if not complete or len(partial) < len(self.skills):
+                # 途中で途切れた回答はキャッシュしない（待っている呼び出しにも届いた項目を渡す）
+                raise IncompleteScores(dict(partial), self.skills)
+            return self._fill_scores(text_responses, partial)
+
+        try:
+            result = dict(self.cache.get_or_compute(key, compute))
+            received = result
+        except IncompleteScores as e:
+            if e.__cause__ is not None:
+                self._report_error(e.__cause__)
+            # 途中で途切れた場合も、届いた項目の値は使う（不足分だけローカルの推定で補う）
+            result = self._fill_scores(text_responses, e.scores)
+            received = e.scores
+        except Exception as e:
+            self._report_error(e)
+            return self._fallback_scores(text_responses)
+
+        if not streamed and on_score is not None:
+            replayed = {}
+            for skill, value in received.items():
+                replayed[skill] = value
+                on_score(skill, value, dict(replayed))
+        return result
+
+    def analyze_many(self, responses_list, max_concurrency=None, with_fallback=False):
+        """
+        複数人の回答をまとめて分析します（結果は入力と同じ順序）。
+        内部では analyze_many_async を実行します。
+        """
+        return asyncio.run(self.analyze_many_async(responses_list, max_concurrency, with_fallback))
+
+    async def analyze_many_async(self, responses_list, max_concurrency=None, with_fallback=False):
+        """
+        非同期クライアントで複数人の回答を同時に分析します。
+        同時実行数・リクエスト数/分・トークン数/分を制限し、
+        429 / 5xx は指数バックオフで再試行します。
+        with_fallback=True の場合は、(スコア, ローカルの推定で補ったか) のリストを返します。
+        """
+        responses_list = list(responses_list)
+        keys = [self._cache_key(r) for r in responses_list]
+
+        # 同じ回答は1回だけ分析する
+        unique = {}
+        for key, responses in zip(keys, responses_list):
+            unique.setdefault(key, responses)
+
+        async def worker(item):
+            key, responses = item
+            return key, await self._analyze_async(responses, key)
+
+        results = dict(await gather_bounded(
+            list(unique.items()), worker, max_concurrency or self.max_concurrency))
+        return self._ordered(results, keys, with_fallback)
+
+    async def analyze_async(self, text_responses, key=None):
+        """analyze の非同期版です。"""
+        scores, _ = await self._analyze_async(text_responses, key)
+        return scores
+
+    async def _analyze_async(self, text_responses, key=None):
+        """analyze_async の本体。(スコア, ローカルの推定で補ったか) を返します。"""
+        key = key or self._cache_key(text_responses)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return dict(cached), False
+
+        try:
+            result = await self._request_scores_async(self._build_prompt(text_responses))
+            self.cache.put(key, result)
+            return result, False
+
+        except IncompleteScores as e:
+            return self._fill_scores(text_responses, e.scores), True
+
+        except Exception as e:
+            self._report_error(e)
+            return self._fallback_scores(text_responses), True
+
+    @staticmethod
+    def _ordered(results, keys, with_fallback):
+        # results: キャッシュキー → (スコア, ローカルの推定で補ったか)
+        if with_fallback:
+            return [(dict(results[key][0]), results[key][1]) for key in keys]
+        return [dict(results[key][0]) for key in keys]
+
+    def analyze_batched(self, responses_list, max_batch_size=None, token_budget=None,
+                        max_concurrency=None, with_fallback=False):
+        """
+        複数人の回答を1リクエストにまとめて分析します（結果は入力と同じ順序）。
+        内部では analyze_batched_async を実行します。
+        """
+        return asyncio.run(self.analyze_batched_async(
+            responses_list, max_batch_size, token_budget, max_concurrency, with_fallback))
+
+    async def analyze_batched_async(self, responses_list, max_batch_size=None, token_budget=None,
+                                    max_concurrency=None, with_fallback=False):
+        """
+        プロンプトの固定部分を共有し、複数人の回答を1回の API 呼び出しで分析します。
+        人数はトークン予算（token_budget）と max_batch_size に収まるように決め、
+        スコアが不正・欠落していた人だけを analyze_async で個別に再分析します。
+        バッチで得たスコアはバッチのプロンプトのキー（_batch_cache_key）でキャッシュし、
+        analyze / analyze_many の結果とは混ぜません（個別の分析のキャッシュは読みます）。
+        with_fallback=True の場合は、(スコア, ローカルの推定で補ったか) のリストを返します。
+        """
+        responses_list = list(responses_list)
+        keys = [self._cache_key(r) for r in responses_list]
+        unique = {}
+        for key, responses in zip(keys, responses_list):
+            unique.setdefault(key, responses)
+
+        results, key_by_id = {}, {}
+        planner = BatchPlanner(token_budget or self.BATCH_TOKEN_BUDGET,
+                               max_batch_size or self.MAX_BATCH_SIZE, self._batch_fixed_tokens())
+        for key, responses in unique.items():
+            batch_key = self._batch_cache_key(responses)
+            cached = self.cache.get(batch_key)
+            if cached is None:
+                cached = self.cache.get(key)
+            if cached is not None:
+                results[key] = (cached, False)
+                continue
+            cid = candidate_id(batch_key)
+            key_by_id[cid] = key, batch_key
+            planner.add([(cid, responses, item_tokens(responses, self.EXPECTED_OUTPUT_TOKENS))])
+
+        failed = []
+
+        async def worker():
+            # 上限の調整を次のバッチにすぐ反映するため、バッチは1つずつ取り出す
+            while planner:
+                batch = planner.next_batch()
+                valid, invalid = await self._request_batch_async(batch)
+                planner.record(len(batch), len(invalid))
+                for cid, scores in valid.items():
+                    key, batch_key = key_by_id[cid]
+                    results[key] = (scores, False)
+                    self.cache.put(batch_key, scores)
+                failed.extend(invalid)
+                self.batch_stats['batches'] += 1
+                self.batch_stats['batched'] += len(valid)
+
+        await asyncio.gather(*(worker() for _ in range(max(1, max_concurrency or self.max_concurrency))))
+
+        async def retry_one(cid):
+            key, _ = key_by_id[cid]
+            return key, await self._analyze_async(unique[key], key)
+
+        self.batch_stats['retried'] += len(failed)
+        results.update(await gather_bounded(
+            failed, retry_one, max_concurrency or self.max_concurrency))
+        return self._ordered(results, keys, with_fallback)
+
+    @property
+    def client(self):
+        # クライアントは初回使用時に作成する
+        if self._client is None:
+            import openai
+            self._client = openai.OpenAI(api_key=self.api_key)
+        return self._client
+
+    @client.setter
+    def client(self, value):
+        self._client = value
+
+    @property
+    def async_client(self):
+        # 非同期クライアントも初回使用時に作成する（再試行は retry_async で行う）
+        if self._async_client is None:
+            import openai
+            self._async_client = openai.AsyncOpenAI(api_key=self.api_key, max_retries=0)
+        return self._async_client
+
+    def _build_prompt(self, text_responses):
+        return self.PROMPT_TEMPLATE.format(
+            responses=json.dumps(text_responses, ensure_ascii=False),
+            skills=", ".join(self.skills),
+        )
+
+    def _cache_key(self, text_responses, template=None):
+        # キーはプロンプト（システムプロンプト + テンプレート）ごとに分かれる
+        return AnalysisCache.make_key(
+            text_responses, self.SYSTEM_PROMPT + (template or self.PROMPT_TEMPLATE),
+            self.MODEL, self.TEMPERATURE)
+
+    def _batch_cache_key(self, text_responses):
+        return self._cache_key(text_responses, template=BATCH_PROMPT_TEMPLATE)
+
+    def _fallback_scores(self, text_responses):
+        return self._fill_scores(text_responses, {})
+
+    def _fill_scores(self, text_responses, partial):
+        """
+        AI から届いた項目はそのまま使い、足りない項目をローカルの推定で補います。
+        補った場合は fallbacks に数えます。
+        """
+        if len(partial) >= len(self.skills):
+            return {skill: partial[skill] for skill in self.skills}
+        self.fallbacks += 1
+        metrics.inc('analyzer_fallbacks_total')
+        estimate = self.fallback.analyze(text_responses)
+        return {skill: partial[skill] if skill in partial else estimate.get(skill, 1.0)
+                for skill in self.skills}
+
+    def _messages(self, prompt):
+        return [
+            {"role": "system", "content": self.SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+
+    def _completion_options(self, response_format=None, **options):
+        # JSONで受け取る設定と temperature は、指定したクラス（または呼び出し）だけ送る
+        response_format = response_format or self.RESPONSE_FORMAT
+        if response_format is not None:
+            options['response_format'] = response_format
+        if self.TEMPERATURE is not None:
+            options['temperature'] = self.TEMPERATURE
+        return options
+
+    def _estimate_tokens(self, prompt):
+        # 日本語は概ね1文字1トークン前後。出力（15項目のJSON）分を上乗せする
+        return len(self.SYSTEM_PROMPT) + len(prompt) + self.EXPECTED_OUTPUT_TOKENS
+
+    def _request_scores(self, prompt):
+        """APIを呼び出してスコアを取得します。失敗時は例外を送出します。"""
+        with metrics.llm_call('sync') as call:
+            response = self.client.chat.completions.create(
+                model=self.MODEL,
+                messages=self._messages(prompt),
+                **self._completion_options()
+            )
+            call.usage = getattr(response, 'usage', None)
+        return self._parse_scores(response.choices[0].message.content)
+
+    def _request_scores_stream(self, prompt, emit):
+        """
+        ストリーミングで回答を受け取り、完成した (スキル名, 値) の組を emit に渡します。
+
+        Returns:
+            bool: 出力が上限で途切れず、JSON が閉じていれば True
+        """
+        parser = ScoreStreamParser()
+        finish_reason = None
+        with metrics.llm_call('stream') as call:
+            stream = self.client.chat.completions.create(
+                model=self.MODEL,
+                messages=self._messages(prompt),
+                **self._completion_options(stream=True)
+            )
+            for chunk in stream:
+                # 利用量は（送られてくる場合）最後のチャンクに入る
+                call.usage = getattr(chunk, 'usage', None) or call.usage
+                if not chunk.choices:
+                    continue
+                choice = chunk.choices[0]
+                emit(parser.feed(getattr(choice.delta, 'content', None) or ''))
+                finish_reason = choice.finish_reason or finish_reason
+        truncated = finish_reason == 'length' or not parser.done
+        emit(parser.close(truncated=truncated))
+        return not truncated
+
+    async def _request_completion_async(self, call_type, prompt, estimated, response_format=None):
+        """レート制限・再試行つきで非同期に1回呼び出し、応答を返します。"""
+        async def attempt():
+            await self.rate_limiter.acquire(estimated)
+            with metrics.llm_call(call_type) as call:
+                response = await self.async_client.chat.completions.create(
+                    model=self.MODEL,
+                    messages=self._messages(prompt),
+                    **self._completion_options(response_format)
+                )
+                call.usage = usage = getattr(response, 'usage', None)
+            self.rate_limiter.record_usage(estimated, getattr(usage, 'total_tokens', None))
+            return response
+
+        return await retry_async(attempt, max_retries=self.max_retries)
+
+    async def _request_scores_async(self, prompt):
+        response = await self._request_completion_async('async', prompt, self._estimate_tokens(prompt))
+        return self._parse_scores(response.choices[0].message.content)
+
+    def _batch_fixed_tokens(self):
+        # バッチの人数によらない部分（システムプロンプト・指示文・評価項目）
+        return len(self.SYSTEM_PROMPT) + len(build_batch_prompt([], self.skills, self.SCORE_RANGE))
+
+    async def _request_batch_async(self, batch):
+        """
+        1バッチ分を分析します。リクエスト自体が失敗した場合も例外は送出せず、
+        全員を失敗として返します（個別の再分析に回すため）。
+
+        Returns:
+            tuple: (候補者 ID → スコアの dict, 失敗した候補者 ID のリスト)
+        """
+        ids = [cid for cid, _, _ in batch]
+        prompt = build_batch_prompt([(cid, responses) for cid, responses, _ in batch],
+                                    self.skills, self.SCORE_RANGE)
+        estimated = self._estimate_tokens(prompt) + (len(batch) - 1) * self.EXPECTED_OUTPUT_TOKENS
+
+        try:
+            response = await self._request_completion_async('batch', prompt, estimated,
+                                                            self.BATCH_RESPONSE_FORMAT)
+        except Exception:
+            return {}, ids
+        valid, invalid = parse_batch_response(response.choices[0].message.content, ids,
+                                              self.skills, self.SCORE_RANGE)
+        if invalid:
+            metrics.inc('parse_failures_total', len(invalid), call='batch')
+        return valid, invalid
+
+    def _parse_scores(self, content):
+        """
+        前置きや ```json のフェンスがあっても読み取ります。
+        途中で途切れた・項目が欠けた回答は、読み取れた分を持つ IncompleteScores を送出します
+        （キャッシュに保存しないため）。
+        """
+        try:
+            scores, complete = parse_scores(content, self.skills)
+        except ValueError:
+            metrics.inc('parse_failures_total', call='single')
+            raise
+        if not complete:
+            metrics.inc('parse_failures_total', call='incomplete')
+            raise IncompleteScores(scores, self.skills)
+        return scores
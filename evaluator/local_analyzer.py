@@ -0,0 +1,230 @@
+"""
+API を使わずに、回答テキストの簡単な特徴から15スキルのスコアを推定するローカルの分析器。
+
+TextAnalyzer と同じ analyze(text_responses) -> dict の形で使えます。
+LLM の結果を待つ間に先に表示する「簡易推定」と、API が使えないときの代わりのスコア
+（TextAnalyzer の fallback）に使います。決定的で、1件あたり数十マイクロ秒で終わります。
+
+見ている特徴:
+    - 回答の長さと文の数（4問すべて）
+    - 読み取り・エピソード・相談の場面ごとのキーワード
+    - 計算問題（c_t_val）の答えが 1,200 × 6 × 20 = 144,000 と一致するか、式を書いているか
+文章から分からない身体面のスキル（運動能力など）は 1.0 とします。
+"""
+import re
+import unicodedata
+
+from .skills import SKILLS
+
+# 計算問題: 時給1,200円で、1日6時間、月に20日間働いたときの合計
+CALC_FACTORS = (1200, 6, 20)
+CALC_ANSWER = 1200 * 6 * 20
+# 途中の計算（1日分・1時間×20日分・1か月の時間数）
+CALC_PARTIALS = (1200 * 6, 1200 * 20, 6 * 20)
+
+# 読み取り: 「働くことのお金以外の意味」でメッセージの内容に触れているか
+READING_KEYWORDS = (
+    "社会", "つなが", "繋が", "役に立", "役立", "貢献", "力を発揮", "自分の力", "成長",
+    "やりがい", "生きがい", "居場所", "自信", "感謝", "仲間", "人の役", "誰かの",
+)
+# エピソード: 相手（誰と）と気持ち（どう感じたか）を書いているか
+RELATION_KEYWORDS = (
+    "友達", "友人", "家族", "母", "父", "兄", "姉", "弟", "妹", "祖", "先生", "同僚", "仲間",
+    "相手", "近所", "お客", "利用者", "先輩", "後輩", "スタッフ", "みんな", "一緒",
+)
+FEELING_KEYWORDS = (
+    "嬉し", "うれし", "良かった", "よかった", "楽し", "ありがとう", "感謝", "安心", "感じ",
+    "喜", "助か", "笑顔", "思いました", "思った",
+)
+# 相談の場面: 謝る・何が起きたかを伝える・次にどうするかを相談する
+APOLOGY_KEYWORDS = ("すみません", "すいません", "申し訳", "ごめんなさい", "失礼しました")
+REPORT_KEYWORDS = ("壊し", "壊れ", "こわし", "こわれ", "破損", "割れ", "割って", "折れ", "不具合")
+CONSULT_KEYWORDS = (
+    "どうすれば", "どうしたら", "相談", "指示", "確認", "報告", "弁償", "片付け", "代わり",
+    "修理", "交換", "気をつけ", "気を付け",
+)
+# 責任を避ける言い方は減点する
+EVASIVE_KEYWORDS = ("勝手に", "知らない", "最初から壊れ", "自分のせいじゃ", "私じゃ", "僕じゃ")
+POLITE_ENDINGS = ("です", "ます", "ました", "ません", "ございます", "ください")
+
+# 回答ごとの「十分な長さ」（文字数。空白を除く）
+TARGET_LENGTHS = {'r_t_val': 60, 'w_t_val': 80, 'c_t_val': 15, 'm_t_val': 40}
+
+# 4つの観点（reading / writing / calculation / communication）と補助の特徴から、
+# 各スキルをどの特徴の平均で推定するか（空のタプルは推定しない = 1.0）
+SKILL_FEATURES = {
+    "読解力": ("reading",),
+    "文書作成力": ("writing", "structure"),
+    "計算力": ("calculation",),
+    "時間管理能力": ("completion",),
+    "容儀": ("politeness",),
+    "運動能力": (),
+    "モビリティ": (),
+    "身体的耐性": (),
+    "集中力": ("calculation", "completion"),
+    "問題解決力": ("calculation", "consult"),
+    "協力・チーム力": ("writing", "communication"),
+    "コミュニケーション力": ("communication",),
+    "柔軟性": ("reading", "writing"),
+    "個人業務遂行力": ("completion", "structure"),
+    "サービスパフォーマンス": ("communication", "politeness"),
+}
+
+
+def _lexicon(words):
+    """語のいずれかに当たる正規表現を作ります。"""
+    return re.compile('|'.join(map(re.escape, words)))
+
+
+_NUMBER = re.compile(r'\d+(?:\.\d+)?')
+# 「14万4千」「14万4000」「14.4万」
+_MAN = re.compile(r'(\d+(?:\.\d+)?)万(?:(\d+)千|(\d+))?')
+_THOUSANDS_SEP = re.compile(r'(?<=\d),(?=\d{3})')
+_OPERATOR = re.compile(r'[×xX*✕]|かけ|掛け')
+_SENTENCE_END = re.compile(r'[。！？!?\n]+')
+_SPACE = re.compile(r'\s+')
+
+_READING = _lexicon(READING_KEYWORDS)
+_RELATION = _lexicon(RELATION_KEYWORDS)
+_FEELING = _lexicon(FEELING_KEYWORDS)
+_APOLOGY = _lexicon(APOLOGY_KEYWORDS)
+_REPORT = _lexicon(REPORT_KEYWORDS)
+_CONSULT = _lexicon(CONSULT_KEYWORDS)
+_EVASIVE = _lexicon(EVASIVE_KEYWORDS)
+_POLITE = _lexicon(POLITE_ENDINGS)
+
+
+def normalize(text):
+    """全角の数字・記号を半角にそろえ、桁区切りのカンマを取り除きます。"""
+    return _THOUSANDS_SEP.sub('', unicodedata.normalize('NFKC', str(text or '')))
+
+
+def extract_numbers(text):
+    """正規化済みのテキストに含まれる数（「14万4千」などの万・千の表記を含む）の集合を返します。"""
+    numbers = set()
+    for m in _MAN.finditer(text):
+        value = float(m.group(1)) * 10000
+        if m.group(2):
+            value += int(m.group(2)) * 1000
+        elif m.group(3):
+            value += int(m.group(3))
+        numbers.add(value)
+    numbers.update(float(n) for n in _NUMBER.findall(text))
+    return numbers
+
+
+def _count(pattern, text, limit):
+    """pattern に当たる異なる語の数（limit で打ち切り）。"""
+    return min(limit, len(set(pattern.findall(text))))
+
+
+def _has(pattern, text):
+    return 1 if pattern.search(text) else 0
+
+
+def _length_score(chars, target):
+    """空なら 0、target 文字以上で 1 になる値（0〜1）。"""
+    return min(1.0, chars / target) if target else 0.0
+
+
+class LocalAnalyzer:
+    """回答テキストの特徴から15スキルを推定する、API を使わない分析器。"""
+    SCORE_RANGE = (0.5, 2.0)
+    NEUTRAL_SCORE = 1.0
+
+    def __init__(self):
+        self.skills = list(SKILLS)
+
+    def analyze(self, text_responses, stream=False, on_score=None):
+        """
+        回答を分析してスキル名 → スコアの dict を返します。
+        stream=True の場合は TextAnalyzer と同じく、1項目ごとに on_score を呼び出します。
+        """
+        result = self._scores(self.features(text_responses))
+        if stream and on_score is not None:
+            partial = {}
+            for skill, value in result.items():
+                partial[skill] = value
+                on_score(skill, value, dict(partial))
+        return result
+
+    def analyze_many(self, responses_list, max_concurrency=None, with_fallback=False):
+        """
+        複数人の回答を分析します（結果は入力と同じ順序）。
+        with_fallback=True の場合は TextAnalyzer と同じく (スコア, False) のリストを返します
+        （この分析器の推定は他の分析器の代わりではないため、常に False です）。
+        """
+        results = [self.analyze(responses) for responses in responses_list]
+        return [(scores, False) for scores in results] if with_fallback else results
+
+    def analyze_batched(self, responses_list, max_batch_size=None, token_budget=None,
+                        max_concurrency=None, with_fallback=False):
+        """analyze_many と同じです（API を使わないため、まとめる必要はありません）。"""
+        return self.analyze_many(responses_list, with_fallback=with_fallback)
+
+    async def analyze_async(self, text_responses, key=None):
+        return self.analyze(text_responses)
+
+    async def analyze_many_async(self, responses_list, max_concurrency=None, with_fallback=False):
+        return self.analyze_many(responses_list, with_fallback=with_fallback)
+
+    def features(self, text_responses):
+        """
+        回答から各観点の特徴を求めます。
+
+        Returns:
+            dict: reading / writing / calculation / communication / politeness / consult /
+            structure / completion（いずれも 0〜1）
+        """
+        texts = {key: normalize(text_responses.get(key, '')) for key in TARGET_LENGTHS}
+        compact = {key: _SPACE.sub('', text) for key, text in texts.items()}
+        lengths = {key: _length_score(len(text), TARGET_LENGTHS[key])
+                   for key, text in compact.items()}
+
+        reading, episode, answer, reply = (compact[k] for k in ('r_t_val', 'w_t_val', 'c_t_val', 'm_t_val'))
+        sentences = sum(len([s for s in _SENTENCE_END.split(texts[k]) if s.strip()])
+                        for k in ('r_t_val', 'w_t_val', 'm_t_val'))
+        polite = sum(_has(_POLITE, compact[k]) for k in ('r_t_val', 'w_t_val', 'm_t_val'))
+        answered = sum(1 for text in compact.values() if text)
+
+        consult = _count(_CONSULT, reply, 2) / 2
+        communication = (0.3 * _has(_APOLOGY, reply) + 0.25 * _has(_REPORT, reply) + 0.25 * consult
+                         + 0.2 * lengths['m_t_val'] - 0.4 * _has(_EVASIVE, reply)) if reply else 0.0
+        return {
+            'reading': (0.5 * lengths['r_t_val'] + 0.25 * _count(_READING, reading, 2)) if reading else 0.0,
+            'writing': (0.4 * lengths['w_t_val'] + 0.3 * _has(_RELATION, episode)
+                        + 0.3 * _has(_FEELING, episode)) if episode else 0.0,
+            'calculation': self.calculation_feature(answer),
+            'communication': max(0.0, communication),
+            'politeness': polite / 3,
+            'consult': consult,
+            'structure': min(1.0, sentences / 6),
+            'completion': answered / len(TARGET_LENGTHS),
+        }
+
+    @staticmethod
+    def calculation_feature(answer):
+        """
+        計算問題の回答を採点します（0〜1）。
+        答えが 144,000 と一致すれば 0.75、さらに式（掛け算の記号と 1200・6・20）や
+        途中の計算が書かれていれば加点します。答えが違っても式が正しければ部分点です。
+        """
+        if not answer:
+            return 0.0
+        numbers = extract_numbers(answer)
+        shows_formula = bool(_OPERATOR.search(answer)) and all(f in numbers for f in CALC_FACTORS)
+        shows_steps = any(p in numbers for p in CALC_PARTIALS)
+        if CALC_ANSWER in numbers:
+            return 0.75 + 0.15 * shows_formula + 0.1 * shows_steps
+        return 0.1 + 0.2 * shows_formula + 0.1 * shows_steps
+
+    def _scores(self, features):
+        low, high = self.SCORE_RANGE
+        scores = {}
+        for skill in self.skills:
+            names = SKILL_FEATURES.get(skill, ())
+            if names:
+                scores[skill] = round(low + (high - low) * sum([features[n] for n in names]) / len(names), 1)
+            else:
+                scores[skill] = self.NEUTRAL_SCORE
+        return scores
@@ -0,0 +1,90 @@
+"""
+セッションに保存するためのコンパクトなマッチング結果。
+
+match_jobs の結果（職種の dict を含む dict のリスト）の代わりに、
+職種インデックスとマッチ率の array と、プロセス共有の JobCatalog への参照だけを持ちます。
+要素を取り出すと {'job': ..., 'match_rate': ...} と同じように使える JobMatch を返すため、
+結果を表示するコードはそのまま使えます。
+"""
+from array import array
+
+
+class JobMatch:
+    """1件分のマッチング結果。m['job'] / m['match_rate'] の形でも参照できます。"""
+    __slots__ = ('job', 'match_rate')
+
+    def __init__(self, job, match_rate):
+        self.job = job
+        self.match_rate = match_rate
+
+    def __getitem__(self, key):
+        if key not in JobMatch.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in JobMatch.__slots__ else default
+
+    def keys(self):
+        return JobMatch.__slots__
+
+    def __eq__(self, other):
+        if isinstance(other, (JobMatch, dict)):
+            return self.job == other['job'] and self.match_rate == other['match_rate']
+        return NotImplemented
+
+    def __repr__(self):
+        return f"JobMatch(job={self.job.get('name')!r}, match_rate={self.match_rate})"
+
+
+class MatchList:
+    """
+    マッチング結果の読み取り専用の列（マッチ率の降順）。
+
+    職種はカタログ内の位置（array 'I'）、マッチ率は小数点第1位までの値を10倍した整数
+    （array 'h'）で保持します。職種データそのものは共有のカタログを参照するため、
+    セッションごとの使用量は件数 × 6バイト程度です。
+    """
+    __slots__ = ('catalog', 'indices', 'rates')
+
+    def __init__(self, catalog, indices=(), rates=()):
+        """
+        Args:
+            catalog (JobCatalog): 職種を参照するカタログ（変更しないこと）
+            indices: catalog.jobs 内の位置
+            rates: 丸め済みのマッチ率（%）
+        """
+        self.catalog = catalog
+        self.indices = array('I', indices)
+        self.rates = array('h', (round(rate * 10) for rate in rates))
+
+    @classmethod
+    def from_ranked(cls, catalog, ranked):
+        """(職種インデックス, マッチ率) のリストから作成します。"""
+        return cls(catalog, [i for i, _ in ranked], [rate for _, rate in ranked])
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __bool__(self):
+        return len(self.indices) > 0
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            sliced = MatchList(self.catalog)
+            sliced.indices = self.indices[item]
+            sliced.rates = self.rates[item]
+            return sliced
+        return JobMatch(self.catalog.jobs[self.indices[item]], self.rates[item] / 10)
+
+    def __iter__(self):
+        jobs = self.catalog.jobs
+        for i, rate in zip(self.indices, self.rates):
+            yield JobMatch(jobs[i], rate / 10)
+
+    def __repr__(self):
+        return f"MatchList({len(self)} matches)"
+
+    def to_list(self):
+        """match_jobs と同じ dict のリストに変換します。"""
+        return [{'job': m.job, 'match_rate': m.match_rate} for m in self]
@@ -0,0 +1,472 @@
+"""
+候補者ごとの上位k件のマッチ結果を保持する、マテリアライズされたマッチ表。
+
+職種カタログが更新されたとき、全候補者×全職種を照合し直す代わりに
+差分だけを反映します。
+
+- 追加・変更された職種は、既存の候補者とだけ照合し、各候補者の上位k件にマージする
+- 削除（または変更）された職種が上位k件に含まれていた候補者だけ、全職種と照合し直して埋め戻す
+
+上位1件の職種が変わった候補者は変更フィード（changes）に記録されます。
+並びは SamhallScorer.match_jobs と同じ（丸め後のマッチ率の降順、同率はカタログの並び順）です。
+
+    python -m evaluator.match_table            # 評価ストアの候補者とカタログを同期して変更を表示
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from .batch_matcher import build_candidate_matrix, build_condition_masks, match_rate_matrix
+from .skill_kernel import JobVectors, round_rates, top_k_indices
+from .skills import N_SKILLS
+
+DEFAULT_MATCH_TABLE_PATH = os.getenv('MATCH_TABLE_PATH', 'data/match_table.sqlite3')
+
+# 全件照合時に一度に作る マッチ率行列 の要素数の上限（メモリ使用量の目安）
+CHUNK_ELEMENTS = 2_000_000
+
+# 変更フィードに記録する理由
+REASON_CANDIDATE = 'candidate'
+REASON_JOB_ADDED = 'job_added'
+REASON_JOB_CHANGED = 'job_changed'
+REASON_JOB_REMOVED = 'job_removed'
+REASON_REBUILD = 'rebuild'
+
+_EMPTY = -1
+
+
+def job_fingerprint(job):
+    """職種の内容のハッシュ。値が変わった職種だけを照合し直すために使います。"""
+    data = json.dumps(job, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+def candidates_from_store(store):
+    """EvaluationStore の候補者ごとの最新の評価を (candidate_id, scores) のリストにします。"""
+    return [(e['candidate_id'], e.get('scores') or {}) for e in store.latest_per_candidate()]
+
+
+class MatchTable:
+    """
+    候補者ごとの上位k件（職種ID・マッチ率）を SQLite に保持し、
+    候補者や職種カタログの変更を差分で反映します。
+    """
+
+    def __init__(self, path=DEFAULT_MATCH_TABLE_PATH, top_k=10):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.top_k = top_k
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS match_jobs (
+                    job_id INTEGER PRIMARY KEY,
+                    position INTEGER NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    payload TEXT NOT NULL
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS match_candidates (
+                    candidate_id TEXT PRIMARY KEY,
+                    scores TEXT NOT NULL,
+                    top TEXT NOT NULL,
+                    top_job_id INTEGER,
+                    top_match_rate REAL
+                )
+            """)
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_match_top_job ON match_candidates(top_job_id)')
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS match_changes (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    candidate_id TEXT NOT NULL,
+                    changed_at TEXT NOT NULL,
+                    previous_job_id INTEGER,
+                    job_id INTEGER,
+                    match_rate REAL,
+                    reason TEXT NOT NULL
+                )
+            """)
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS match_meta (key TEXT PRIMARY KEY, value TEXT)')
+        self._load()
+
+    # --- 読み込み ---
+
+    def _load(self):
+        rows = self._conn.execute(
+            'SELECT job_id, fingerprint, payload FROM match_jobs ORDER BY position').fetchall()
+        self._set_jobs([json.loads(p) for _, _, p in rows], [f for _, f, _ in rows])
+
+        rows = self._conn.execute(
+            'SELECT candidate_id, scores, top FROM match_candidates ORDER BY rowid').fetchall()
+        self._ids = [r[0] for r in rows]
+        self._row_of = {cid: i for i, cid in enumerate(self._ids)}
+        self._scores = [json.loads(r[1]) for r in rows]
+        self._matrix, self._skills, self._physical, self._environment = \
+            build_candidate_matrix(self._scores)
+        self._top_jobs = np.full((len(rows), self.top_k), _EMPTY, dtype=np.int64)
+        self._top_rates = np.full((len(rows), self.top_k), -np.inf)
+        for i, r in enumerate(rows):
+            top = json.loads(r[2])[:self.top_k]
+            if top:
+                self._top_jobs[i, :len(top)] = [job_id for job_id, _ in top]
+                self._top_rates[i, :len(top)] = [rate for _, rate in top]
+
+        stored_k = self._conn.execute(
+            "SELECT value FROM match_meta WHERE key = 'top_k'").fetchone()
+        if stored_k is not None and int(stored_k[0]) != self.top_k and self._ids:
+            # 保存時と k が異なる場合は全件を照合し直す
+            rows = np.arange(len(self._ids))
+            reasons, previous = self._refresh(rows, REASON_REBUILD)
+            self._save(rows, previous, reasons)
+        with self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO match_meta VALUES ('top_k', ?)",
+                               (str(self.top_k),))
+
+    def _set_jobs(self, jobs, fingerprints):
+        self._jobs = jobs
+        self._fingerprints = dict(zip((j['id'] for j in jobs), fingerprints))
+        self._job_ids = np.array([j['id'] for j in jobs], dtype=np.int64)
+        self._position = {job_id: i for i, job_id in enumerate(self._job_ids.tolist())}
+        self._id_order = np.argsort(self._job_ids, kind='stable')
+        self._sorted_ids = self._job_ids[self._id_order]
+        self._vectors = JobVectors(jobs)
+
+    # --- 照合 ---
+
+    def _positions(self, job_ids):
+        """職種ID の配列をカタログ上の位置に変換します（空き枠は末尾扱い）。"""
+        n = len(self._sorted_ids)
+        if not n:
+            return np.zeros(job_ids.shape, dtype=np.int64)
+        idx = np.minimum(np.searchsorted(self._sorted_ids, job_ids), n - 1)
+        found = self._sorted_ids[idx] == job_ids
+        return np.where(found, self._id_order[idx], n)
+
+    def _rates(self, rows, job_rows=None):
+        """rows の候補者と、全職種（job_rows を指定するとその位置の職種）とのマッチ率行列。"""
+        heavy_mask, env_mask = build_condition_masks(
+            [self._physical[i] for i in rows], [self._environment[i] for i in rows],
+            self._vectors, job_rows)
+        return match_rate_matrix(self._matrix[rows], self._vectors, heavy_mask, env_mask, job_rows,
+                                 [self._skills[i] for i in rows])
+
+    def _full_top(self, rows):
+        """rows の候補者を全職種と照合し、上位k件を求めます。"""
+        jobs = np.full((len(rows), self.top_k), _EMPTY, dtype=np.int64)
+        rates = np.full((len(rows), self.top_k), -np.inf)
+        if not len(self._jobs):
+            return jobs, rates
+        chunk = max(1, CHUNK_ELEMENTS // len(self._jobs))
+        for start in range(0, len(rows), chunk):
+            part = rows[start:start + chunk]
+            matrix = self._rates(part)
+            for offset, idx in enumerate(top_k_indices(matrix, self.top_k)):
+                r = start + offset
+                jobs[r, :len(idx)] = self._job_ids[idx]
+                rates[r, :len(idx)] = [round(float(matrix[offset, j]), 1) for j in idx]
+        return jobs, rates
+
+    def _merge(self, rows, new_jobs):
+        """
+        rows の候補者の現在の上位k件に、new_jobs（カタログ上の位置）の照合結果をマージします。
+        rows の上位k件に削除・変更された職種が含まれていないことが前提です。
+        """
+        chunk = max(1, CHUNK_ELEMENTS // max(1, len(new_jobs) + self.top_k))
+        new_ids = self._job_ids[new_jobs]
+        for start in range(0, len(rows), chunk):
+            part = rows[start:start + chunk]
+            new_rates = round_rates(self._rates(part, new_jobs))
+            ids = np.concatenate([self._top_jobs[part], np.broadcast_to(new_ids, new_rates.shape)], axis=1)
+            rates = np.concatenate([self._top_rates[part], new_rates], axis=1)
+            order = np.lexsort((self._positions(ids), -rates), axis=1)[:, :self.top_k]
+            self._top_jobs[part] = np.take_along_axis(ids, order, axis=1)
+            self._top_rates[part] = np.take_along_axis(rates, order, axis=1)
+
+    def _refresh(self, rows, reason):
+        previous = self._top_jobs[rows, 0].copy()
+        self._top_jobs[rows], self._top_rates[rows] = self._full_top(rows)
+        return {int(r): reason for r in rows}, previous
+
+    # --- 更新 ---
+
+    def upsert_candidates(self, candidates):
+        """
+        候補者（(candidate_id, scores) の列）を追加・更新し、現在のカタログと照合します。
+        スコアが変わっていない候補者は照合し直しません。
+
+        Returns:
+            int: 照合した候補者数
+        """
+        with self._lock:
+            updated, appended = {}, {}
+            for candidate_id, scores in candidates:
+                scores = dict(scores or {})
+                row = self._row_of.get(candidate_id)
+                if row is None:
+                    appended[candidate_id] = scores
+                elif self._scores[row] != scores:
+                    updated[row] = scores
+
+            # 新しい候補者は配列の末尾にまとめて追加する
+            if appended:
+                start = len(self._ids)
+                for offset, (candidate_id, scores) in enumerate(appended.items()):
+                    self._row_of[candidate_id] = start + offset
+                    updated[start + offset] = scores
+                self._ids.extend(appended)
+                self._scores.extend(appended.values())
+                self._skills.extend([None] * len(appended))
+                self._physical.extend([''] * len(appended))
+                self._environment.extend([''] * len(appended))
+                self._matrix = np.vstack([self._matrix, np.zeros((len(appended), N_SKILLS))])
+                self._top_jobs = np.vstack(
+                    [self._top_jobs, np.full((len(appended), self.top_k), _EMPTY, dtype=np.int64)])
+                self._top_rates = np.vstack(
+                    [self._top_rates, np.full((len(appended), self.top_k), -np.inf)])
+
+            rows = sorted(updated)
+            if rows:
+                vectors, skills, physical, environment = build_candidate_matrix(
+                    [updated[r] for r in rows])
+                self._matrix[rows] = vectors
+                for r, k, p, e in zip(rows, skills, physical, environment):
+                    self._scores[r] = updated[r]
+                    self._skills[r], self._physical[r], self._environment[r] = k, p, e
+            if not rows:
+                return 0
+            rows = np.array(rows, dtype=np.int64)
+            reasons, previous = self._refresh(rows, REASON_CANDIDATE)
+            self._save(rows, previous, reasons, save_scores=True)
+            return len(rows)
+
+    def remove_candidates(self, candidate_ids):
+        """候補者をマッチ表から削除します。"""
+        with self._lock:
+            removed = [cid for cid in candidate_ids if cid in self._row_of]
+            if not removed:
+                return 0
+            keep = np.ones(len(self._ids), dtype=bool)
+            keep[[self._row_of[cid] for cid in removed]] = False
+            index = np.flatnonzero(keep)
+            self._ids = [self._ids[i] for i in index]
+            self._scores = [self._scores[i] for i in index]
+            self._skills = [self._skills[i] for i in index]
+            self._physical = [self._physical[i] for i in index]
+            self._environment = [self._environment[i] for i in index]
+            self._matrix = self._matrix[keep]
+            self._top_jobs, self._top_rates = self._top_jobs[keep], self._top_rates[keep]
+            self._row_of = {cid: i for i, cid in enumerate(self._ids)}
+            with self._conn:
+                self._conn.executemany('DELETE FROM match_candidates WHERE candidate_id = ?',
+                                       [(cid,) for cid in removed])
+            return len(removed)
+
+    def sync_catalog(self, catalog):
+        """
+        職種カタログ（JobCatalog または職種のリスト）との差分を反映します。
+        id を持たない職種は対象外です。
+
+        Returns:
+            dict: added / changed / removed（職種数）、rescored（全職種と照合し直した候補者数）、
+                  merged（差分だけマージした候補者数）、changes（変更フィードに記録した件数）
+        """
+        jobs = [job for job in catalog if isinstance(job, dict) and 'id' in job]
+        ids = [job['id'] for job in jobs]
+        if len(set(ids)) != len(ids):
+            raise ValueError("job ids in the catalog must be unique")
+        fingerprints = [job_fingerprint(job) for job in jobs]
+
+        with self._lock:
+            old = self._fingerprints
+            new = dict(zip(ids, fingerprints))
+            added = [i for i in ids if i not in old]
+            changed = [i for i in ids if i in old and old[i] != new[i]]
+            removed = [i for i in old if i not in new]
+
+            # 残った職種の並び順が変わると同率の順位が変わるため、その場合は全件照合し直す
+            old_order = [self._position[i] for i in ids if i in old]
+            reordered = any(a > b for a, b in zip(old_order, old_order[1:]))
+
+            self._set_jobs(jobs, fingerprints)
+            summary = {'added': len(added), 'changed': len(changed), 'removed': len(removed),
+                       'rescored': 0, 'merged': 0, 'changes': 0}
+            n = len(self._ids)
+            if not n or not (added or changed or removed or reordered):
+                self._save_jobs(changed or added or removed or reordered)
+                return summary
+
+            before_jobs, before_rates = self._top_jobs.copy(), self._top_rates.copy()
+            reasons = {}
+            if reordered:
+                reasons, _ = self._refresh(np.arange(n), REASON_REBUILD)
+                summary['rescored'] = n
+            else:
+                # 削除・変更された職種を上位k件に含む候補者は、全職種と照合して埋め戻す
+                stale = np.isin(self._top_jobs, np.array(removed + changed, dtype=np.int64)).any(axis=1)
+                backfill = np.flatnonzero(stale)
+                if len(backfill):
+                    self._refresh(backfill, REASON_JOB_REMOVED)
+                    summary['rescored'] = len(backfill)
+                # それ以外の候補者は、追加・変更された職種とだけ照合してマージする
+                fresh = added + changed
+                rest = np.flatnonzero(~stale)
+                if fresh and len(rest):
+                    self._merge(rest, np.array([self._position[i] for i in fresh], dtype=np.int64))
+                    summary['merged'] = len(rest)
+
+                added_set, changed_set = set(added), set(changed)
+                for r in np.flatnonzero(self._top_jobs[:, 0] != before_jobs[:, 0]).tolist():
+                    top = int(self._top_jobs[r, 0])
+                    if top in added_set:
+                        reasons[r] = REASON_JOB_ADDED
+                    elif top in changed_set:
+                        reasons[r] = REASON_JOB_CHANGED
+                    else:
+                        reasons[r] = REASON_JOB_REMOVED
+
+            # 上位k件が変わった候補者だけを書き戻す
+            rows = np.flatnonzero((self._top_jobs != before_jobs).any(axis=1)
+                                  | (self._top_rates != before_rates).any(axis=1))
+            previous = before_jobs[rows, 0]
+            summary['changes'] = self._save(rows, previous, reasons)
+            self._save_jobs(True)
+            return summary
+
+    # --- 保存 ---
+
+    def _save_jobs(self, dirty):
+        if not dirty:
+            return
+        with self._conn:
+            self._conn.execute('DELETE FROM match_jobs')
+            self._conn.executemany(
+                'INSERT INTO match_jobs (job_id, position, fingerprint, payload) VALUES (?, ?, ?, ?)',
+                [(job['id'], i, self._fingerprints[job['id']], json.dumps(job, ensure_ascii=False))
+                 for i, job in enumerate(self._jobs)])
+
+    def _top_list(self, row):
+        return [[int(j), float(r)] for j, r in zip(self._top_jobs[row], self._top_rates[row])
+                if j != _EMPTY]
+
+    def _save(self, rows, previous, reasons, save_scores=False):
+        """
+        rows の上位k件を保存し、上位1件が変わった候補者を変更フィードに記録します。
+
+        Returns:
+            int: 変更フィードに記録した件数
+        """
+        now = datetime.now().isoformat(timespec='seconds')
+        updates, feed = [], []
+        for pos, row in enumerate(rows.tolist()):
+            top = self._top_list(row)
+            job_id, rate = (top[0] if top else (None, None))
+            updates.append((self._ids[row], json.dumps(self._scores[row], ensure_ascii=False),
+                            json.dumps(top), job_id, rate))
+            before = int(previous[pos])
+            before = None if before == _EMPTY else before
+            if job_id != before and row in reasons:
+                feed.append((self._ids[row], now, before, job_id, rate, reasons[row]))
+        with self._conn:
+            if save_scores:
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO match_candidates '
+                    '(candidate_id, scores, top, top_job_id, top_match_rate) VALUES (?, ?, ?, ?, ?)',
+                    updates)
+            else:
+                self._conn.executemany(
+                    'UPDATE match_candidates SET top = ?, top_job_id = ?, top_match_rate = ? '
+                    'WHERE candidate_id = ?', [(u[2], u[3], u[4], u[0]) for u in updates])
+            self._conn.executemany(
+                'INSERT INTO match_changes (candidate_id, changed_at, previous_job_id, job_id, '
+                'match_rate, reason) VALUES (?, ?, ?, ?, ?, ?)', feed)
+        return len(feed)
+
+    # --- 参照 ---
+
+    def top(self, candidate_id):
+        """候補者の上位k件（job_id, match_rate の dict のリスト）を返します。"""
+        with self._lock:
+            row = self._row_of.get(candidate_id)
+            if row is None:
+                return []
+            return [{'job_id': j, 'match_rate': r} for j, r in self._top_list(row)]
+
+    def candidates_with_top_job(self, job_id):
+        """上位1件が job_id の候補者IDを返します。"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT candidate_id FROM match_candidates WHERE top_job_id = ? ORDER BY candidate_id',
+                (job_id,)).fetchall()
+        return [r[0] for r in rows]
+
+    def changes(self, since=0, limit=None):
+        """
+        変更フィード: seq が since より大きい記録を古い順に返します。
+        返した最後の seq を次回の since に渡すと、続きから読めます。
+        """
+        sql = ('SELECT seq, candidate_id, changed_at, previous_job_id, job_id, match_rate, reason '
+               'FROM match_changes WHERE seq > ? ORDER BY seq')
+        params = [since]
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        keys = ('seq', 'candidate_id', 'changed_at', 'previous_job_id', 'job_id', 'match_rate', 'reason')
+        return [dict(zip(keys, r)) for r in rows]
+
+    def last_seq(self):
+        """変更フィードの最新の seq（記録がなければ 0）を返します。"""
+        with self._lock:
+            return self._conn.execute('SELECT COALESCE(MAX(seq), 0) FROM match_changes').fetchone()[0]
+
+    def __len__(self):
+        return len(self._ids)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def main(argv=None):
+    from .job_catalog import DEFAULT_DB_PATH, JobCatalog
+
+    parser = argparse.ArgumentParser(description='評価ストアの候補者と職種カタログをマッチ表に同期します')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help='job_database.json のパス')
+    parser.add_argument('--table', default=DEFAULT_MATCH_TABLE_PATH, help='マッチ表の SQLite パス')
+    parser.add_argument('--store', help='評価ストアの SQLite パス（既定: EVALUATION_STORE_PATH）')
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--since', type=int, help='この seq より後の変更フィードを表示')
+    args = parser.parse_args(argv)
+
+    from utils.evaluation_store import EvaluationStore, get_evaluation_store
+    store = EvaluationStore(args.store) if args.store else get_evaluation_store()
+    table = MatchTable(args.table, top_k=args.top_k)
+    since = table.last_seq() if args.since is None else args.since
+
+    # カタログを先に反映してから候補者を照合する（新しい候補者を古いカタログで照合しないため）
+    summary = table.sync_catalog(JobCatalog.load(args.db))
+    scored = table.upsert_candidates(candidates_from_store(store))
+    print(f"catalog: +{summary['added']} ~{summary['changed']} -{summary['removed']} jobs, "
+          f"rescored {summary['rescored']}, merged {summary['merged']}; "
+          f"candidates scored {scored} (total {len(table)})")
+    for change in table.changes(since=since):
+        print(f"{change['seq']}\t{change['candidate_id']}\t{change['previous_job_id']} -> "
+              f"{change['job_id']} ({change['match_rate']})\t{change['reason']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,426 @@
+"""
+評価パイプラインの計測（処理段階ごとの所要時間・カウンター・ヒストグラム）と、Prometheus 形式での出力。
+
+    from evaluator import metrics
+
+    with metrics.span('match_jobs'):            # olys_stage_seconds{stage="match_jobs"}
+        ...
+    metrics.inc('analyzer_fallbacks_total')     # olys_analyzer_fallbacks_total
+    metrics.write_prometheus('metrics.prom')    # テキスト形式で書き出す（node_exporter の textfile 向け）
+    metrics.serve_metrics(9464)                 # http://127.0.0.1:9464/metrics で公開する
+
+値はプロセス内に保持します（1回の記録は数マイクロ秒で、常に有効にしておけます）。
+環境変数で出力先を指定できます:
+    OLYS_METRICS_FILE     write_from_env で書き出すファイル
+    OLYS_METRICS_PORT     start_from_env で公開するポート（127.0.0.1 のみ）
+    OLYS_PROFILE_DIR      profiled で囲んだ処理を cProfile で計測し、遅かったものを保存するディレクトリ
+    OLYS_PROFILE_SLOW_MS  保存する下限の所要時間（ミリ秒、既定 1000）
+    OLYS_PROFILE_SAMPLE   計測する割合（0〜1、既定 1.0）
+"""
+import functools
+import logging
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+PREFIX = 'olys_'
+# 秒単位のヒストグラムの区切り（0.5ms 〜 30s）
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0)
+
+METRICS_FILE_ENV = 'OLYS_METRICS_FILE'
+METRICS_PORT_ENV = 'OLYS_METRICS_PORT'
+PROFILE_DIR_ENV = 'OLYS_PROFILE_DIR'
+PROFILE_SLOW_ENV = 'OLYS_PROFILE_SLOW_MS'
+PROFILE_SAMPLE_ENV = 'OLYS_PROFILE_SAMPLE'
+
+# 出力する # HELP の説明（未登録の名前は説明なしで出力する）
+METRIC_HELP = {
+    'stage_seconds': 'Time spent in each pipeline stage.',
+    'llm_request_seconds': 'Latency of each LLM API request (including failed attempts).',
+    'llm_first_score_seconds': 'Time until the first skill score arrives in a streamed analysis.',
+    'llm_requests_total': 'LLM API requests by call type and outcome.',
+    'llm_tokens_total': 'Tokens reported by the LLM API usage field.',
+    'parse_failures_total': 'LLM responses (or batch entries) whose scores could not be fully parsed.',
+    'analyzer_fallbacks_total': 'Analyses answered by the local fallback analyzer instead of the LLM.',
+    'bulk_records_total': 'Records evaluated by the bulk CLI.',
+    'bulk_invalid_lines_total': 'Input lines the bulk CLI skipped because they were not JSON objects.',
+    'profiles_saved_total': 'Slow requests saved by the cProfile hook.',
+}
+
+
+class Histogram:
+    """区切りごとの件数と、値の合計・総数を保持するヒストグラム（累積は出力時に求めます）。"""
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    """カウンターとヒストグラムをスレッドセーフに保持します。"""
+
+    def __init__(self, prefix=PREFIX, buckets=DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self.counters = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1.0, **labels):
+        self.inc_key((name, _label_key(labels)), value)
+
+    def observe(self, name, value, **labels):
+        self.observe_key((name, _label_key(labels)), value)
+
+    def inc_key(self, key, value=1.0):
+        """(名前, ラベルのタプル) の key を直接指定して増やします（計測の多い箇所向け）。"""
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0.0) + value
+
+    def observe_key(self, key, value):
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def snapshot(self):
+        """
+        現在の値を返します。
+
+        Returns:
+            dict: counters（(名前, ラベル) → 値）と histograms（(名前, ラベル) → {count, sum}）
+        """
+        with self._lock:
+            return {'counters': dict(self.counters),
+                    'histograms': {key: {'count': h.count, 'sum': h.sum}
+                                   for key, h in self.histograms.items()}}
+
+    def render(self):
+        """Prometheus のテキスト形式（version 0.0.4）で返します。"""
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((key, (list(h.counts), h.sum, h.count))
+                                for key, h in self.histograms.items())
+        lines = []
+        last = None
+        for (name, labels), value in counters:
+            if name != last:
+                _header(lines, self.prefix + name, name, 'counter')
+                last = name
+            lines.append(f"{self.prefix}{name}{_labels(labels)} {_number(value)}")
+        for (name, labels), (counts, total, count) in histograms:
+            if name != last:
+                _header(lines, self.prefix + name, name, 'histogram')
+                last = name
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append(f"{self.prefix}{name}_bucket{_labels(labels, le=_number(bound))} {cumulative}")
+            lines.append(f"{self.prefix}{name}_bucket{_labels(labels, le='+Inf')} {count}")
+            lines.append(f"{self.prefix}{name}_sum{_labels(labels)} {_number(total)}")
+            lines.append(f"{self.prefix}{name}_count{_labels(labels)} {count}")
+        return '\n'.join(lines) + '\n' if lines else ''
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items())) if len(labels) > 1 else tuple(labels.items())
+
+
+def _header(lines, full_name, name, kind):
+    if name in METRIC_HELP:
+        lines.append(f"# HELP {full_name} {METRIC_HELP[name]}")
+    lines.append(f"# TYPE {full_name} {kind}")
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(labels, le=None):
+    pairs = [f'{k}="{_escape(v)}"' for k, v in labels]
+    if le is not None:
+        pairs.append(f'le="{le}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+# プロセス全体で共有するレジストリ
+REGISTRY = Registry()
+
+
+def inc(name, value=1.0, **labels):
+    """カウンター name を value だけ増やします。"""
+    REGISTRY.inc(name, value, **labels)
+
+
+def observe(name, value, **labels):
+    """ヒストグラム name に value を記録します。"""
+    REGISTRY.observe(name, value, **labels)
+
+
+class timer:
+    """
+    ブロックの所要時間（秒）をヒストグラム name に記録します（例外で抜けた場合も記録します）。
+    with timer(...) のほか、関数のデコレーターとしても使えます。
+    """
+    __slots__ = ('key', 'started')
+
+    def __init__(self, name, **labels):
+        self.key = (name, _label_key(labels))
+        self.started = None
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        REGISTRY.observe_key(self.key, time.perf_counter() - self.started)
+        return False
+
+    def __call__(self, func):
+        key = self.key
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                REGISTRY.observe_key(key, time.perf_counter() - started)
+        return wrapper
+
+
+def span(stage):
+    """処理段階 stage の所要時間を olys_stage_seconds{stage=...} に記録します（デコレーターとしても使えます）。"""
+    return timer('stage_seconds', stage=stage)
+
+
+class _LLMCall:
+    __slots__ = ('usage',)
+
+    def __init__(self):
+        self.usage = None
+
+
+@contextmanager
+def llm_call(call):
+    """
+    LLM への1回のリクエストの所要時間・成否・トークン数を記録します。
+    ブロック内で、返ってきた usage（prompt_tokens / completion_tokens）を .usage に入れてください。
+    """
+    record = _LLMCall()
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield record
+        outcome = 'ok'
+    finally:
+        REGISTRY.observe('llm_request_seconds', time.perf_counter() - started, call=call)
+        REGISTRY.inc('llm_requests_total', call=call, outcome=outcome)
+        usage = record.usage
+        if usage is not None:
+            for kind in ('prompt', 'completion'):
+                tokens = getattr(usage, f'{kind}_tokens', None)
+                if tokens:
+                    REGISTRY.inc('llm_tokens_total', tokens, kind=kind)
+
+
+# --- 出力 ---
+
+def write_prometheus(path, registry=None):
+    """
+    テキスト形式でファイルに書き出します（一時ファイルに書いてから置き換えます）。
+    一時ファイルは書き出しごとに別の名前で作るため、複数のスレッド・プロセスが同時に書いても壊れません。
+    """
+    registry = registry or REGISTRY
+    body = registry.render()
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', delete=False,
+                                     dir=os.path.dirname(os.path.abspath(path)),
+                                     prefix=f".{os.path.basename(path)}.", suffix='.tmp') as f:
+        tmp = f.name
+        try:
+            f.write(body)
+        except BaseException:
+            f.close()
+            os.unlink(tmp)
+            raise
+    try:
+        # 収集側（node_exporter の textfile collector など）が読めるようにする
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def serve_metrics(port=0, host='127.0.0.1', registry=None):
+    """
+    /metrics でテキスト形式を返す HTTP サーバーを別スレッドで起動します。
+
+    Returns:
+        ThreadingHTTPServer: 起動したサーバー（server_address でポートを確認できます）
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    registry = registry or REGISTRY
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_from_env():
+    """OLYS_METRICS_PORT が設定されていれば、/metrics のサーバーを（プロセスで1回だけ）起動します。"""
+    global _server
+    port = os.getenv(METRICS_PORT_ENV)
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            _server = serve_metrics(int(port))
+    return _server
+
+
+def write_from_env():
+    """OLYS_METRICS_FILE が設定されていれば、そのファイルに書き出します。"""
+    path = os.getenv(METRICS_FILE_ENV)
+    if path:
+        write_prometheus(path)
+    return path
+
+
+# --- 遅いリクエストのプロファイル ---
+
+class SlowRequestProfiler:
+    """
+    ブロックを cProfile で計測し、slow_ms 以上かかった場合だけ directory に保存します。
+
+    保存するのは <名前>-<日時>-<ミリ秒>ms-<ランダムな文字列>.prof（pstats で読める形式）と、
+    累積時間の上位を並べた同名の .txt です。sample_rate で計測する割合を下げられます。
+    保存に失敗してもログに残すだけで、計測していた処理は失敗させません。
+    """
+
+    def __init__(self, directory, slow_ms=1000.0, sample_rate=1.0, top=40):
+        self.directory = directory
+        self.slow_ms = float(slow_ms)
+        self.sample_rate = float(sample_rate)
+        self.top = top
+        self._active = threading.local()
+
+    @contextmanager
+    def __call__(self, name):
+        # 入れ子の profiled は外側の計測に含まれるため、内側では計測しない
+        if getattr(self._active, 'profile', None) is not None or not self._sampled():
+            yield None
+            return
+        import cProfile
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # 別のプロファイラーが動いている場合は計測しない
+            yield None
+            return
+        self._active.profile = profile
+        started = time.perf_counter()
+        try:
+            yield profile
+        finally:
+            profile.disable()
+            self._active.profile = None
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if elapsed_ms >= self.slow_ms:
+                try:
+                    self._save(profile, name, elapsed_ms)
+                except Exception:
+                    logger.exception("遅いリクエストのプロファイルを保存できませんでした: %s", name)
+
+    def _sampled(self):
+        if self.sample_rate >= 1.0:
+            return True
+        import random
+        return random.random() < self.sample_rate
+
+    def _save(self, profile, name, elapsed_ms):
+        import pstats
+        os.makedirs(self.directory, exist_ok=True)
+        # 同じ秒・同じ所要時間のプロファイルが上書きし合わないよう、一意な名前のファイルを作って使う
+        fd, path = tempfile.mkstemp(
+            prefix=f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{elapsed_ms:.0f}ms-",
+            suffix='.prof', dir=self.directory)
+        os.close(fd)
+        stem = path[:-len('.prof')]
+        profile.dump_stats(path)
+        with open(stem + '.txt', 'w', encoding='utf-8') as f:
+            pstats.Stats(profile, stream=f).sort_stats('cumulative').print_stats(self.top)
+        REGISTRY.inc('profiles_saved_total', stage=name)
+
+
+_profiler = None
+_profiler_config = None
+_profiler_lock = threading.Lock()
+
+
+def profiled(name):
+    """
+    OLYS_PROFILE_DIR が設定されていれば、ブロックを SlowRequestProfiler で計測します。
+    設定されていなければ何もしません（環境変数は呼び出しごとに確認します）。
+    """
+    global _profiler, _profiler_config
+    config = (os.getenv(PROFILE_DIR_ENV), os.getenv(PROFILE_SLOW_ENV), os.getenv(PROFILE_SAMPLE_ENV))
+    if not config[0]:
+        return _null_context()
+    with _profiler_lock:
+        if config != _profiler_config:
+            _profiler = SlowRequestProfiler(config[0], float(config[1] or 1000.0),
+                                            float(config[2] or 1.0))
+            _profiler_config = config
+        profiler = _profiler
+    return profiler(name)
+
+
+@contextmanager
+def _null_context():
+    yield None
@@ -0,0 +1,102 @@
+import asyncio
+import random
+import time
+
+
+class TokenBucket:
+    """
+    トークンバケット方式のレート制限。
+
+    capacity まで貯まり、refill_per_sec の速度で補充されます。
+    asyncio のイベントループに依存しないため、asyncio.run を跨いで再利用できます。
+    """
+
+    def __init__(self, capacity, refill_per_sec):
+        self.capacity = float(capacity)
+        self.refill_per_sec = float(refill_per_sec)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.refill_per_sec)
+        self._updated = now
+
+    async def acquire(self, amount=1.0):
+        """amount 分のトークンが使えるまで待ちます。"""
+        # 容量を超える要求は、容量ぶん貯まった時点で通す（永久に待たないため）
+        amount = min(float(amount), self.capacity)
+        while True:
+            self._refill()
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return
+            await asyncio.sleep((amount - self._tokens) / self.refill_per_sec)
+
+    def adjust(self, delta):
+        """見積もりと実績の差分を反映します（正なら追加で消費、負なら返却）。"""
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens - delta)
+
+
+class RateLimiter:
+    """リクエスト数／分とトークン数／分の両方を制限します。"""
+
+    def __init__(self, requests_per_minute=500, tokens_per_minute=200000):
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60.0) \
+            if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0) \
+            if tokens_per_minute else None
+
+    async def acquire(self, estimated_tokens):
+        if self.requests is not None:
+            await self.requests.acquire(1)
+        if self.tokens is not None:
+            await self.tokens.acquire(estimated_tokens)
+
+    def record_usage(self, estimated_tokens, actual_tokens):
+        """実際の消費トークン数で見積もりを補正します。"""
+        if self.tokens is not None and actual_tokens is not None:
+            self.tokens.adjust(actual_tokens - estimated_tokens)
+
+
+def is_retryable_error(error):
+    """429 / 5xx / 接続エラー・タイムアウトなら再試行対象とみなします。"""
+    status = getattr(error, 'status_code', None)
+    if status is not None:
+        return status == 429 or status >= 500
+    name = type(error).__name__
+    return name in ('APIConnectionError', 'APITimeoutError') or isinstance(
+        error, (ConnectionError, TimeoutError, asyncio.TimeoutError))
+
+
+async def retry_async(func, max_retries=5, base_delay=0.5, max_delay=20.0,
+                      retryable=is_retryable_error):
+    """
+    func（コルーチン関数）を指数バックオフ＋ジッター（full jitter）で再試行します。
+    再試行対象外のエラーや、回数を使い切った場合は最後の例外を送出します。
+    """
+    attempt = 0
+    while True:
+        try:
+            return await func()
+        except Exception as e:
+            if attempt >= max_retries or not retryable(e):
+                raise
+            delay = min(max_delay, base_delay * (2 ** attempt))
+            await asyncio.sleep(random.uniform(0, delay))
+            attempt += 1
+
+
+async def gather_bounded(items, worker, concurrency):
+    """
+    items の各要素に worker を同時実行数 concurrency までで適用し、
+    入力と同じ順序で結果を返します。
+    """
+    semaphore = asyncio.Semaphore(max(1, int(concurrency)))
+
+    async def run(item):
+        async with semaphore:
+            return await worker(item)
+
+    return await asyncio.gather(*(run(item) for item in items))
@@ -0,0 +1,163 @@
+"""
+AI の回答（JSON）を少しずつ受け取りながらスコアを取り出すパーサー。
+
+ストリーミング（stream=True）で届いた断片を feed に渡すと、
+「"項目名": 数値」の組が完成した時点でその組を返します。
+前置きの文章や ```json のフェンスは読み飛ばし、途中で途切れた出力でも
+そこまでに完成した組は有効なスコアとして扱います。
+"""
+import json
+
+_NUMBER_CHARS = frozenset('0123456789+-.eE')
+
+
+class ScoreStreamParser:
+    """
+    最上位の JSON オブジェクトの「キー: 数値」の組を逐次取り出します。
+    数値の文字列（"1.5"）も数値として扱い、入れ子の値・真偽値・null は無視します。
+    """
+
+    def __init__(self):
+        self.scores = {}
+        self.done = False          # 最上位のオブジェクトが閉じた
+        self._depth = 0
+        self._expect = 'key'       # key / colon / value / sep
+        self._key = None
+        self._string = None        # 読み取り中の文字列（エスケープはそのまま保持）
+        self._escape = False
+        self._number = None        # 読み取り中の数値
+
+    def feed(self, text):
+        """
+        受け取った断片を処理します。
+
+        Returns:
+            list: この断片で完成した (キー, 値) のリスト
+        """
+        completed = []
+        for ch in text:
+            if self.done:
+                break
+            if self._string is not None:
+                self._read_string(ch, completed)
+                continue
+            if self._number is not None:
+                if ch in _NUMBER_CHARS:
+                    self._number.append(ch)
+                    continue
+                self._finish_number(completed)
+
+            if self._depth == 0:
+                # 最初の { までは前置き・フェンスとして読み飛ばす
+                if ch == '{':
+                    self._depth = 1
+                    self._expect = 'key'
+            elif ch == '"':
+                self._string = []
+            elif self._depth > 1:
+                if ch in '{[':
+                    self._depth += 1
+                elif ch in '}]':
+                    self._depth -= 1
+                    if self._depth == 1:
+                        self._expect = 'sep'
+            elif ch == ':':
+                self._expect = 'value'
+            elif ch == ',':
+                self._expect, self._key = 'key', None
+            elif ch == '}':
+                self._depth = 0
+                self.done = True
+            elif ch in '{[':
+                self._depth = 2
+            elif self._expect == 'value' and (ch.isdigit() or ch in '-.'):
+                self._number = [ch]
+            elif self._expect == 'value' and ch.isalpha():
+                # true / false / null は値として使わない
+                self._expect = 'sep'
+        return completed
+
+    def close(self, truncated=False):
+        """
+        ストリームの終わりを通知します。
+        正常に終わった場合は、区切り文字のない末尾の数値も完成した値として扱います
+        （出力上限で途切れた場合は、数値の途中かもしれないため捨てます）。
+
+        Returns:
+            list: 完成した (キー, 値) のリスト
+        """
+        completed = []
+        if self._number is not None:
+            if truncated:
+                self._number = None
+            else:
+                self._finish_number(completed)
+        return completed
+
+    def _read_string(self, ch, completed):
+        if self._escape:
+            self._string.append(ch)
+            self._escape = False
+        elif ch == '\\':
+            self._string.append(ch)
+            self._escape = True
+        elif ch == '"':
+            raw = ''.join(self._string)
+            self._string = None
+            try:
+                text = json.loads(f'"{raw}"')
+            except ValueError:
+                text = raw
+            if self._depth != 1:
+                return
+            if self._expect == 'key':
+                self._key, self._expect = text, 'colon'
+            elif self._expect == 'value':
+                self._emit(text, completed)
+        else:
+            self._string.append(ch)
+
+    def _finish_number(self, completed):
+        raw = ''.join(self._number)
+        self._number = None
+        self._emit(raw, completed)
+
+    def _emit(self, raw, completed):
+        self._expect = 'sep'
+        try:
+            value = float(raw)
+        except ValueError:
+            return
+        if self._key is not None:
+            self.scores[self._key] = value
+            completed.append((self._key, value))
+
+
+class IncompleteScores(ValueError):
+    """回答から一部の項目しか読み取れなかった（途中で途切れた・項目が欠けていた）ことを表す例外。"""
+
+    def __init__(self, scores, skills):
+        missing = [skill for skill in skills if skill not in scores]
+        super().__init__(f"incomplete scores in the response (missing: {', '.join(missing)})")
+        self.scores = scores
+
+
+def parse_scores(content, skills):
+    """
+    AI の回答全体からスコアを取り出します。
+    途中で途切れた回答でも、読み取れた項目の値はそのまま返します。
+
+    Returns:
+        tuple: (読み取れた項目だけのスキル名 → 値の dict,
+        JSON が閉じていて全項目が揃っていれば True)
+
+    Raises:
+        ValueError: スコアが1つも読み取れなかった場合
+    """
+    parser = ScoreStreamParser()
+    parser.feed(content or '')
+    parser.close(truncated=not parser.done)
+    found = {skill: parser.scores[skill] for skill in skills if skill in parser.scores}
+    if not found:
+        raise ValueError("no scores found in the response")
+    return found, parser.done and len(found) == len(skills)
@@ -1,5 +1,8 @@
 import math
 
+from . import metrics
+
+
 class SamhallScorer:
     """
     ユーザーのスキルスコアと職種データベースを照合し、
@@ -16,73 +19,98 @@ class SamhallScorer:
         return text_scores
 
     @staticmethod
-    def match_jobs(user_scores, job_db):
+    def load_catalog(path=None):
+        """
+        プロセス内で共有される職種カタログ（JobCatalog）を取得します。
+        """
+        from .job_catalog import DEFAULT_DB_PATH, get_job_catalog
+        return get_job_catalog(path or DEFAULT_DB_PATH)
+
+    @staticmethod
+    @metrics.span('match_jobs')
+    def match_jobs(user_scores, job_db, mode='penalty'):
         """
         職種データベースの各職種とユーザーのスコアを比較し、
         マッチ率（%）を計算して降順で返します。
+        job_db には職種のリストのほか、共有の JobCatalog も渡せます
+        （リストの場合は呼び出しのたびに配列へ変換するため、カタログのほうが高速です）。
+
+        スキルのキーは日本語名（required_scores と同じ）でも英語の別名
+        （reading / writing / calculation / communication）でも構いません。
+        職種が要求するスキルのうち、ユーザーが評価されていないスキルは 0 として照合します
+        （英語の別名だけを持つ旧形式のスコアは、別名のある4スキルだけを照合します）。
+
+        計算式（skill_kernel.match_rates）:
+        - スキル不足は (要求値 - 値) × 3.0、超過は (値 - 要求値) × 0.5 を差分として合計
+        - 85% から 差分 × 5.0 を引き、最低保証 45%（「マッチ0%」を防ぐ。要求スキルのない職種も 45%）
+        - 重量物NG × heavy の職種は ×0.8、避けたい環境に該当する職種は ×0.7
+        - 上限は 99%（「伸びしろ」を残す）、小数点第1位で丸める
+        mode='ratio' では画面表示と同じ比率方式で計算します。
+        """
+        if not isinstance(user_scores, dict):
+            return []
+        from .skill_kernel import JobVectors, encode_scores, match_rates, ranked, scoring_skills
+
+        vectors = getattr(job_db, 'vectors', None)
+        if vectors is not None:
+            jobs = job_db.jobs
+        else:
+            jobs = [job for job in job_db if isinstance(job, dict)]
+            vectors = JobVectors(jobs)
+        values, _ = encode_scores(user_scores)
+        rates = match_rates(values, vectors, mode,
+                            physical_info=user_scores.get('physical_info', ''),
+                            environment_info=user_scores.get('environment_info', ''),
+                            skills=scoring_skills(user_scores))
+        # マッチ率が高い順（降順、同率は職種の並び順）
+        return [{'job': jobs[i], 'match_rate': rate} for i, rate in ranked(rates)]
+
+    @staticmethod
+    @metrics.span('match_jobs_top')
+    def match_jobs_top(user_scores, catalog, top_k=10, mode='penalty', compact=False):
+        """
+        JobCatalog の検索インデックスを使い、全職種をスコアリングせずに
+        上位 top_k 件だけを返します。結果は match_jobs(...)[:top_k] と同じです。
+        compact=True の場合は、セッションに保存しやすい MatchList
+        （職種インデックスとマッチ率の配列 + カタログへの参照）で返します。
         """
-        matches = []
         if not isinstance(user_scores, dict):
             return []
+        from .skill_kernel import encode_scores, scoring_skills
 
-        for job in job_db:
-            if not isinstance(job, dict):
-                continue
-                
-            total_diff = 0
-            # job_database.jsonに定義されている要件を取得
-            reqs = job.get('requirements', {})
-            
-            # 評価対象のスキル項目
-            skills = ['reading', 'writing', 'calculation', 'communication']
-            
-            for skill in skills:
-                # ユーザーの値を数値化（デフォルト0）
-                val = user_scores.get(skill, 0)
-                user_val = float(val) if isinstance(val, (int, float, str)) else 0
-                
-                # 職種の要求値を取得（デフォルト0.8）
-                req_val = float(reqs.get(skill, 0.8))
-                
-                # --- スキル差の計算ロジック ---
-                if user_val < req_val:
-                    # スキルが不足している場合：ペナルティをマイルドに（係数3.0）
-                    # これを大きくすると、マッチ率がガクンと下がります
-                    total_diff += (req_val - user_val) * 3.0
-                else:
-                    # スキルが足りている場合：超過分をわずかに加点要素へ
-                    total_diff += (user_val - req_val) * 0.5
+        values, _ = encode_scores(user_scores)
+        skills = scoring_skills(user_scores)
+        if skills is not None:
+            values = values[list(skills)]
+        top, _ = catalog.job_index(mode, skills).query(
+            values, top_k, physical_info=user_scores.get('physical_info', ''),
+            environment_info=user_scores.get('environment_info', ''))
+        if compact:
+            from .match_results import MatchList
+            return MatchList.from_ranked(catalog, top)
+        return [{'job': catalog.jobs[i], 'match_rate': rate} for i, rate in top]
 
-            # --- 基本マッチ率の算出 ---
-            # 85点をベースにし、スキルの差分を引いていきます（係数5.0）
-            base_rate = 85.0 - (total_diff * 5.0) 
-            
-            # 【モチベーション維持】最低保証スコアを45.0%に設定
-            # これにより「マッチ0%」という悲しい結果を防ぎます
-            match_rate = max(45.0, base_rate)
-            
-            # --- 身体・環境条件による補正（マルチプライヤー） ---
-            multiplier = 1.0
-            
-            # 1. 身体的負荷のチェック
-            physical_info = str(user_scores.get('physical_info', ''))
-            if job.get('physical_level') == 'heavy' and '重いものは不可' in physical_info:
-                multiplier *= 0.8 # 適合しない場合は20%減
-            
-            # 2. 環境配慮のチェック
-            env_info = str(user_scores.get('environment_info', ''))
-            job_env = job.get('environment', 'なし')
-            if job_env != 'なし' and job_env in env_info:
-                multiplier *= 0.7 # 避けるべき環境に該当する場合は30%減
-            
-            # --- 最終スコアの決定 ---
-            # 上限を99.0%に設定し、100%（完璧）ではない「伸びしろ」を表現
-            final_rate = min(99.0, match_rate * multiplier)
-            
-            matches.append({
-                'job': job,
-                'match_rate': round(final_rate, 1) # 小数点第1位で丸める
-            })
-        
-        # マッチ率が高い順（降順）にソートして返す
-        return sorted(matches, key=lambda x: x['match_rate'], reverse=True)
+    @staticmethod
+    @metrics.span('match_jobs_batch')
+    def match_jobs_batch(candidates, job_db, top_k=10):
+        """
+        複数の候補者をまとめて照合し、候補者ごとの上位 top_k 件を返します。
+        NumPy で 候補者×職種 のマッチ率行列を一度に計算するため、
+        夜間の一括再マッチングなど大量の照合に向いています。
+        結果の数値・並びは match_jobs(...)[:top_k] と同じです。
+        JobCatalog を渡すと前計算済みの要求値行列を再利用します。
+        """
+        from .batch_matcher import match_jobs_batch
+        return match_jobs_batch(candidates, job_db, top_k=top_k)
+
+    @staticmethod
+    @metrics.span('what_if')
+    def what_if(user_scores, job_db, steps=(0.1, 0.2, 0.3, 0.5), top_k=10, threshold=80.0, mode='penalty'):
+        """
+        評価済みの各スキルを steps だけ上げた（下げた）場合の、上位 top_k 件の平均マッチ率の増分と、
+        マッチ率が threshold 以上になる職種を一括で試算します。
+        各マッチ率は、スコアを書き換えて match_jobs を呼んだ場合と同じ値です。
+        詳細は evaluator.what_if.simulate を参照してください。
+        """
+        from .what_if import simulate
+        return simulate(user_scores, job_db, steps=steps, top_k=top_k, threshold=threshold, mode=mode)
@@ -0,0 +1,420 @@
+"""
+15スキル共通のスコアリングカーネル。
+
+候補者・職種を「15要素の固定長 float 配列 + 対象スキルのビットマスク」に一度だけ変換し、
+以降の計算ではスキル名（文字列）を引かずに配列演算だけで照合します。
+SamhallScorer（非対称ペナルティ）と app.py（要求値に対する比率）の
+どちらのマッチ率もここで計算します（JobIndex・batch_matcher・what_if も同じ関数を使います）。
+
+照合の対象になるのは職種が要求するスキルすべてです。候補者が評価されていないスキルは、
+旧実装（user_scores.get(skill, 0)）と同じく 0 として扱います。ただし英語の別名だけを持つ
+旧形式のスコアは、旧実装と同じく別名のある4スキルだけを照合します（scoring_skills）。
+"""
+import numpy as np
+
+from .skills import ENGLISH_ALIASES, N_SKILLS, SKILL_INDEX
+
+# スコアの計算方式
+PENALTY = 'penalty'   # SamhallScorer.match_jobs（非対称ペナルティ）
+RATIO = 'ratio'       # app.py の画面表示（要求値に対する比率の平均）
+
+# 旧形式（requirements に英語キー）の職種で、要求値が未定義のときの既定値
+DEFAULT_REQUIREMENT = 0.8
+LEGACY_SKILLS = tuple(SKILL_INDEX[name] for name in ENGLISH_ALIASES.values())
+
+# --- スキル差ペナルティの係数 ---
+UNDER_PENALTY = 3.0     # スキル不足
+OVER_BONUS = 0.5        # スキル超過
+DIFF_WEIGHT = 5.0       # 差分 → マッチ率への換算
+
+# --- マッチ率の基準・下限・上限（%） ---
+BASE_RATE = 85.0
+FLOOR_RATE = 45.0
+CAP_RATE = 99.0
+
+# --- 身体・環境条件のマルチプライヤー ---
+HEAVY_MULTIPLIER = 0.8
+ENV_MULTIPLIER = 0.7
+HEAVY_NG_PHRASE = '重いものは不可'
+NO_ENVIRONMENT = 'なし'
+
+# --- 比率方式 ---
+RATIO_CAP = 1.2
+
+_BITS = 1 << np.arange(N_SKILLS, dtype=np.int64)
+
+
+def to_float(val):
+    # 数値・文字列以外は0として扱う
+    return float(val) if isinstance(val, (int, float, str)) else 0
+
+
+def mask_to_bool(mask):
+    """ビットマスクを長さ15のブール配列にします。"""
+    return (int(mask) & _BITS) != 0
+
+
+def encode_scores(scores):
+    """
+    候補者のスコア（日本語名・英語の別名どちらのキーでも可）を変換します。
+
+    Returns:
+        tuple: (15要素の float 配列, 評価済みスキルのビットマスク)
+    """
+    values = np.zeros(N_SKILLS, dtype=np.float64)
+    mask = 0
+    for key, val in scores.items():
+        idx = SKILL_INDEX.get(key)
+        if idx is not None:
+            values[idx] = to_float(val)
+            mask |= 1 << idx
+    return values, mask
+
+
+def scoring_skills(scores):
+    """
+    候補者のスコアを照合するスキルの列（インデックスの昇順のタプル）を返します。None は15スキルすべてです。
+    日本語名のキーを持たず英語の別名（reading など）だけを持つ旧形式のスコアは、
+    旧実装と同じく別名のある4スキルだけを照合します。
+    """
+    legacy = False
+    for key in scores:
+        if key in ENGLISH_ALIASES:
+            legacy = True
+        elif key in SKILL_INDEX:
+            return None
+    return LEGACY_SKILLS if legacy else None
+
+
+def encode_requirements(job):
+    """
+    職種の要求スキル（required_scores）を変換します。
+    required_scores がない旧形式の職種は、旧実装と同じく requirements の英語キーの4スキルを
+    照合し、未定義の要求値には既定値 0.8 を使います。
+
+    Returns:
+        tuple: (15要素の float 配列, 要求スキルのビットマスク)
+    """
+    values = np.zeros(N_SKILLS, dtype=np.float64)
+    mask = 0
+    required = job.get('required_scores')
+    if not required:
+        legacy = job.get('requirements')
+        legacy = legacy if isinstance(legacy, dict) else {}
+        for alias, idx in zip(ENGLISH_ALIASES, LEGACY_SKILLS):
+            values[idx] = float(legacy.get(alias, DEFAULT_REQUIREMENT))
+            mask |= 1 << idx
+        return values, mask
+    for key, val in required.items():
+        idx = SKILL_INDEX.get(key)
+        if idx is not None:
+            values[idx] = float(val)
+            mask |= 1 << idx
+    return values, mask
+
+
+def condition_multiplier(heavy_mask, env_mask, shape):
+    """
+    重量物NGの職種（heavy_mask）・避けたい環境の職種（env_mask）のマルチプライヤーを返します。
+    該当する要素がなければ None です。
+    """
+    heavy_hit = heavy_mask is not None and heavy_mask.any()
+    env_hit = env_mask is not None and env_mask.any()
+    if not (heavy_hit or env_hit):
+        return None
+    multiplier = np.ones(shape, dtype=np.float64)
+    if heavy_hit:
+        multiplier[heavy_mask] *= HEAVY_MULTIPLIER
+    if env_hit:
+        multiplier[env_mask] *= ENV_MULTIPLIER
+    return multiplier
+
+
+class _Columns:
+    """JobVectors を、いずれかの職種が要求するスキルの列だけに絞った前計算。"""
+    __slots__ = ('cols', 'values', 'inactive', 'safe_values', 'divide', 'fill', 'count', '_later')
+
+    def __init__(self, cols, values, active):
+        self.cols = cols
+        self.values = values
+        self.inactive = ~active
+        # 比率方式で割り算する要素（要求値が正の要求スキル）と、それ以外の要素の値
+        self.divide = active & (values > 0)
+        self.safe_values = np.where(self.divide, values, 1.0)
+        self.fill = np.where(active, 1.0, 0.0)
+        self.count = active.sum(axis=1)
+        self._later = {}
+
+    def take(self, rows):
+        """rows の職種だけの前計算を返します。"""
+        part = _Columns.__new__(_Columns)
+        part.cols = self.cols
+        for name in ('values', 'inactive', 'safe_values', 'divide', 'fill', 'count'):
+            setattr(part, name, getattr(self, name)[rows])
+        part._later = {}
+        return part
+
+    def later_required(self, col):
+        """
+        列 col を要求する職種のインデックスと、それぞれの職種が col より後に要求する列の位置
+        （(後ろの要求列の数の最大, 職種数) の配列。位置は 職種×列 を平坦化したもので、
+        足りない分は番兵の values.size を指す）を返します。
+        what_if で使うため、列ごとに初回使用時に作成します。
+        """
+        later = self._later.get(col)
+        if later is None:
+            n_cols = self.values.shape[1]
+            rows = np.flatnonzero(~self.inactive[:, col])
+            after = ~self.inactive[rows, col + 1:]
+            width = int(after.sum(axis=1).max()) if after.size else 0
+            # 後ろの要求列を、列の順のまま左に詰める
+            order = np.argsort(~after, axis=1, kind='stable')[:, :width]
+            flat = np.where(np.take_along_axis(after, order, axis=1),
+                            rows[:, None] * n_cols + col + 1 + order, self.values.size)
+            later = self._later[col] = (rows, np.ascontiguousarray(flat.T))
+        return later
+
+
+class JobVectors:
+    """
+    職種リストを配列にまとめたもの。
+
+    Attributes:
+        values: 職種×スキル の要求値
+        required: 職種×スキル の「要求あり」フラグ
+        heavy: physical_level == 'heavy' のフラグ
+        environments: 職種ごとの環境条件
+    """
+    __slots__ = ('values', 'required', 'heavy', 'environments', '_env_names', '_env_codes',
+                 '_columns')
+
+    def __init__(self, jobs):
+        n = len(jobs)
+        values = np.zeros((n, N_SKILLS), dtype=np.float64)
+        bits = np.zeros(n, dtype=np.int64)
+        heavy = np.zeros(n, dtype=bool)
+        environments = []
+        for i, job in enumerate(jobs):
+            values[i], bits[i] = encode_requirements(job)
+            heavy[i] = job.get('physical_level') == 'heavy'
+            environments.append(job.get('environment', NO_ENVIRONMENT))
+        self._init(values, (bits[:, None] & _BITS[None, :]) != 0, heavy, environments)
+        for arr in (self.values, self.required, self.heavy, self._env_codes):
+            arr.setflags(write=False)
+
+    @classmethod
+    def from_arrays(cls, values, required, heavy=None, environments=None):
+        """
+        要求値・「要求あり」フラグの行列（職種×スキル）から作ります。
+        スキルの列は15列でなくても構いません（JobIndex で列を絞る場合など）。
+        """
+        vectors = cls.__new__(cls)
+        values = np.asarray(values, dtype=np.float64)
+        n = values.shape[0]
+        vectors._init(values, np.asarray(required, dtype=bool),
+                      np.zeros(n, dtype=bool) if heavy is None else np.asarray(heavy, dtype=bool),
+                      [NO_ENVIRONMENT] * n if environments is None else environments)
+        return vectors
+
+    def _init(self, values, required, heavy, environments):
+        self.values = values
+        self.required = required
+        self.heavy = heavy
+        self.environments = tuple(environments)
+
+        # 環境条件は種類ごとに1回だけ部分一致を調べるため、コード化しておく
+        self._env_names = tuple(sorted({e for e in self.environments if e != NO_ENVIRONMENT}))
+        codes = {e: k for k, e in enumerate(self._env_names)}
+        self._env_codes = np.array([codes.get(e, -1) for e in self.environments], dtype=np.int64)
+        # 要求スキルの列の前計算（照合するスキルの組ごとに、初回使用時に作成）
+        self._columns = {}
+
+    def __len__(self):
+        return len(self.heavy)
+
+    def columns(self, rows=None, skills=None):
+        """
+        要求スキルの列の前計算を返します。rows を指定するとその職種だけに、
+        skills（scoring_skills の戻り値）を指定するとそのスキルの列だけに絞ります。
+        """
+        columns = self._columns.get(skills)
+        if columns is None:
+            required = self.required.any(axis=0)
+            if skills is not None:
+                required &= np.isin(np.arange(len(required)), skills)
+            cols = np.flatnonzero(required)
+            columns = _Columns(cols, self.values[:, cols], self.required[:, cols])
+            self._columns[skills] = columns
+        return columns if rows is None else columns.take(rows)
+
+    def env_mask(self, environment_info, rows=None):
+        """候補者の「避けたい環境」に該当する職種のブール配列を返します（rows を指定するとその職種だけ）。"""
+        if not self._env_names:
+            return None
+        info = str(environment_info)
+        hits = np.array([e in info for e in self._env_names] + [False], dtype=bool)
+        return hits[self._env_codes if rows is None else self._env_codes[rows]]
+
+    def multiplier(self, physical_info='', environment_info='', rows=None):
+        """身体・環境条件のマルチプライヤー（職種数,）を返します。該当する職種がなければ None です。"""
+        heavy = None
+        if HEAVY_NG_PHRASE in str(physical_info):
+            heavy = self.heavy if rows is None else self.heavy[rows]
+        return condition_multiplier(heavy, self.env_mask(environment_info, rows),
+                                    len(self) if rows is None else len(rows))
+
+
+def skill_terms(user, columns, mode=PENALTY, col=None, rows=None):
+    """
+    スキルごとの項（非対称ペナルティ方式ではスキル差、比率方式では比率）を返します。
+
+    Args:
+        user: 評価済みスキルの列（columns.cols）の値。先頭に任意の次元を持てます（(..., 列数)）
+        columns (_Columns): JobVectors.columns の前計算
+        col (int): 指定するとその列だけを計算します（user は (...,) の形）
+        rows: 指定するとその職種だけを計算します
+
+    Returns:
+        ndarray: (..., 職種数, 列数)、col を指定した場合は (..., 職種数)
+    """
+    user = np.asarray(user, dtype=np.float64)
+    sel = slice(None) if rows is None else rows
+    if col is None:
+        u = user[..., None, :]
+        reqs, inactive = columns.values[sel], columns.inactive[sel]
+        divide, safe_values, fill = columns.divide[sel], columns.safe_values[sel], columns.fill[sel]
+    else:
+        u = user[..., None]
+        reqs, inactive = columns.values[sel, col], columns.inactive[sel, col]
+        divide, safe_values, fill = (columns.divide[sel, col], columns.safe_values[sel, col],
+                                     columns.fill[sel, col])
+    if mode == PENALTY:
+        # 不足なら (要求 - 値) * 3.0、超過なら (値 - 要求) * 0.5 の区分線形。
+        # 符号を反転した差に -0.5 を掛けても浮動小数点の結果は同じなので、差は1回だけ求める
+        diff = reqs - u
+        diff *= np.where(diff > 0, UNDER_PENALTY, -OVER_BONUS)
+        return np.where(inactive, 0.0, diff)
+    if mode == RATIO:
+        # 比率方式: 要求値が0の要求スキルは 1.0、要求のないスキルは 0 として加算する
+        return np.where(divide, np.minimum(RATIO_CAP, u / safe_values), fill)
+    raise ValueError(f"unknown mode: {mode}")
+
+
+def term_totals(user_values, columns, mode=PENALTY):
+    """
+    要求スキルの項の合計（職種数,）を返します。
+    項はスキルの並び順に1つずつ加算します（旧実装と同じ浮動小数点の結果になる）。
+    """
+    if not len(columns.cols):
+        return np.zeros(len(columns.count), dtype=np.float64)
+    user = np.asarray(user_values, dtype=np.float64)
+    return np.cumsum(skill_terms(user[columns.cols], columns, mode), axis=1)[:, -1]
+
+
+def finish_rates(total, columns, mode=PENALTY, multiplier=None, rows=None):
+    """
+    スキルの項の合計（..., 職種数）からマッチ率（丸め前）を求めます。
+    非対称ペナルティ方式では、身体・環境条件のマルチプライヤー（JobVectors.multiplier）も掛けます。
+    要求スキルのない職種は照合できないため、非対称ペナルティ方式では最低保証の 45%、
+    比率方式では 0% です。
+    rows を指定した場合、total と multiplier はその職種だけの値です。
+    """
+    count = columns.count if rows is None else columns.count[rows]
+    if mode == RATIO:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rate = np.divide(total, count)
+        rate *= 100
+        return rate if count.all() else np.where(count > 0, rate, 0.0)
+    if mode != PENALTY:
+        raise ValueError(f"unknown mode: {mode}")
+
+    # what_if では (変化量の数, 職種数) の配列を列ごとに計算するため、確保した配列を使い回す
+    rate = np.multiply(total, DIFF_WEIGHT)
+    np.subtract(BASE_RATE, rate, out=rate)
+    np.maximum(FLOOR_RATE, rate, out=rate)
+    if not count.all():
+        np.copyto(rate, FLOOR_RATE, where=count == 0)
+    if multiplier is not None:
+        rate *= multiplier
+    return np.minimum(CAP_RATE, rate, out=rate)
+
+
+def match_rates(user_values, jobs, mode=PENALTY, physical_info='', environment_info='', rows=None,
+                skills=None):
+    """
+    1人の候補者と全職種（rows を指定するとその職種だけ）のマッチ率（丸め前）を返します。
+    skills は照合するスキルの列（scoring_skills）です。
+
+    非対称ペナルティ方式（PENALTY）は SamhallScorer.match_jobs、
+    比率方式（RATIO）は各要求スキルの min(1.2, 候補者の値 / 要求値) の平均 × 100 です。
+    """
+    if mode not in (PENALTY, RATIO):
+        raise ValueError(f"unknown mode: {mode}")
+    columns = jobs.columns(rows, skills)
+    total = term_totals(user_values, columns, mode)
+    multiplier = jobs.multiplier(physical_info, environment_info, rows) if mode == PENALTY else None
+    return finish_rates(total, columns, mode, multiplier)
+
+
+def round_rates(values):
+    """
+    round(x, 1) と同じ丸めを配列に対して行います。
+    np.round(x, 1) は x × 10 の丸め誤差のため、0.05 ちょうど付近で結果が異なることがあります。
+    ここでは x × 10 を誤差なしの和（8x + 2x の TwoSum）で求め、真の値が m + 0.5 より
+    上か下か（ちょうどなら偶数側）で切り上げ・切り捨てを決めます（Python の round と同じ結果）。
+    """
+    x = np.asarray(values, dtype=np.float64)
+    a, b = x * 8, x * 2                     # 2のべき乗倍なので誤差なし
+    p = a + b
+    bb = p - a
+    err = (a - (p - bb)) + (b - bb)         # x × 10 = p + err（誤差なし）
+    m = np.floor(p)
+    half = m + 0.5
+    up = p > half
+    tie = p == half
+    if tie.any():
+        # 72.75 のように2進数で表せるちょうど半分は、Python と同じく偶数側に丸める
+        up |= tie & ((err > 0) | ((err == 0) & (m % 2 == 1)))
+    return (m + up) / 10
+
+
+def top_k_indices(rates, k):
+    """
+    各行（候補者）の上位k件の職種インデックスを返します。
+
+    全行をソートせず argpartition で候補を絞り込み、
+    丸め後のマッチ率の降順（同率は職種の並び順）に並べます。
+    """
+    rates = np.asarray(rates, dtype=np.float64)
+    n_jobs = rates.shape[1] if rates.ndim == 2 else 0
+    k = max(0, min(int(k), n_jobs))
+    if k == 0:
+        return [[] for _ in range(rates.shape[0])]
+
+    if k < n_jobs:
+        part = np.argpartition(-rates, k - 1, axis=1)[:, :k]
+        kth = np.take_along_axis(rates, part, axis=1).min(axis=1)
+    else:
+        kth = rates.min(axis=1)
+
+    result = []
+    for i, row in enumerate(rates):
+        # 丸めで同率になり得る職種まで含めてから、丸め後の値で安定ソートする
+        cand_idx = np.flatnonzero(row >= round(float(kth[i]), 1) - 0.05 - 1e-9)
+        ordered = sorted(cand_idx.tolist(), key=lambda j: (-round(float(row[j]), 1), j))
+        result.append(ordered[:k])
+    return result
+
+
+def ranked(rates, k=None):
+    """
+    1人分のマッチ率を (職種インデックス, 丸めたマッチ率) の降順リストにします。
+    k を指定すると上位k件だけを返します。
+    """
+    n = len(rates)
+    if k is not None and k < n:
+        order = top_k_indices(np.asarray(rates)[None, :], k)[0]
+        return [(i, round(float(rates[i]), 1)) for i in order]
+    rounded = round_rates(rates)
+    order = np.argsort(-rounded, kind='stable')
+    return list(zip(order.tolist(), rounded[order].tolist()))
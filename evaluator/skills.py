@@ -0,0 +1,51 @@
+"""
+O-lys の15スキルの一覧と、スキル名 → 固定の整数インデックスの対応。
+
+TextAnalyzer の評価項目・evaluation_criteria.json・job_database.json の
+required_scores はすべてこの日本語名を使います。画面や旧形式の職種データで
+使っている英語キー（reading など）は別名として同じインデックスに割り当てます。
+NumPy に依存しないため、起動時に読み込んでも軽量です。
+"""
+
+SKILLS = (
+    "読解力", "文書作成力", "計算力", "時間管理能力",
+    "容儀", "運動能力", "モビリティ", "身体的耐性",
+    "集中力", "問題解決力", "協力・チーム力", "コミュニケーション力",
+    "柔軟性", "個人業務遂行力", "サービスパフォーマンス",
+)
+
+N_SKILLS = len(SKILLS)
+
+# 画面（app.py）と旧形式の requirements で使う英語キー
+ENGLISH_ALIASES = {
+    "reading": "読解力",
+    "writing": "文書作成力",
+    "calculation": "計算力",
+    "communication": "コミュニケーション力",
+}
+
+SKILL_INDEX = {name: i for i, name in enumerate(SKILLS)}
+SKILL_INDEX.update({alias: SKILL_INDEX[name] for alias, name in ENGLISH_ALIASES.items()})
+
+# すべてのスキルを含むビットマスク
+ALL_SKILLS_MASK = (1 << N_SKILLS) - 1
+
+
+def skill_id(name):
+    """スキル名（日本語名または英語の別名）のインデックスを返します。未知の名前は None です。"""
+    return SKILL_INDEX.get(name)
+
+
+def skill_mask(names):
+    """スキル名の列をビットマスクにします（未知の名前は無視します）。"""
+    mask = 0
+    for name in names:
+        idx = SKILL_INDEX.get(name)
+        if idx is not None:
+            mask |= 1 << idx
+    return mask
+
+
+def mask_skills(mask):
+    """ビットマスクに含まれるスキルのインデックスを昇順のタプルで返します。"""
+    return tuple(i for i in range(N_SKILLS) if mask >> i & 1)
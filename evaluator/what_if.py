@@ -0,0 +1,171 @@
+"""
+「このスキルが 0.2 上がったら、どの職種が合うようになるか」を一括で試算するシミュレーター。
+
+評価済みの全スキル × 複数の変化量 のマッチ率を、スキルごとに配列計算で求めます。
+あるスキルの値を変えても、そのスキルを要求しない職種のマッチ率は変わらず、
+要求する職種でも他のスキルの項は変わりません。そこで項の累積和（prefix）を
+1度だけ求め、変えたスキルを要求する職種についてだけ、その列から先を足し直します。
+スキルの並び順に1つずつ加算する点は match_jobs と同じなので、各マッチ率は値を
+書き換えて match_jobs を呼んだ場合と一致します。
+小数点第1位への丸めは、上位k件としきい値付近の職種だけに行います。
+"""
+import numpy as np
+
+from .skill_kernel import (
+    PENALTY, JobVectors, encode_scores, finish_rates, mask_to_bool, round_rates, scoring_skills,
+    skill_terms,
+)
+from .skills import SKILLS
+
+DEFAULT_STEPS = (0.1, 0.2, 0.3, 0.5)
+DEFAULT_THRESHOLD = 80.0
+DEFAULT_MAX_CROSSING = 20
+
+# スコアの範囲（変化後の値はこの範囲に収める）
+SCORE_MIN = 0.0
+SCORE_MAX = 2.0
+
+
+def _job_vectors(job_db):
+    vectors = getattr(job_db, 'vectors', None)
+    if vectors is not None:
+        return job_db.jobs, vectors
+    jobs = [job for job in job_db if isinstance(job, dict)]
+    return jobs, JobVectors(jobs)
+
+
+def _top_k_mean(rates, k):
+    """
+    各行の上位k件（丸め後）の平均。
+
+    丸めは単調なので、丸める前の値で上位k件を選んでから、その k 件だけを丸めます。
+    """
+    n = rates.shape[-1]
+    k = min(k, n)
+    if k <= 0:
+        return np.zeros(rates.shape[:-1])
+    if k < n:
+        rates = np.partition(rates, n - k, axis=-1)[..., n - k:]
+    return round_rates(rates).mean(axis=-1)
+
+
+def perturbed_totals(user_cols, columns, steps, mode=PENALTY, perturb=None):
+    """
+    列ごと・変化量ごとの、項の合計を返します。
+    列の値を変えて合計が変わるのはその列を要求する職種だけなので、その職種の分だけを求めます。
+
+    Args:
+        perturb: 値を変える列の位置（columns.cols 上の位置。None で全列）
+
+    Returns:
+        tuple: (変化前の合計 (職種数,)、変える列ごとの (その列を要求する職種のインデックス,
+        変化後の合計 (変化量の数, 職種数)) のリスト、変化後の値 (変える列数, 変化量の数))
+    """
+    terms = skill_terms(user_cols, columns, mode)                 # (職種数, 列数)
+    prefix = np.cumsum(terms, axis=1)
+    n_cols = len(user_cols)
+    perturb = np.arange(n_cols) if perturb is None else np.asarray(perturb, dtype=np.int64)
+    new_values = np.clip(user_cols[perturb, None] + steps[None, :], SCORE_MIN, SCORE_MAX)
+
+    # 要求しない列の項は 0 で、0 を足しても合計は変わらないため、列 q より後は要求する列の項だけを
+    # 順に足せば全列を順に足した場合と同じ値になる（番兵の位置には 0 を置く）
+    flat_terms = np.append(terms.ravel(), 0.0)
+
+    changed = []
+    for p, q in enumerate(perturb.tolist()):
+        # 列 q を変えた行: 手前までの累積和に変化後の列 q の項を足し、残りの要求スキルの項を順に足す
+        # （加算の順序は match_jobs と同じ）
+        rows, later = columns.later_required(q)
+        run = skill_terms(new_values[p], columns, mode, col=q, rows=rows)   # (変化量の数, 職種数)
+        if q:
+            run += prefix[rows, q - 1]
+        for term in flat_terms[later]:
+            run += term
+        changed.append((rows, run))
+    return prefix[:, -1], changed, new_values
+
+
+def simulate(user_scores, job_db, steps=DEFAULT_STEPS, top_k=10, threshold=DEFAULT_THRESHOLD,
+             mode=PENALTY, max_crossing=DEFAULT_MAX_CROSSING):
+    """
+    評価済みの各スキルを steps だけ変えた場合のマッチ率を試算します。
+
+    Args:
+        user_scores (dict): スコア（match_jobs と同じ形式。physical_info / environment_info も参照）
+        job_db: JobCatalog または職種のリスト
+        steps (tuple): スキルの変化量（負の値も可）。変化後の値は 0〜2.0 に収めます
+        top_k (int): 「上位k件の平均マッチ率」の k
+        threshold (float): この値以上になった職種を「しきい値を超えた職種」として返す
+        max_crossing (int): しきい値を超えた職種を1組あたり何件まで返すか（マッチ率の高い順。None で全件）
+
+    Returns:
+        dict: baseline（変化前の上位k件の平均）と、スキルごとの結果のリスト skills。
+        skills は基準の変化量（0.2、なければ最大の変化量）での増分の大きい順で、各要素は
+        skill / current / steps（step, value, top_k_mean, gain, gain_per_unit, crossing_count, crossing）を持ちます。
+    """
+    jobs, vectors = _job_vectors(job_db)
+    steps = np.asarray(steps, dtype=np.float64)
+    values, mask = encode_scores(user_scores)
+    # 評価していないスキルも 0 として項に含め（match_jobs と同じ）、値を変えるのは評価済みの列だけ
+    columns = vectors.columns(skills=scoring_skills(user_scores))
+    cols = columns.cols
+    perturb = np.flatnonzero(mask_to_bool(mask)[cols])
+    multiplier = None
+    if mode == PENALTY:
+        multiplier = vectors.multiplier(user_scores.get('physical_info', ''),
+                                        user_scores.get('environment_info', ''))
+
+    if not len(jobs) or not len(perturb):
+        return {'baseline': {'top_k_mean': None, 'top_k': top_k, 'threshold': threshold,
+                             'above_threshold': 0}, 'skills': []}
+
+    base_total, changed, new_values = perturbed_totals(values[cols], columns, steps, mode, perturb)
+    base_raw = finish_rates(base_total, columns, mode, multiplier)
+    base = round_rates(base_raw)
+
+    base_mean = float(_top_k_mean(base_raw, top_k))
+    # 変えた列を要求しない職種のマッチ率は変化前のままなので、上位k件の候補には
+    # それらのうち変化前の上位k件だけを加える
+    base_order = np.argsort(-base_raw)
+    # 全件を丸めると遅いため、丸めればしきい値に届きうる職種だけを丸めて判定する
+    below = base < threshold
+
+    results = []
+    for q, skill_idx in enumerate(cols[perturb].tolist()):
+        rows, totals = changed[q]
+        rates = finish_rates(totals, columns, mode,
+                             None if multiplier is None else multiplier[rows], rows)
+        unchanged = base_order[columns.inactive[base_order, perturb[q]]][:top_k]
+        means = _top_k_mean(np.concatenate(
+            [rates, np.broadcast_to(base_raw[unchanged], (len(steps), len(unchanged)))], axis=1),
+            top_k)
+        current = float(values[skill_idx])
+        entries = []
+        for d, step in enumerate(steps.tolist()):
+            value = float(new_values[q, d])
+            gain = float(means[d]) - base_mean
+            near = np.flatnonzero((rates[d] >= threshold - 0.1) & below[rows])
+            after = round_rates(rates[d, near])
+            keep = after >= threshold
+            hits, after = rows[near[keep]], after[keep]
+            order = np.argsort(-after, kind='stable')[:max_crossing]
+            entries.append({
+                'step': step,
+                'value': value,
+                'top_k_mean': round(float(means[d]), 2),
+                'gain': round(gain, 2),
+                # 上限（2.0）で頭打ちになった分は変化量に含めない
+                'gain_per_unit': round(gain / (value - current), 2) if value != current else 0.0,
+                'crossing_count': len(hits),
+                'crossing': [{'job': jobs[i], 'before': float(base[i]), 'after': float(a)}
+                             for i, a in zip(hits[order].tolist(), after[order].tolist())],
+            })
+        results.append({'skill': SKILLS[skill_idx], 'current': current, 'steps': entries})
+
+    reference = int(np.argmin(np.abs(steps - 0.2))) if np.any(np.isclose(steps, 0.2)) \
+        else int(np.argmax(steps))
+    results.sort(key=lambda r: (-r['steps'][reference]['gain'],
+                                -r['steps'][reference]['crossing_count']))
+    return {'baseline': {'top_k_mean': round(base_mean, 2), 'top_k': top_k,
+                         'threshold': threshold, 'above_threshold': int((base >= threshold).sum())},
+            'skills': results}
@@ -0,0 +1,122 @@
+"""
+Plotly を使わない軽量なチャート描画（静的な SVG 文字列）。
+
+ブラウザ側で Plotly を読み込まずに済むため、再描画のたびの CPU 負荷と
+送信量を抑えられます。同じ入力には同じ SVG を返すのでキャッシュしています。
+"""
+import math
+from functools import lru_cache
+from html import escape
+
+CACHE_SIZE = 256
+
+_FONT = "font-family='sans-serif'"
+
+
+def _interpolate(color_from, color_to, t):
+    t = min(1.0, max(0.0, t))
+    rgb = [round(a + (b - a) * t) for a, b in zip(color_from, color_to)]
+    return '#%02x%02x%02x' % tuple(rgb)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def radar_chart_svg(labels, values, max_value=2.0, size=400, title=None,
+                    fill='rgba(30, 144, 255, 0.4)', line='#1E90FF'):
+    """
+    レーダーチャートの SVG を作ります。
+
+    Args:
+        labels (tuple): 軸ラベル
+        values (tuple): 各軸の値（0〜max_value）
+        max_value (float): 外周の値
+        size (int): 一辺のピクセル数
+        title (str): タイトル（任意）
+
+    Returns:
+        str: SVG 文字列
+    """
+    n = len(labels)
+    cx = cy = size / 2
+    radius = size * 0.32
+    top = 30 if title else 0
+    height = size + top
+
+    def point(i, value):
+        angle = -math.pi / 2 + 2 * math.pi * i / n
+        r = radius * max(0.0, min(value, max_value)) / max_value
+        return cx + r * math.cos(angle), cy + top + r * math.sin(angle)
+
+    parts = [f"<svg xmlns='http://www.w3.org/2000/svg' viewBox='0 0 {size} {height}' "
+             f"width='100%' role='img'>"]
+    if title:
+        parts.append(f"<text x='{cx}' y='20' text-anchor='middle' font-size='16' {_FONT}>"
+                     f"{escape(title)}</text>")
+
+    # 目盛りの同心多角形と軸線
+    for step in range(1, 5):
+        ring = ' '.join('%.1f,%.1f' % point(i, max_value * step / 4) for i in range(n))
+        parts.append(f"<polygon points='{ring}' fill='none' stroke='#dddddd'/>")
+    for i, label in enumerate(labels):
+        x, y = point(i, max_value)
+        parts.append(f"<line x1='{cx}' y1='{cy + top}' x2='{x:.1f}' y2='{y:.1f}' stroke='#dddddd'/>")
+        lx, ly = point(i, max_value * 1.18)
+        anchor = 'middle' if abs(lx - cx) < 1 else ('start' if lx > cx else 'end')
+        parts.append(f"<text x='{lx:.1f}' y='{ly:.1f}' text-anchor='{anchor}' "
+                     f"dominant-baseline='middle' font-size='12' {_FONT}>{escape(str(label))}</text>")
+
+    if n:
+        shape = ' '.join('%.1f,%.1f' % point(i, v) for i, v in enumerate(values))
+        parts.append(f"<polygon points='{shape}' fill='{fill}' stroke='{line}' stroke-width='2'/>")
+    parts.append('</svg>')
+    return ''.join(parts)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def bar_chart_svg(names, values, x_max=110, width=640, bar_height=28, title=None,
+                  color_low=(255, 255, 217), color_high=(8, 29, 88)):
+    """
+    横棒グラフの SVG を作ります（上から names の順に並べます）。
+
+    Args:
+        names (tuple): 棒のラベル
+        values (tuple): 棒の値
+        x_max (float): 横軸の最大値
+        title (str): タイトル（任意）
+
+    Returns:
+        str: SVG 文字列
+    """
+    label_width = 200
+    top = 30 if title else 10
+    plot_width = width - label_width - 60
+    height = top + bar_height * len(names) + 30
+    lo = min(values) if values else 0
+    hi = max(values) if values else 1
+
+    parts = [f"<svg xmlns='http://www.w3.org/2000/svg' viewBox='0 0 {width} {height}' "
+             f"width='100%' role='img'>"]
+    if title:
+        parts.append(f"<text x='{width / 2}' y='20' text-anchor='middle' font-size='16' {_FONT}>"
+                     f"{escape(title)}</text>")
+
+    for i, (name, value) in enumerate(zip(names, values)):
+        y = top + i * bar_height
+        w = plot_width * max(0.0, min(value, x_max)) / x_max
+        t = (value - lo) / (hi - lo) if hi > lo else 1.0
+        color = _interpolate(color_low, color_high, 0.25 + 0.75 * t)
+        parts.append(f"<text x='{label_width - 8}' y='{y + bar_height / 2:.1f}' text-anchor='end' "
+                     f"dominant-baseline='middle' font-size='12' {_FONT}>{escape(str(name))}</text>")
+        parts.append(f"<rect x='{label_width}' y='{y + 4}' width='{w:.1f}' "
+                     f"height='{bar_height - 8}' fill='{color}'/>")
+        parts.append(f"<text x='{label_width + w + 6:.1f}' y='{y + bar_height / 2:.1f}' "
+                     f"dominant-baseline='middle' font-size='12' {_FONT}>{value:g}</text>")
+
+    axis_y = top + bar_height * len(names)
+    parts.append(f"<line x1='{label_width}' y1='{axis_y}' x2='{label_width + plot_width}' "
+                 f"y2='{axis_y}' stroke='#999999'/>")
+    for tick in range(0, int(x_max) + 1, 20):
+        x = label_width + plot_width * tick / x_max
+        parts.append(f"<text x='{x:.1f}' y='{axis_y + 16}' text-anchor='middle' "
+                     f"font-size='10' {_FONT}>{tick}</text>")
+    parts.append('</svg>')
+    return ''.join(parts)
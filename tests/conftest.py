@@ -0,0 +1,41 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from evaluator.analysis_cache import AnalysisCache  # noqa: E402
+from evaluator.evaluator.text_analyzer import TextAnalyzer  # noqa: E402
+from tools.stub_openai_server import start_stub_server  # noqa: E402
+
+
+@pytest.fixture
+def stub_server(monkeypatch):
+    """
+    スタブサーバーを起動する関数を返します（引数は StubState と同じ）。
+    OpenAI のクライアントがスタブに接続するよう、環境変数も設定します。
+    """
+    servers = []
+
+    def start(**options):
+        server, state, base_url = start_stub_server(**options)
+        servers.append(server)
+        monkeypatch.setenv('OPENAI_BASE_URL', base_url)
+        monkeypatch.setenv('OPENAI_API_KEY', 'dummy')
+        return state
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def make_analyzer():
+    """メモリ上のキャッシュを使う一括評価用の TextAnalyzer を作る関数を返します。"""
+    def make(**options):
+        options.setdefault('cache', AnalysisCache(':memory:'))
+        return TextAnalyzer(**options)
+    return make
@@ -0,0 +1,107 @@
+"""TextAnalyzer.analyze_batched をスタブサーバーに対して動かすテスト。"""
+import json
+
+from evaluator.local_analyzer import LocalAnalyzer
+from tools.stub_openai_server import stub_scores
+
+
+def responses(n):
+    return [{'r_t_val': f'バッチの回答 {i}', 'r_w_val': f'理由 {i}'} for i in range(n)]
+
+
+def batch_scores(text_responses):
+    # スタブはバッチ内の各候補者のスコアを、その人の回答だけから決める
+    return stub_scores(json.dumps(text_responses, ensure_ascii=False))
+
+
+def single_scores(analyzer, text_responses):
+    return stub_scores(analyzer._build_prompt(text_responses))
+
+
+def fallback_scores(analyzer, text_responses):
+    estimate = LocalAnalyzer().analyze(text_responses)
+    return {skill: estimate.get(skill, 1.0) for skill in analyzer.skills}
+
+
+def test_maps_batch_results_back_to_records(stub_server, make_analyzer):
+    state = stub_server(latency=0.01, jitter=0.05, seed=2)
+    analyzer = make_analyzer(max_concurrency=4)
+    items = responses(23)
+    items.append(dict(items[7]))
+
+    results = analyzer.analyze_batched(items, max_batch_size=5)
+
+    assert results == [batch_scores(r) for r in items]
+    # 個別の再分析はしない（全リクエストがバッチ）
+    assert state.requests == state.batch_requests == 5
+    assert analyzer.batch_stats == {'batches': 5, 'batched': 23, 'retried': 0}
+    assert analyzer.fallbacks == 0
+
+
+def test_retries_missing_or_invalid_candidates_individually(stub_server, make_analyzer):
+    state = stub_server(invalid_rate=0.4, seed=3)
+    analyzer = make_analyzer()
+    items = responses(20)
+
+    results = analyzer.analyze_batched(items, max_batch_size=10)
+
+    retried = 0
+    for r, scores in zip(items, results):
+        if scores != batch_scores(r):
+            assert scores == single_scores(analyzer, r)
+            retried += 1
+    assert retried == state.invalid_results > 0
+    assert analyzer.batch_stats['retried'] == retried
+    assert analyzer.fallbacks == 0
+
+
+def test_never_accepts_a_truncated_batch_reply(stub_server, make_analyzer):
+    # バッチも個別の再分析も途中で途切れる
+    stub_server(truncate_rate=1.0, seed=4)
+    analyzer = make_analyzer()
+    items = responses(6)
+
+    results = analyzer.analyze_batched(items, max_batch_size=3)
+
+    assert analyzer.batch_stats['batched'] == 0
+    assert analyzer.batch_stats['retried'] == len(items)
+    # 読み取れた項目はそのまま、欠けた項目はローカルの推定で補う
+    assert analyzer.fallbacks == len(items)
+    for r, scores in zip(items, results):
+        single, estimate = single_scores(analyzer, r), fallback_scores(analyzer, r)
+        assert set(scores) == set(analyzer.skills)
+        assert all(scores[s] in (single[s], estimate[s]) for s in analyzer.skills)
+        assert analyzer.cache.get(analyzer._cache_key(r)) is None
+
+
+def test_falls_back_per_record_when_retry_fails(stub_server, make_analyzer):
+    # バッチは成功するが、個別の再分析はすべて失敗する
+    state = stub_server(invalid_rate=0.5, single_error_rate=1.0, error_statuses=(500,), seed=5)
+    analyzer = make_analyzer(max_retries=0)
+    items = responses(12)
+
+    results = analyzer.analyze_batched(items, max_batch_size=12)
+
+    fallen_back = 0
+    for r, scores in zip(items, results):
+        if scores == batch_scores(r):
+            assert analyzer.cache.get(analyzer._batch_cache_key(r)) == scores
+        else:
+            assert scores == fallback_scores(analyzer, r)
+            assert analyzer.cache.get(analyzer._cache_key(r)) is None
+            fallen_back += 1
+    assert fallen_back == state.invalid_results == analyzer.fallbacks > 0
+
+
+def test_batch_results_do_not_answer_single_requests(stub_server, make_analyzer):
+    state = stub_server()
+    analyzer = make_analyzer()
+    items = responses(4)
+
+    assert analyzer.analyze_batched(items) == [batch_scores(r) for r in items]
+    # 同じ回答でも、1人分のプロンプトの結果はバッチのキャッシュから返さない
+    assert analyzer.analyze_many(items) == [single_scores(analyzer, r) for r in items]
+    assert state.requests == 1 + len(items)
+    # バッチで再度分析するときは、どちらのキャッシュも使える
+    assert analyzer.analyze_batched(items) == [batch_scores(r) for r in items]
+    assert state.requests == 1 + len(items)
@@ -0,0 +1,94 @@
+"""evaluator.bulk の一括評価のテスト。"""
+import json
+import os
+
+import pytest
+
+from evaluator.bulk import CheckpointMismatch, run
+from evaluator.local_analyzer import LocalAnalyzer
+
+DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       'data', 'job_database.json')
+
+
+def write_input(path, lines):
+    with open(path, 'a', encoding='utf-8') as f:
+        for line in lines:
+            f.write((line if isinstance(line, str) else json.dumps(line, ensure_ascii=False)) + '\n')
+
+
+def record(i):
+    return {'id': i, 'r_t_val': f'回答 {i}', 'c_t_val': '1200×6×20=144000'}
+
+
+def read_output(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    assert b'\0' not in data
+    return [json.loads(line) for line in data.decode('utf-8').splitlines()]
+
+
+def run_local(tmp_path, **options):
+    return run(str(tmp_path / 'in.jsonl'), str(tmp_path / 'out.jsonl'),
+               checkpoint_path=str(tmp_path / 'out.ckpt'), db_path=DB_PATH,
+               analyzer=LocalAnalyzer(), progress_interval=60, **options)
+
+
+def test_records_invalid_lines_and_keeps_going(tmp_path):
+    write_input(tmp_path / 'in.jsonl', [record(0), '{"id": 1, "r_t_val": ', '', '[1, 2]', record(3)])
+
+    assert run_local(tmp_path, batch_size=2) == 4
+
+    rows = read_output(tmp_path / 'out.jsonl')
+    assert [row['id'] for row in rows] == [0, None, None, 3]
+    assert rows[1]['error'].startswith('invalid JSON')
+    assert rows[2]['error'] == 'expected a JSON object, got list'
+    # input_offset はその行の先頭（読み直して確認できる）
+    with open(tmp_path / 'in.jsonl', 'rb') as f:
+        f.seek(rows[1]['input_offset'])
+        assert f.readline().startswith(b'{"id": 1,')
+    assert rows[0]['fallback'] is False and rows[0]['matches']
+
+
+def test_resumes_after_the_checkpoint(tmp_path):
+    write_input(tmp_path / 'in.jsonl', [record(i) for i in range(3)])
+    assert run_local(tmp_path) == 3
+    write_input(tmp_path / 'in.jsonl', [record(i) for i in range(3, 5)])
+
+    assert run_local(tmp_path) == 2
+    assert [row['id'] for row in read_output(tmp_path / 'out.jsonl')] == list(range(5))
+
+
+@pytest.mark.parametrize('damage', ['missing', 'shorter'])
+def test_refuses_to_resume_when_output_is_behind_the_checkpoint(tmp_path, damage):
+    write_input(tmp_path / 'in.jsonl', [record(i) for i in range(3)])
+    run_local(tmp_path)
+    out = tmp_path / 'out.jsonl'
+    if damage == 'missing':
+        out.unlink()
+    else:
+        out.write_bytes(out.read_bytes()[:10])
+
+    with pytest.raises(CheckpointMismatch):
+        run_local(tmp_path)
+    if damage == 'shorter':
+        assert len(out.read_bytes()) == 10
+
+
+@pytest.mark.parametrize('batched_prompts', [False, True])
+def test_marks_records_answered_by_the_fallback(stub_server, make_analyzer, tmp_path,
+                                                batched_prompts):
+    # バッチは成功するが一部の候補者が欠落・範囲外で、個別の再分析はすべて失敗する
+    # （バッチを使わない場合は全員が失敗する）
+    state = stub_server(invalid_rate=0.5, single_error_rate=1.0, error_statuses=(500,), seed=7)
+    analyzer = make_analyzer(max_retries=0)
+    write_input(tmp_path / 'in.jsonl', [record(i) for i in range(8)])
+
+    run(str(tmp_path / 'in.jsonl'), str(tmp_path / 'out.jsonl'), db_path=DB_PATH,
+        analyzer=analyzer, progress_interval=60, batched_prompts=batched_prompts)
+
+    flags = [row['fallback'] for row in read_output(tmp_path / 'out.jsonl')]
+    expected = state.invalid_results if batched_prompts else len(flags)
+    assert sum(flags) == analyzer.fallbacks == expected > 0
+    if batched_prompts:
+        assert not all(flags)
@@ -0,0 +1,42 @@
+"""utils.cohort_analytics のテスト。"""
+import threading
+
+from utils.cohort_analytics import CohortAnalytics
+from utils.evaluation_store import EvaluationStore
+
+
+def fill_store(path, n, start=0):
+    store = EvaluationStore(path)
+    store.add_many({'candidate_id': f'c{i % 50}', 'timestamp': f'2026-10-{1 + i % 28:02d}T09:00:00',
+                    'scores': {'読解力': 1.0 + (i % 10) / 10},
+                    'job_matches': [{'job_id': i % 7, 'name': f'職種{i % 7}', 'match_rate': 80.0}],
+                    'source': f'test:{i}'}
+                   for i in range(start, start + n))
+    store.close()
+
+
+def test_concurrent_refreshes_count_each_evaluation_once(tmp_path):
+    path = str(tmp_path / 'store.sqlite3')
+    fill_store(path, 5000)
+    instances = [CohortAnalytics(path, db_path=None) for _ in range(3)]
+    barrier = threading.Barrier(len(instances))
+    added = []
+
+    def refresh(analytics):
+        barrier.wait()
+        added.append(analytics.refresh(batch_size=500))
+
+    threads = [threading.Thread(target=refresh, args=(a,)) for a in instances]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sum(added) == 5000
+    assert all(a.rollup().evaluations == 5000 for a in instances)
+
+    # 追加分だけを反映する
+    fill_store(path, 10, start=5000)
+    assert instances[0].refresh() == 10
+    assert instances[1].refresh() == 0
+    assert instances[2].rollup().evaluations == 5010
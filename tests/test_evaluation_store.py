@@ -0,0 +1,69 @@
+"""utils.evaluation_store のテスト。"""
+import json
+
+import pytest
+
+from utils import evaluation_store
+from utils.evaluation_store import EvaluationStore, pseudonymous_id, source_id
+
+
+@pytest.fixture
+def secret(monkeypatch):
+    monkeypatch.setattr(evaluation_store, '_id_secret', None)
+    monkeypatch.delenv(evaluation_store.SECRET_FILE_ENV, raising=False)
+    monkeypatch.setenv(evaluation_store.SECRET_ENV, 'test-secret')
+    yield
+    evaluation_store._id_secret = None
+
+
+def test_requires_a_shared_secret(monkeypatch):
+    monkeypatch.setattr(evaluation_store, '_id_secret', None)
+    monkeypatch.delenv(evaluation_store.SECRET_ENV, raising=False)
+    monkeypatch.delenv(evaluation_store.SECRET_FILE_ENV, raising=False)
+    with pytest.raises(RuntimeError, match=evaluation_store.SECRET_ENV):
+        pseudonymous_id('山田太郎')
+
+
+def test_secret_file_is_created_once_for_development(monkeypatch, tmp_path):
+    path = tmp_path / 'cfg' / 'secret'
+    monkeypatch.delenv(evaluation_store.SECRET_ENV, raising=False)
+    monkeypatch.setenv(evaluation_store.SECRET_FILE_ENV, str(path))
+    monkeypatch.setattr(evaluation_store, '_id_secret', None)
+    first = pseudonymous_id('山田 太郎')
+    monkeypatch.setattr(evaluation_store, '_id_secret', None)
+    assert pseudonymous_id('山田　太郎') == first
+    assert path.stat().st_mode & 0o777 == 0o600
+
+
+def write_legacy(directory, filename, data):
+    path = directory / filename
+    path.write_text(data if isinstance(data, str) else json.dumps(data, ensure_ascii=False),
+                    encoding='utf-8')
+    return path
+
+
+def test_migration_uses_the_filename_and_skips_bad_files(secret, tmp_path):
+    legacy = tmp_path / 'evaluations'
+    legacy.mkdir()
+    write_legacy(legacy, 'eval_山田_太郎_20240101_120000.json', {'scores': {'読解力': 1.2}})
+    write_legacy(legacy, 'eval_佐藤_20240102_090000.json',
+                 {'name': '佐藤', 'timestamp': '20240102_093000', 'scores': {}})
+    write_legacy(legacy, 'eval_鈴木_20240103_100000.json', '{"name": "鈴木", ')
+    write_legacy(legacy, 'eval_不明.json', {'scores': {}})
+    store = EvaluationStore(str(tmp_path / 'store.sqlite3'))
+
+    result = store.migrate_from_directory(str(legacy))
+
+    assert result['imported'] == 2
+    assert sorted(p.rsplit('/', 1)[-1] for p in result['skipped']) == [
+        'eval_不明.json', 'eval_鈴木_20240103_100000.json']
+    yamada = store.latest(pseudonymous_id('山田_太郎'))
+    assert yamada['timestamp'] == '2024-01-01T12:00:00'
+    assert store.latest(pseudonymous_id('佐藤'))['timestamp'] == '2024-01-02T09:30:00'
+    # source には氏名を含むファイル名を残さない
+    sources = [row[0] for row in store._conn.execute('SELECT source FROM evaluations')]
+    assert sources == [source_id(legacy / 'eval_山田_太郎_20240101_120000.json'),
+                       source_id(legacy / 'eval_佐藤_20240102_090000.json')]
+    assert not any('山田' in s or '佐藤' in s for s in sources)
+    # 2回目は重複して取り込まない
+    assert store.migrate_from_directory(str(legacy))['imported'] == 0
@@ -0,0 +1,47 @@
+"""evaluator.job_catalog.get_job_catalog の読み直しのテスト。"""
+import json
+import logging
+import os
+
+import pytest
+
+from evaluator.job_catalog import get_job_catalog
+
+
+def job(i):
+    return {'id': i, 'name': f'職種 {i}', 'category': 'cleaning', 'required_scores': {'読解力': 1.0}}
+
+
+def write_db(path, n_jobs, mtime_ns):
+    path.write_text(json.dumps({'jobs': [job(i) for i in range(n_jobs)]}, ensure_ascii=False),
+                    encoding='utf-8')
+    # 同じ秒に何度も書き換えても読み直すよう、mtime を明示する
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_keeps_the_previous_catalog_when_a_reload_fails(tmp_path, caplog):
+    path = tmp_path / 'jobs.json'
+    write_db(path, 2, 1_000_000_000)
+    first = get_job_catalog(str(path))
+    assert len(first) == 2
+
+    # 書き込み途中のファイル
+    path.write_text('{"jobs": [{"id": 1, "na', encoding='utf-8')
+    os.utime(path, ns=(2_000_000_000, 2_000_000_000))
+    with caplog.at_level(logging.ERROR, logger='evaluator.job_catalog'):
+        assert get_job_catalog(str(path)) is first
+        assert get_job_catalog(str(path)) is first
+    # 同じ壊れたファイルは、変わるまで読み直さない（ログも1回だけ）
+    assert len(caplog.records) == 1
+
+    # 書き終わったら読み直す
+    write_db(path, 3, 3_000_000_000)
+    assert len(get_job_catalog(str(path))) == 3
+
+
+def test_first_load_failure_is_raised(tmp_path):
+    path = tmp_path / 'jobs.json'
+    path.write_text('{"jobs": [', encoding='utf-8')
+
+    with pytest.raises(ValueError):
+        get_job_catalog(str(path))
@@ -0,0 +1,65 @@
+"""metrics.write_prometheus と SlowRequestProfiler のテスト。"""
+import os
+import threading
+
+import pytest
+
+from evaluator import metrics
+
+
+def test_concurrent_writes_replace_the_file_atomically(tmp_path):
+    registry = metrics.Registry()
+    registry.inc('analyzer_fallbacks_total')
+    path = tmp_path / 'olys.prom'
+    errors = []
+
+    def write():
+        try:
+            for _ in range(50):
+                metrics.write_prometheus(str(path), registry)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    assert path.read_text(encoding='utf-8') == registry.render()
+    # 一時ファイルは残らない
+    assert os.listdir(tmp_path) == ['olys.prom']
+
+
+def test_write_error_leaves_no_temporary_file(tmp_path):
+    target = tmp_path / 'metrics'
+    target.mkdir()
+    # 置き換え先がディレクトリなので os.replace が失敗する
+    with pytest.raises(OSError):
+        metrics.write_prometheus(str(target))
+    assert os.listdir(tmp_path) == ['metrics']
+
+
+def test_profiles_in_the_same_second_do_not_overwrite_each_other(tmp_path):
+    profiler = metrics.SlowRequestProfiler(str(tmp_path), slow_ms=0)
+    for _ in range(3):
+        with profiler('match'):
+            pass
+
+    names = sorted(os.listdir(tmp_path))
+    assert len([n for n in names if n.endswith('.prof')]) == 3
+    assert len([n for n in names if n.endswith('.txt')]) == 3
+
+
+def test_profile_save_error_does_not_fail_the_request(tmp_path, caplog):
+    # 保存先がファイルなので makedirs が失敗する
+    target = tmp_path / 'profiles'
+    target.write_text('', encoding='utf-8')
+    profiler = metrics.SlowRequestProfiler(str(target), slow_ms=0)
+
+    with profiler('match'):
+        result = 'done'
+
+    assert result == 'done'
+    assert 'プロファイルを保存できませんでした' in caplog.text
@@ -0,0 +1,25 @@
+"""utils.report_export の書き出しのテスト。"""
+import os
+
+from utils.report_export import export_reports
+
+
+def evaluation(candidate_id, timestamp, name):
+    return {'candidate_id': candidate_id, 'timestamp': timestamp, 'scores': {'読解力': 1.2},
+            'job_matches': [{'job_id': 1, 'name': name, 'match_rate': 80.0}]}
+
+
+def test_evaluations_in_the_same_second_get_separate_reports(tmp_path):
+    evaluations = [evaluation('abc', '2026-04-01T10:00:00', f'職種{i}') for i in range(3)]
+    evaluations.append(evaluation('abc', '2026-04-01T10:00:01', '職種3'))
+
+    summary = export_reports(evaluations, str(tmp_path), db_path=None, workers=1, chunk_size=2,
+                             stream=None)
+
+    assert summary['reports'] == 4
+    assert sorted(os.listdir(tmp_path)) == [
+        'abc_2026-04-01_100000.html', 'abc_2026-04-01_100000_2.html', 'abc_2026-04-01_100000_3.html',
+        'abc_2026-04-01_100001.html', 'index.html']
+    assert '職種2' in (tmp_path / 'abc_2026-04-01_100000_3.html').read_text(encoding='utf-8')
+    index = (tmp_path / 'index.html').read_text(encoding='utf-8')
+    assert "href='abc_2026-04-01_100000_2.html'" in index
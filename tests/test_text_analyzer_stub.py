@@ -0,0 +1,136 @@
+"""TextAnalyzer.analyze_many をスタブサーバーに対して動かすテスト。"""
+import threading
+import time
+
+import pytest
+
+from evaluator.local_analyzer import LocalAnalyzer
+from evaluator.rate_limit import TokenBucket
+from tools.stub_openai_server import stub_scores
+
+
+def responses(n, prefix='回答'):
+    return [{'r_t_val': f'{prefix} {i}', 'r_w_val': f'理由 {i}'} for i in range(n)]
+
+
+def expected_scores(analyzer, responses_list):
+    return [stub_scores(analyzer._build_prompt(r)) for r in responses_list]
+
+
+def fallback_scores(analyzer, text_responses):
+    estimate = LocalAnalyzer().analyze(text_responses)
+    return {skill: estimate.get(skill, 1.0) for skill in analyzer.skills}
+
+
+def test_results_follow_input_order(stub_server, make_analyzer):
+    # 遅延に揺らぎを入れて、応答の届く順序を入力と変える
+    state = stub_server(latency=0.01, jitter=0.05, seed=1)
+    analyzer = make_analyzer(max_concurrency=8)
+    items = responses(12)
+    items.insert(5, dict(items[2]))
+
+    results = analyzer.analyze_many(items)
+
+    assert results == expected_scores(analyzer, items)
+    # 同じ回答は1回だけ問い合わせる
+    assert state.requests == 12
+    assert analyzer.fallbacks == 0
+
+
+@pytest.mark.parametrize('status', [429, 500, 503])
+def test_retries_rate_limit_and_server_errors(stub_server, make_analyzer, status):
+    state = stub_server(fail_first=3, error_statuses=(status,))
+    analyzer = make_analyzer(max_concurrency=2, max_retries=5)
+    items = responses(4)
+
+    results = analyzer.analyze_many(items)
+
+    assert results == expected_scores(analyzer, items)
+    assert state.errors == 3
+    assert state.requests == len(items) + 3
+    assert analyzer.fallbacks == 0
+
+
+def test_does_not_retry_client_errors(stub_server, make_analyzer):
+    state = stub_server(error_rate=1.0, error_statuses=(400,))
+    analyzer = make_analyzer(max_retries=5)
+    items = responses(3)
+
+    results = analyzer.analyze_many(items)
+
+    assert state.requests == len(items)
+    assert results == [fallback_scores(analyzer, r) for r in items]
+
+
+def test_limits_request_rate_and_concurrency(stub_server, make_analyzer):
+    state = stub_server(latency=0.02)
+    analyzer = make_analyzer(max_concurrency=2)
+    # 1秒あたり20リクエスト（バーストは1件まで）に絞る
+    analyzer.rate_limiter.requests = TokenBucket(1, 20)
+    items = responses(6)
+
+    started = time.monotonic()
+    results = analyzer.analyze_many(items)
+    elapsed = time.monotonic() - started
+
+    assert results == expected_scores(analyzer, items)
+    assert elapsed >= (len(items) - 1) / 20 * 0.9
+    assert state.max_in_flight <= 2
+
+
+def test_falls_back_to_local_estimate_when_api_fails(stub_server, make_analyzer):
+    stub_server(error_rate=1.0, error_statuses=(500,))
+    analyzer = make_analyzer(max_retries=1)
+    items = responses(3)
+
+    results = analyzer.analyze_many(items)
+
+    assert results == [fallback_scores(analyzer, r) for r in items]
+    assert analyzer.fallbacks == len(items)
+    # 推定したスコアはキャッシュしない（API が回復したら問い合わせ直す）
+    assert all(analyzer.cache.get(analyzer._cache_key(r)) is None for r in items)
+
+
+def analyze_streams_concurrently(analyzer, text_responses, n):
+    results, received = [None] * n, [None] * n
+    barrier = threading.Barrier(n)
+
+    def run(i):
+        scores = received[i] = {}
+        barrier.wait()
+        results[i] = analyzer.analyze(
+            text_responses, stream=True, on_score=lambda skill, value, _: scores.update({skill: value}))
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, received
+
+
+def test_concurrent_streams_share_one_request(stub_server, make_analyzer):
+    state = stub_server(latency=0.2)
+    analyzer = make_analyzer()
+    text_responses = responses(1)[0]
+
+    results, received = analyze_streams_concurrently(analyzer, text_responses, 4)
+
+    expected = stub_scores(analyzer._build_prompt(text_responses))
+    assert state.requests == 1
+    assert results == [expected] * 4
+    # 待っていた呼び出しにも、すべての項目が on_score で届く
+    assert received == [expected] * 4
+    assert analyzer.cache.get(analyzer._cache_key(text_responses)) == expected
+
+
+def test_truncated_stream_is_shared_but_not_cached(stub_server, make_analyzer):
+    state = stub_server(latency=0.2, truncate_rate=1.0, seed=3)
+    analyzer = make_analyzer()
+    text_responses = responses(1)[0]
+
+    results, _ = analyze_streams_concurrently(analyzer, text_responses, 3)
+
+    assert state.requests == 1
+    assert results[1:] == results[:-1]
+    assert analyzer.cache.get(analyzer._cache_key(text_responses)) is None
@@ -0,0 +1,263 @@
+"""
+OpenAI の Chat Completions エンドポイントを模したローカルのスタブサーバー。
+
+TextAnalyzer の一括分析（analyze_many）を、実際の API を呼ばずに
+遅延・エラー注入つきで動作確認するためのものです。
+複数人分の回答（analyze_batched）を含むプロンプトには候補者ごとのスコアを返し、
+--invalid-rate で一部の候補者の結果を欠落・範囲外にできます。
+"stream": true のリクエストには、回答を --chunk-size 文字ずつ SSE で返します。
+--truncate-rate は出力上限で途切れた応答（finish_reason が length）を模します。
+
+    python tools/stub_openai_server.py --port 8089 --latency 0.3 --error-rate 0.2
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=dummy python ...
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from evaluator.skills import SKILLS  # noqa: E402
+
+
+def stub_scores(text):
+    """入力テキストから決定的なスコア（0.5〜2.0）を作ります。"""
+    digest = hashlib.sha256(text.encode('utf-8')).digest()
+    return {skill: round(0.5 + digest[i] / 255 * 1.5, 2) for i, skill in enumerate(SKILLS)}
+
+
+def batch_candidates(prompt):
+    """バッチのプロンプトから (id, 回答) を取り出します。バッチでなければ空のリストです。"""
+    items = []
+    for line in prompt.splitlines():
+        line = line.strip()
+        if not line.startswith('{"id"'):
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError:
+            continue
+        items.append((item.get('id'), item.get('responses')))
+    return items
+
+
+class StubState:
+    """注入する遅延・エラーの設定と、受け付けたリクエストの統計。"""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, error_statuses=(429, 500, 503),
+                 fail_first=0, invalid_rate=0.0, chunk_size=8, chunk_delay=0.0,
+                 truncate_rate=0.0, single_error_rate=None, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        # 1人分のリクエスト（バッチ以外）だけに適用するエラー率（None なら error_rate）
+        self.single_error_rate = single_error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.fail_first = fail_first
+        self.invalid_rate = invalid_rate
+        self.chunk_size = max(1, int(chunk_size))
+        self.chunk_delay = chunk_delay
+        self.truncate_rate = truncate_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.batch_requests = 0
+        self.invalid_results = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+
+def _prompt(payload):
+    return ''.join(m.get('content', '') for m in payload.get('messages', [])
+                   if m.get('role') == 'user')
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, body):
+            data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            if not self.path.rstrip('/').endswith('/chat/completions'):
+                self._send_json(404, {'error': {'message': 'not found'}})
+                return
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length) or b'{}')
+            error_rate = state.error_rate
+            if state.single_error_rate is not None and not batch_candidates(_prompt(payload)):
+                error_rate = state.single_error_rate
+
+            with state.lock:
+                state.requests += 1
+                state.in_flight += 1
+                state.max_in_flight = max(state.max_in_flight, state.in_flight)
+                fail = state.requests <= state.fail_first or state.random.random() < error_rate
+                status = state.random.choice(state.error_statuses) if fail else 200
+                delay = state.latency + state.random.uniform(0, state.jitter)
+            try:
+                time.sleep(delay)
+                if fail:
+                    with state.lock:
+                        state.errors += 1
+                    self._send_json(status, {'error': {'message': 'injected error',
+                                                       'type': 'stub_error', 'code': status}})
+                    return
+                completion = self._completion(payload)
+                if payload.get('stream'):
+                    self._send_stream(completion)
+                else:
+                    self._truncate(completion)
+                    self._send_json(200, completion)
+            finally:
+                with state.lock:
+                    state.in_flight -= 1
+
+        def _completion(self, payload):
+            prompt = _prompt(payload)
+            candidates = batch_candidates(prompt)
+            if candidates:
+                content = json.dumps({'results': self._batch_results(candidates)},
+                                     ensure_ascii=False)
+            else:
+                content = json.dumps(stub_scores(prompt), ensure_ascii=False)
+            prompt_tokens = sum(len(m.get('content', '')) for m in payload.get('messages', []))
+            return {
+                'id': 'chatcmpl-stub',
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': payload.get('model', 'stub'),
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': content},
+                    'finish_reason': 'stop',
+                }],
+                'usage': {
+                    'prompt_tokens': prompt_tokens,
+                    'completion_tokens': len(content),
+                    'total_tokens': prompt_tokens + len(content),
+                },
+            }
+
+        def _truncate(self, completion):
+            """truncate_rate の割合で、出力上限で途切れた応答にします。"""
+            choice = completion['choices'][0]
+            content = choice['message']['content']
+            with state.lock:
+                if state.random.random() < state.truncate_rate:
+                    choice['message']['content'] = \
+                        content[:state.random.randint(1, max(1, len(content) - 1))]
+                    choice['finish_reason'] = 'length'
+
+        def _send_stream(self, completion):
+            self._truncate(completion)
+            content = completion['choices'][0]['message']['content']
+            finish_reason = completion['choices'][0]['finish_reason']
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.end_headers()
+            pieces = [content[i:i + state.chunk_size]
+                      for i in range(0, len(content), state.chunk_size)]
+            for i, piece in enumerate(pieces):
+                delta = {'role': 'assistant', 'content': piece} if i == 0 else {'content': piece}
+                self._send_event(completion, delta, None)
+                if state.chunk_delay:
+                    time.sleep(state.chunk_delay)
+            self._send_event(completion, {}, finish_reason)
+            self.wfile.write(b'data: [DONE]\n\n')
+            self.wfile.flush()
+
+        def _send_event(self, completion, delta, finish_reason):
+            chunk = {
+                'id': completion['id'],
+                'object': 'chat.completion.chunk',
+                'created': completion['created'],
+                'model': completion['model'],
+                'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}],
+            }
+            data = json.dumps(chunk, ensure_ascii=False)
+            self.wfile.write(f'data: {data}\n\n'.encode('utf-8'))
+            self.wfile.flush()
+
+        def _batch_results(self, candidates):
+            # 候補者ごとのスコアは回答の内容だけから決まる（バッチの組み合わせに依存しない）
+            results = {}
+            with state.lock:
+                state.batch_requests += 1
+                for cid, responses in candidates:
+                    scores = stub_scores(json.dumps(responses, ensure_ascii=False))
+                    if state.random.random() < state.invalid_rate:
+                        state.invalid_results += 1
+                        if state.random.random() < 0.5:
+                            continue                      # 欠落
+                        scores[SKILLS[0]] = 9.9           # 範囲外
+                    results[cid] = scores
+            return results
+
+    return Handler
+
+
+def start_stub_server(host='127.0.0.1', port=0, **options):
+    """
+    スタブサーバーを別スレッドで起動します。
+
+    Returns:
+        tuple: (サーバー, StubState, base_url)
+    """
+    state = StubState(**options)
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://{host}:{server.server_address[1]}/v1"
+    return server, state, base_url
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Chat Completions のスタブサーバー')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', type=float, default=0.0, help='応答までの遅延（秒）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='遅延に加える揺らぎ（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='エラーを返す割合（0〜1）')
+    parser.add_argument('--fail-first', type=int, default=0, help='最初のN件を必ずエラーにする')
+    parser.add_argument('--single-error-rate', type=float, default=None,
+                        help='1人分のリクエスト（バッチ以外）だけのエラー率（0〜1。省略時は --error-rate）')
+    parser.add_argument('--invalid-rate', type=float, default=0.0,
+                        help='バッチの応答で候補者の結果を欠落・範囲外にする割合（0〜1）')
+    parser.add_argument('--chunk-size', type=int, default=8, help='ストリーミングの1チャンクの文字数')
+    parser.add_argument('--chunk-delay', type=float, default=0.0, help='チャンクごとの遅延（秒）')
+    parser.add_argument('--truncate-rate', type=float, default=0.0,
+                        help='出力を途中で打ち切る割合（0〜1）')
+    args = parser.parse_args()
+
+    server, _, base_url = start_stub_server(
+        args.host, args.port, latency=args.latency, jitter=args.jitter,
+        error_rate=args.error_rate, fail_first=args.fail_first, invalid_rate=args.invalid_rate,
+        chunk_size=args.chunk_size, chunk_delay=args.chunk_delay, truncate_rate=args.truncate_rate,
+        single_error_rate=args.single_error_rate)
+    print(f"stub server listening on {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,496 @@
+"""
+保存済みの評価全体を対象にした集計（コホート分析）。
+
+評価を1回だけ順に読み、次の値をオンラインで更新します。
+- スキル別・evaluation_criteria.json のカテゴリ別のスコア分布（Welford 法の平均・分散と、分位点用のヒストグラム）
+- 各職種が上位3件に入った回数
+- job_categories ごとのマッチ率のヒストグラム
+
+集計は評価日ごとの部分集計（ロールアップ）として SQLite に保存します。
+次回は前回以降に追加された評価だけを読んで該当日のロールアップに足し込むため、
+ダッシュボードは小さな部分集計をマージするだけで済みます。
+
+    python -m utils.cohort_analytics                          # 更新して全期間を表示
+    python -m utils.cohort_analytics --start 2026-10-01 --json
+"""
+import argparse
+import json
+import math
+import os
+import sqlite3
+import threading
+from collections import Counter
+
+from evaluator.job_catalog import DEFAULT_DB_PATH, get_job_catalog
+from evaluator.skills import SKILL_INDEX, SKILLS
+from utils.evaluation_store import DEFAULT_STORE_PATH, EvaluationStore, to_timestamp
+
+DEFAULT_CRITERIA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                     'data', 'evaluation_criteria.json')
+
+# スコア（0〜2.0）は 0.01 刻み、マッチ率（0〜120%）は 1% 刻みのヒストグラムで分位点を求める
+SCORE_RANGE = (0.0, 2.0, 200)
+RATE_RANGE = (0.0, 120.0, 120)
+QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+
+class RunningStats:
+    """Welford 法による件数・平均・分散・最小・最大。merge で部分集計どうしを合成できます。"""
+    __slots__ = ('count', 'mean', 'm2', 'min', 'max')
+
+    def __init__(self, count=0, mean=0.0, m2=0.0, min=None, max=None):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.min = min
+        self.max = max
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+        # Chan らの並列アルゴリズム
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return self
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.count = total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    def to_dict(self):
+        return {'count': self.count, 'mean': self.mean, 'm2': self.m2,
+                'min': self.min, 'max': self.max}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+class HistogramSketch:
+    """
+    範囲が決まっている値の固定幅ヒストグラム。
+    分位点はビン内の線形補間で求めます（誤差はビン幅以内）。ビンごとの加算でマージできます。
+    """
+    __slots__ = ('lo', 'hi', 'counts')
+
+    def __init__(self, lo, hi, bins, counts=None):
+        self.lo = lo
+        self.hi = hi
+        self.counts = list(counts) if counts is not None else [0] * bins
+
+    def _bin(self, value):
+        bins = len(self.counts)
+        pos = int((value - self.lo) / (self.hi - self.lo) * bins)
+        # 範囲外の値は端のビンに入れる
+        return min(bins - 1, max(0, pos))
+
+    def add(self, value):
+        self.counts[self._bin(value)] += 1
+
+    def merge(self, other):
+        if (other.lo, other.hi, len(other.counts)) != (self.lo, self.hi, len(self.counts)):
+            raise ValueError("histograms with different bins cannot be merged")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        return self
+
+    @property
+    def total(self):
+        return sum(self.counts)
+
+    def quantile(self, q):
+        total = self.total
+        if total == 0:
+            return None
+        width = (self.hi - self.lo) / len(self.counts)
+        target = q * total
+        seen = 0
+        for i, c in enumerate(self.counts):
+            if c and seen + c >= target:
+                return self.lo + width * (i + (target - seen) / c)
+            seen += c
+        return self.hi
+
+    def histogram(self, bins=None):
+        """(下端, 上端, 件数) のリスト。bins を指定すると隣接ビンをまとめて粗くします。"""
+        step = max(1, len(self.counts) // bins) if bins else 1
+        width = (self.hi - self.lo) / len(self.counts)
+        return [(round(self.lo + i * width, 6), round(self.lo + min(i + step, len(self.counts)) * width, 6),
+                 sum(self.counts[i:i + step])) for i in range(0, len(self.counts), step)]
+
+    def to_dict(self):
+        return {'lo': self.lo, 'hi': self.hi, 'counts': self.counts}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['lo'], data['hi'], len(data['counts']), data['counts'])
+
+
+class Distribution:
+    """RunningStats と HistogramSketch の組。"""
+    __slots__ = ('stats', 'sketch')
+
+    def __init__(self, value_range, stats=None, sketch=None):
+        self.stats = stats or RunningStats()
+        self.sketch = sketch or HistogramSketch(*value_range)
+
+    def add(self, value):
+        self.stats.add(value)
+        self.sketch.add(value)
+
+    def merge(self, other):
+        self.stats.merge(other.stats)
+        self.sketch.merge(other.sketch)
+        return self
+
+    def summary(self, histogram_bins=None):
+        result = {
+            'count': self.stats.count,
+            'mean': round(self.stats.mean, 4) if self.stats.count else None,
+            'std': round(self.stats.std, 4) if self.stats.count else None,
+            'min': self.stats.min,
+            'max': self.stats.max,
+        }
+        for q in QUANTILES:
+            value = self.sketch.quantile(q)
+            result[f"p{round(q * 100)}"] = round(value, 3) if value is not None else None
+        if histogram_bins:
+            result['histogram'] = self.sketch.histogram(histogram_bins)
+        return result
+
+    def to_dict(self):
+        return {'stats': self.stats.to_dict(), 'sketch': self.sketch.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(None, RunningStats.from_dict(data['stats']),
+                   HistogramSketch.from_dict(data['sketch']))
+
+
+def load_criteria_categories(path=DEFAULT_CRITERIA_PATH):
+    """evaluation_criteria.json のカテゴリ名 → スキル名のタプルを返します。"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return {name: tuple(c.get('skills', ())) for name, c in data.get('categories', {}).items()}
+
+
+class CohortRollup:
+    """評価の集合（1日分、または複数日をマージしたもの）の部分集計。"""
+
+    def __init__(self):
+        self.evaluations = 0
+        self.skills = {}            # スキル名 → Distribution
+        self.categories = {}        # 評価基準のカテゴリ → Distribution（カテゴリ内スキルの平均）
+        self.top1 = Counter()       # job_id → 1位になった回数
+        self.top3 = Counter()       # job_id → 上位3件に入った回数
+        self.match_rates = {}       # 職種カテゴリ → Distribution（保存済みの上位マッチのマッチ率）
+
+    @staticmethod
+    def _distribution(table, key, value_range):
+        dist = table.get(key)
+        if dist is None:
+            dist = table[key] = Distribution(value_range)
+        return dist
+
+    def add(self, evaluation, criteria, job_categories):
+        """
+        Args:
+            evaluation (dict): EvaluationStore の payload
+            criteria (dict): 評価基準のカテゴリ → スキル名
+            job_categories (dict): job_id → 職種カテゴリ
+        """
+        self.evaluations += 1
+        # 英語の別名（reading など）も日本語のスキル名に揃える
+        scores = {}
+        for key, value in (evaluation.get('scores') or {}).items():
+            idx = SKILL_INDEX.get(key)
+            if idx is not None and isinstance(value, (int, float)) and not isinstance(value, bool):
+                scores[SKILLS[idx]] = float(value)
+        for skill, value in scores.items():
+            self._distribution(self.skills, skill, SCORE_RANGE).add(value)
+        for category, skills in criteria.items():
+            values = [scores[s] for s in skills if s in scores]
+            if values:
+                self._distribution(self.categories, category, SCORE_RANGE).add(
+                    sum(values) / len(values))
+
+        matches = evaluation.get('job_matches') or []
+        for rank, match in enumerate(matches):
+            job_id = match.get('job_id')
+            if rank == 0:
+                self.top1[job_id] += 1
+            if rank < 3:
+                self.top3[job_id] += 1
+            rate = match.get('match_rate')
+            if isinstance(rate, (int, float)):
+                category = job_categories.get(job_id, 'unknown')
+                self._distribution(self.match_rates, category, RATE_RANGE).add(float(rate))
+
+    def merge(self, other):
+        self.evaluations += other.evaluations
+        for mine, theirs in ((self.skills, other.skills), (self.categories, other.categories),
+                             (self.match_rates, other.match_rates)):
+            for key, dist in theirs.items():
+                if key in mine:
+                    mine[key].merge(dist)
+                else:
+                    mine[key] = Distribution.from_dict(dist.to_dict())
+        self.top1.update(other.top1)
+        self.top3.update(other.top3)
+        return self
+
+    def to_dict(self):
+        return {
+            'evaluations': self.evaluations,
+            'skills': {k: d.to_dict() for k, d in self.skills.items()},
+            'categories': {k: d.to_dict() for k, d in self.categories.items()},
+            # JSON のキーは文字列になるため、job_id は [id, 回数] の組で保存する
+            'top1': list(self.top1.items()),
+            'top3': list(self.top3.items()),
+            'match_rates': {k: d.to_dict() for k, d in self.match_rates.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        rollup = cls()
+        rollup.evaluations = data['evaluations']
+        rollup.skills = {k: Distribution.from_dict(d) for k, d in data['skills'].items()}
+        rollup.categories = {k: Distribution.from_dict(d) for k, d in data['categories'].items()}
+        rollup.top1 = Counter(dict((k, v) for k, v in data['top1']))
+        rollup.top3 = Counter(dict((k, v) for k, v in data['top3']))
+        rollup.match_rates = {k: Distribution.from_dict(d) for k, d in data['match_rates'].items()}
+        return rollup
+
+    def summary(self, catalog=None, histogram_bins=12):
+        """ダッシュボード向けの集計結果（JSON にできる dict）を返します。"""
+        def job_name(job_id):
+            job = catalog.get(job_id) if catalog is not None else None
+            return job.get('name') if job else None
+
+        def category_name(category):
+            return catalog.category_name(category) if catalog is not None else category
+
+        n = self.evaluations
+        return {
+            'evaluations': n,
+            'skills': {s: self.skills[s].summary() for s in SKILLS if s in self.skills},
+            'categories': {c: d.summary() for c, d in self.categories.items()},
+            'top3_jobs': [{'job_id': job_id, 'name': job_name(job_id), 'top3': count,
+                           'top3_share': round(count / n, 4) if n else None,
+                           'top1': self.top1.get(job_id, 0)}
+                          for job_id, count in self.top3.most_common()],
+            'match_rates_by_job_category': {category_name(c): d.summary(histogram_bins)
+                                            for c, d in sorted(self.match_rates.items(), key=lambda x: str(x[0]))},
+        }
+
+
+class CohortAnalytics:
+    """
+    評価ストアから日別ロールアップを作成・更新し、期間を指定して集計を返します。
+    ロールアップは評価ストアと同じ SQLite ファイルに保存します。
+    """
+
+    def __init__(self, store_path=DEFAULT_STORE_PATH, db_path=DEFAULT_DB_PATH,
+                 criteria_path=DEFAULT_CRITERIA_PATH):
+        self.store_path = store_path
+        self.db_path = db_path
+        self.criteria = load_criteria_categories(criteria_path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(store_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS cohort_rollups (
+                    day TEXT PRIMARY KEY,
+                    evaluations INTEGER NOT NULL,
+                    payload TEXT NOT NULL
+                )
+            """)
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS cohort_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+
+    def _catalog(self):
+        return get_job_catalog(self.db_path) if self.db_path and os.path.exists(self.db_path) else None
+
+    def last_id(self):
+        """ロールアップに反映済みの評価 id（評価ストアの id）。"""
+        with self._lock:
+            return self._read_last_id()
+
+    def _read_last_id(self):
+        # 呼び出し側で self._lock を保持していること
+        row = self._conn.execute("SELECT value FROM cohort_meta WHERE key = 'last_id'").fetchone()
+        return int(row[0]) if row else 0
+
+    def refresh(self, batch_size=1000):
+        """
+        前回以降に保存された評価だけを読み、日別ロールアップに足し込みます。
+
+        評価の読み込みは書き込みのロックの外で行い、保存時に反映位置（last_id）が
+        読み始めたときのままか確かめます（compare-and-set）。別のプロセスやインスタンスが
+        先に反映していた場合は、今回の部分集計を捨ててその位置から読み直すため、
+        同時に実行しても同じ評価を二重に数えません。
+
+        Returns:
+            int: 新たに反映した評価の件数
+        """
+        catalog = self._catalog()
+        job_categories = {job.get('id'): job.get('category') for job in catalog} if catalog else {}
+        while True:
+            after_id = self.last_id()
+            partials, last_id, added = self._scan(after_id, batch_size, job_categories)
+            if not added:
+                return 0
+            if self._save(partials, after_id, last_id):
+                return added
+
+    def _scan(self, after_id, batch_size, job_categories):
+        """after_id より後の評価を日別の部分集計にします。"""
+        partials, last_id, added = {}, after_id, 0
+        store = EvaluationStore(self.store_path)
+        try:
+            for eval_id, payload in store.iter_since(after_id, batch_size):
+                day = str(payload.get('timestamp', ''))[:10]
+                partial = partials.get(day)
+                if partial is None:
+                    partial = partials[day] = CohortRollup()
+                partial.add(payload, self.criteria, job_categories)
+                last_id, added = eval_id, added + 1
+        finally:
+            store.close()
+        return partials, last_id, added
+
+    def _save(self, partials, after_id, last_id):
+        """
+        既存の日別ロールアップと部分集計をマージし、反映位置と一緒に1トランザクションで保存します。
+        反映位置が after_id から変わっていた場合は何もせず False を返します。
+        """
+        with self._lock, self._conn:
+            # 読み取りの時点で書き込みロックを取り、他のプロセスの refresh と直列にする
+            self._conn.execute('BEGIN IMMEDIATE')
+            if self._read_last_id() != after_id:
+                return False
+            for day, partial in partials.items():
+                row = self._conn.execute(
+                    'SELECT payload FROM cohort_rollups WHERE day = ?', (day,)).fetchone()
+                if row:
+                    partial = CohortRollup.from_dict(json.loads(row[0])).merge(partial)
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO cohort_rollups (day, evaluations, payload) VALUES (?, ?, ?)',
+                    (day, partial.evaluations, json.dumps(partial.to_dict(), ensure_ascii=False)))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cohort_meta (key, value) VALUES ('last_id', ?)",
+                (str(last_id),))
+        return True
+
+    def rollup(self, start=None, end=None):
+        """start 以上 end 未満の日のロールアップをマージして返します。"""
+        clauses, params = [], []
+        if start is not None:
+            clauses.append('day >= ?')
+            params.append(to_timestamp(start)[:10])
+        if end is not None:
+            clauses.append('day < ?')
+            params.append(to_timestamp(end)[:10])
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        with self._lock:
+            rows = self._conn.execute(
+                f'SELECT payload FROM cohort_rollups {where} ORDER BY day', params).fetchall()
+        merged = CohortRollup()
+        for (payload,) in rows:
+            merged.merge(CohortRollup.from_dict(json.loads(payload)))
+        return merged
+
+    def daily(self, start=None, end=None):
+        """(日付, 件数) のリストを返します。"""
+        with self._lock:
+            rollup_days = self._conn.execute(
+                'SELECT day, evaluations FROM cohort_rollups ORDER BY day').fetchall()
+        lo = to_timestamp(start)[:10] if start is not None else None
+        hi = to_timestamp(end)[:10] if end is not None else None
+        return [(d, n) for d, n in rollup_days
+                if (lo is None or d >= lo) and (hi is None or d < hi)]
+
+    def summary(self, start=None, end=None, refresh=True):
+        """必要ならロールアップを更新してから、期間の集計結果を返します。"""
+        if refresh:
+            self.refresh()
+        return self.rollup(start, end).summary(self._catalog())
+
+    def rebuild(self):
+        """ロールアップを破棄し、全評価から作り直します（集計内容を変えたとき用）。"""
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM cohort_rollups')
+            self._conn.execute("DELETE FROM cohort_meta WHERE key = 'last_id'")
+        return self.refresh()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def format_summary(summary):
+    """集計結果をターミナル向けの文字列にします。"""
+    lines = [f"評価件数: {summary['evaluations']}", "", "■ カテゴリ別スコア（平均 / 標準偏差 / p10-p50-p90）"]
+    for name, s in summary['categories'].items():
+        lines.append(f"  {name:<12} {s['mean']:.2f} / {s['std']:.2f} / "
+                     f"{s['p10']:.2f}-{s['p50']:.2f}-{s['p90']:.2f}  (n={s['count']})")
+    lines += ["", "■ スキル別スコア"]
+    for name, s in summary['skills'].items():
+        lines.append(f"  {name:<14} {s['mean']:.2f} / {s['std']:.2f} / "
+                     f"{s['p10']:.2f}-{s['p50']:.2f}-{s['p90']:.2f}  (n={s['count']})")
+    lines += ["", "■ 上位3件に入った回数（上位10職種）"]
+    for job in summary['top3_jobs'][:10]:
+        lines.append(f"  {str(job['name'] or job['job_id']):<24} {job['top3']:>6}  "
+                     f"({job['top3_share']:.1%}, 1位 {job['top1']})")
+    lines += ["", "■ 職種カテゴリ別のマッチ率（平均 / p50 / p90）"]
+    for name, s in summary['match_rates_by_job_category'].items():
+        lines.append(f"  {name:<12} {s['mean']:.1f} / {s['p50']:.1f} / {s['p90']:.1f}  (n={s['count']})")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='保存済みの評価を集計します（日別ロールアップを更新）')
+    parser.add_argument('--store', default=DEFAULT_STORE_PATH, help='評価ストア（SQLite）のパス')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help='job_database.json のパス')
+    parser.add_argument('--start', help='この日以降の評価を集計する')
+    parser.add_argument('--end', help='この日より前の評価を集計する')
+    parser.add_argument('--rebuild', action='store_true', help='ロールアップを作り直す')
+    parser.add_argument('--json', action='store_true', help='JSON で出力する')
+    args = parser.parse_args(argv)
+
+    analytics = CohortAnalytics(args.store, args.db)
+    try:
+        added = analytics.rebuild() if args.rebuild else analytics.refresh()
+        summary = analytics.summary(args.start, args.end, refresh=False)
+    finally:
+        analytics.close()
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+    else:
+        print(f"（新たに {added} 件をロールアップに反映）")
+        print(format_summary(summary))
+
+
+if __name__ == '__main__':
+    main()
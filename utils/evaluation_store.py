@@ -0,0 +1,389 @@
+"""
+評価結果の保存先（SQLite / WAL モード）。
+
+1評価1ファイル（data/evaluations/eval_{name}_{timestamp}.json）の代わりに、
+日時・仮名化した候補者ID・最上位の職種にインデックスを張った1つのDBへ保存します。
+"""
+import glob
+import hashlib
+import hmac
+import json
+import os
+import re
+import secrets
+import sqlite3
+import tempfile
+import threading
+import unicodedata
+from datetime import date, datetime
+
+DEFAULT_STORE_PATH = os.getenv('EVALUATION_STORE_PATH', 'data/evaluations.sqlite3')
+
+# 候補者IDの仮名化に使う鍵。全ホスト・コンテナで同じ鍵を EVALUATION_ID_SECRET に設定してください
+# （鍵が違うと同じ人が別の候補者IDになり、latest / history で同一人物として扱えなくなります）。
+# 開発環境では代わりに EVALUATION_ID_SECRET_FILE に鍵ファイルのパスを指定でき、
+# ファイルがなければランダムな鍵を作って保存します。
+SECRET_ENV = 'EVALUATION_ID_SECRET'
+SECRET_FILE_ENV = 'EVALUATION_ID_SECRET_FILE'
+
+_LEGACY_TIMESTAMP = '%Y%m%d_%H%M%S'
+# 旧形式のファイル名（氏名に _ を含んでもよい）
+_LEGACY_FILENAME = re.compile(r'^eval_(?P<name>.*)_(?P<timestamp>\d{8}_\d{6})\.json$')
+
+_id_secret = None
+_id_secret_lock = threading.Lock()
+
+
+def _load_id_secret(path):
+    """鍵ファイルを読みます。なければランダムな鍵を作り、本人だけが読める権限で保存します。"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            secret = f.read().strip()
+        if secret:
+            return secret
+        raise RuntimeError(f"候補者IDの鍵ファイルが空です: {path}")
+    except FileNotFoundError:
+        pass
+    secret = secrets.token_hex(32)
+    directory = os.path.dirname(os.path.abspath(path))
+    try:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        # 書き終えた一時ファイルをリンクして作るため、他のプロセスが書きかけの鍵を読むことはない
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix='.evaluation_id_secret.')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(secret + '\n')
+            os.link(tmp, path)
+        finally:
+            os.unlink(tmp)
+    except FileExistsError:
+        # 別のプロセスが同時に作った場合は、そちらの鍵を使う
+        return _load_id_secret(path)
+    except OSError as e:
+        raise RuntimeError(f"候補者IDの鍵ファイルを作成できません（{path}: {e}）") from e
+    return secret
+
+
+def id_secret():
+    """
+    候補者IDの仮名化に使う鍵を返します。
+    EVALUATION_ID_SECRET も（開発用の）EVALUATION_ID_SECRET_FILE も設定されていなければ RuntimeError です。
+    """
+    global _id_secret
+    if _id_secret is None:
+        with _id_secret_lock:
+            if _id_secret is None:
+                secret = os.getenv(SECRET_ENV)
+                if not secret:
+                    path = os.getenv(SECRET_FILE_ENV)
+                    if not path:
+                        raise RuntimeError(
+                            f"{SECRET_ENV} が設定されていません。候補者IDはすべてのホストで同じ鍵から"
+                            f"作る必要があるため、共通の鍵を設定してください"
+                            f"（開発環境では {SECRET_FILE_ENV} に鍵ファイルのパスを指定できます）。")
+                    secret = _load_id_secret(path)
+                _id_secret = secret
+    return _id_secret
+
+
+def _hmac_hex(message):
+    return hmac.new(id_secret().encode('utf-8'), message, hashlib.sha256).hexdigest()[:32]
+
+
+def pseudonymous_id(name, *extra):
+    """
+    氏名など（と任意の補助情報）から、元に戻せない候補者IDを作ります。
+    表記ゆれ（全角/半角・空白）は正規化してから HMAC-SHA256 を取ります。
+    """
+    parts = [' '.join(unicodedata.normalize('NFKC', str(p)).split()).lower()
+             for p in (name,) + extra]
+    return _hmac_hex('\x1f'.join(parts).encode('utf-8'))
+
+
+def source_id(filename):
+    """
+    旧形式のファイル名（eval_{氏名}_{日時}.json）を、氏名を含まない source の値にします。
+    """
+    return 'file:' + _hmac_hex(b'source\x1f' + os.path.basename(filename).encode('utf-8'))
+
+
+def to_timestamp(value):
+    """datetime / date / 'YYYYmmdd_HHMMSS' / ISO 文字列を、並べ替え可能な ISO 文字列にします。"""
+    if value is None:
+        return datetime.now().isoformat(timespec='seconds')
+    if isinstance(value, datetime):
+        return value.isoformat(timespec='seconds')
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day).isoformat(timespec='seconds')
+    try:
+        return datetime.strptime(value, _LEGACY_TIMESTAMP).isoformat(timespec='seconds')
+    except ValueError:
+        return datetime.fromisoformat(value).isoformat(timespec='seconds')
+
+
+def compact_matches(job_matches, top_n=10):
+    """
+    job_matches（{'job': {...}, 'match_rate': ...} のリスト）を、
+    職種IDと名称だけの軽いレコードにします。
+    """
+    compact = []
+    for m in list(job_matches or [])[:top_n]:
+        job = m.get('job', {}) if isinstance(m, dict) else {}
+        if isinstance(job, dict) and job:
+            compact.append({'job_id': job.get('id'), 'name': job.get('name'),
+                            'match_rate': m.get('match_rate')})
+        elif isinstance(m, dict):
+            compact.append({'job_id': m.get('job_id'), 'name': m.get('name'),
+                            'match_rate': m.get('match_rate')})
+    return compact
+
+
+def _legacy_record(path):
+    """
+    旧形式のファイル（eval_{氏名}_{日時}.json）1件を、add_many に渡すレコードにします。
+    氏名・日時はファイルの値を優先し、なければファイル名の値を使います。
+
+    Raises:
+        OSError: ファイルを読めない
+        ValueError: JSON として読めない、または氏名・日時が分からない
+    """
+    match = _LEGACY_FILENAME.match(os.path.basename(path))
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError("not a JSON object")
+
+    candidate_id = data.get('candidate_id')
+    if not candidate_id:
+        name = data.get('name') or (match['name'] if match else '')
+        if not str(name).strip():
+            raise ValueError("no candidate name")
+        candidate_id = pseudonymous_id(name)
+
+    timestamp = None
+    for value in (data.get('timestamp'), match['timestamp'] if match else None):
+        if value:
+            try:
+                timestamp = to_timestamp(value)
+                break
+            except (TypeError, ValueError):
+                continue
+    if timestamp is None:
+        raise ValueError("no valid timestamp")
+
+    return {
+        'candidate_id': candidate_id,
+        'timestamp': timestamp,
+        'age': data.get('age'),
+        'gender': data.get('gender'),
+        'disability_type': data.get('disability_type'),
+        'scores': data.get('scores', {}),
+        'job_matches': data.get('job_matches', []),
+        'source': source_id(path),
+    }
+
+
+class EvaluationStore:
+    """評価結果の追記型ストア。書き込みはトランザクション単位でまとめて行います。"""
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS evaluations (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    candidate_id TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    top_job_id INTEGER,
+                    top_job_name TEXT,
+                    top_match_rate REAL,
+                    source TEXT UNIQUE,
+                    payload TEXT NOT NULL
+                )
+            """)
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_eval_created ON evaluations(created_at)')
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_eval_candidate ON evaluations(candidate_id, created_at)')
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_eval_top_job ON evaluations(top_job_id, created_at)')
+
+    @staticmethod
+    def _row(record):
+        matches = compact_matches(record.get('job_matches'))
+        top = matches[0] if matches else {}
+        payload = {
+            'candidate_id': record['candidate_id'],
+            'timestamp': to_timestamp(record.get('timestamp')),
+            'age': record.get('age'),
+            'gender': record.get('gender'),
+            'disability_type': record.get('disability_type'),
+            'scores': record.get('scores', {}),
+            'job_matches': matches,
+        }
+        return (payload['candidate_id'], payload['timestamp'], top.get('job_id'),
+                top.get('name'), top.get('match_rate'), record.get('source'),
+                json.dumps(payload, ensure_ascii=False))
+
+    def add(self, record):
+        """評価を1件保存します。"""
+        return self.add_many([record])
+
+    def add_many(self, records):
+        """
+        評価をまとめて1トランザクションで保存します。
+
+        record は candidate_id（pseudonymous_id の値）, timestamp, scores, job_matches と
+        任意の age / gender / disability_type / source を持つ dict です。
+        同じ source のレコードは一度しか保存されません。
+
+        Returns:
+            int: 新たに保存した件数
+        """
+        rows = [self._row(r) for r in records]
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO evaluations (candidate_id, created_at, top_job_id, '
+                'top_job_name, top_match_rate, source, payload) VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+            return self._conn.total_changes - before
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [json.loads(row['payload']) for row in rows]
+
+    def latest(self, candidate_id):
+        """候補者の最新の評価を返します（なければ None）。"""
+        rows = self._query(
+            'SELECT payload FROM evaluations WHERE candidate_id = ? '
+            'ORDER BY created_at DESC, id DESC LIMIT 1', (candidate_id,))
+        return rows[0] if rows else None
+
+    def history(self, candidate_id):
+        """候補者の評価を古い順にすべて返します。"""
+        return self._query(
+            'SELECT payload FROM evaluations WHERE candidate_id = ? ORDER BY created_at, id',
+            (candidate_id,))
+
+    def latest_per_candidate(self):
+        """候補者ごとの最新の評価を返します。"""
+        return self._query("""
+            SELECT payload FROM evaluations WHERE id IN (
+                SELECT (SELECT e.id FROM evaluations e
+                        WHERE e.candidate_id = c.candidate_id
+                        ORDER BY e.created_at DESC, e.id DESC LIMIT 1)
+                FROM (SELECT DISTINCT candidate_id FROM evaluations) c
+            ) ORDER BY candidate_id
+        """)
+
+    def in_range(self, start=None, end=None):
+        """start 以上 end 未満の日時の評価を古い順に返します。"""
+        clauses, params = [], []
+        if start is not None:
+            clauses.append('created_at >= ?')
+            params.append(to_timestamp(start))
+        if end is not None:
+            clauses.append('created_at < ?')
+            params.append(to_timestamp(end))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        return self._query(
+            f'SELECT payload FROM evaluations {where} ORDER BY created_at, id', params)
+
+    def top_match_is(self, job_id, latest_only=True):
+        """
+        最上位のマッチが job_id の評価を返します。
+        latest_only=True なら候補者ごとの最新の評価だけを対象にします。
+        """
+        if not latest_only:
+            return self._query(
+                'SELECT payload FROM evaluations WHERE top_job_id = ? ORDER BY created_at, id',
+                (job_id,))
+        return self._query("""
+            SELECT payload FROM evaluations e WHERE e.top_job_id = ? AND e.id = (
+                SELECT l.id FROM evaluations l WHERE l.candidate_id = e.candidate_id
+                ORDER BY l.created_at DESC, l.id DESC LIMIT 1
+            ) ORDER BY e.created_at, e.id
+        """, (job_id,))
+
+    def iter_since(self, after_id=0, batch_size=1000):
+        """
+        id が after_id より大きい評価を、id の昇順に (id, payload) で1件ずつ返します。
+        batch_size 件ずつ読み出すため、全件をメモリに載せずに走査できます。
+        """
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    'SELECT id, payload FROM evaluations WHERE id > ? ORDER BY id LIMIT ?',
+                    (after_id, batch_size)).fetchall()
+            for row in rows:
+                yield row['id'], json.loads(row['payload'])
+            if len(rows) < batch_size:
+                return
+            after_id = rows[-1]['id']
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM evaluations').fetchone()[0]
+
+    def migrate_from_directory(self, directory='data/evaluations', batch_size=500):
+        """
+        旧形式（eval_*.json を1評価1ファイルで保存）からデータを取り込みます。
+        ファイル名は氏名を含むため、その HMAC（source_id）を source として記録します。
+        何度実行しても重複しません。
+        氏名・日時がファイルの中にない場合はファイル名の値を使い、
+        読めないファイル・氏名や日時の分からないファイルは取り込まずに飛ばします。
+
+        Returns:
+            dict: imported（取り込んだ件数）と skipped（飛ばしたファイルのパスのリスト）
+        """
+        imported, batch, skipped = 0, [], []
+        for path in sorted(glob.glob(os.path.join(directory, 'eval_*.json'))):
+            try:
+                batch.append(_legacy_record(path))
+            except (OSError, ValueError):
+                skipped.append(path)
+                continue
+            if len(batch) >= batch_size:
+                imported += self.add_many(batch)
+                batch = []
+        if batch:
+            imported += self.add_many(batch)
+        return {'imported': imported, 'skipped': skipped}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_evaluation_store():
+    """プロセス内で共有する既定のストアを返します。"""
+    global _default_store
+    if _default_store is None:
+        with _default_store_lock:
+            if _default_store is None:
+                _default_store = EvaluationStore()
+    return _default_store
+
+
+if __name__ == '__main__':
+    # 旧形式からの一括移行: python -m utils.evaluation_store [data/evaluations] [DBパス]
+    import sys
+    source_dir = sys.argv[1] if len(sys.argv) > 1 else 'data/evaluations'
+    store = EvaluationStore(sys.argv[2]) if len(sys.argv) > 2 else get_evaluation_store()
+    result = store.migrate_from_directory(source_dir)
+    for path in result['skipped']:
+        print(f"skipped unreadable file: {path}", file=sys.stderr)
+    print(f"imported {result['imported']} evaluations into {store.path} "
+          f"(skipped {len(result['skipped'])}, total {store.count()})")
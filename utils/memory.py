@@ -0,0 +1,84 @@
+"""
+セッションごとのメモリ使用量を見積もるためのヘルパー。
+
+sys.getsizeof をコンテナ・__slots__・__dict__ をたどって合計します。
+プロセス全体で共有しているオブジェクト（JobCatalog など）は shared に渡すと
+その先を含めて数えないため、「セッションが増えるごとに増える量」を求められます。
+"""
+import sys
+import types
+from array import array
+
+# 関数・クラス・モジュールはセッション固有のデータではないので数えない
+_SKIP_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+               types.MethodType)
+
+
+def _children(obj):
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            yield key
+            yield value
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        yield from obj
+    elif isinstance(obj, (str, bytes, bytearray, int, float, complex, bool, array)):
+        # 中身は getsizeof に含まれる
+        return
+    else:
+        for cls in type(obj).__mro__:
+            for slot in getattr(cls, '__slots__', ()):
+                if hasattr(obj, slot):
+                    yield getattr(obj, slot)
+        if hasattr(obj, '__dict__'):
+            yield obj.__dict__
+
+
+def collect_ids(*roots):
+    """roots とそこから参照されるオブジェクトの id の集合を返します（shared に渡す用）。"""
+    seen = set()
+    stack = list(roots)
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, _SKIP_TYPES):
+            continue
+        seen.add(id(obj))
+        stack.extend(_children(obj))
+    return seen
+
+
+def deep_sizeof(obj, shared=frozenset(), seen=None):
+    """
+    obj から参照されるオブジェクトの合計バイト数を返します。
+
+    Args:
+        shared (set): 数えないオブジェクトの id（collect_ids の結果）
+        seen (set): 既に数えたオブジェクトの id（複数の値で共有すると重複を除ける）
+    """
+    seen = set() if seen is None else seen
+    total = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        key = id(item)
+        if key in seen or key in shared or isinstance(item, _SKIP_TYPES):
+            continue
+        seen.add(key)
+        total += sys.getsizeof(item)
+        stack.extend(_children(item))
+    return total
+
+
+def session_memory(state, shared_roots=()):
+    """
+    セッション状態（st.session_state や dict）のキーごとの使用量を返します。
+    同じオブジェクトを複数のキーが参照している場合は、先に数えたキーにだけ計上します。
+
+    Returns:
+        dict: {'keys': {キー: バイト数}, 'total': 合計バイト数}
+    """
+    shared = collect_ids(*shared_roots)
+    seen = set()
+    sizes = {}
+    for key in sorted(state.keys(), key=str):
+        sizes[key] = deep_sizeof(state[key], shared, seen)
+    return {'keys': sizes, 'total': sum(sizes.values())}
@@ -0,0 +1,222 @@
+"""
+保存済みの評価から、候補者ごとの印刷用レポート（単体で開ける HTML）を一括で作成します。
+
+    python -m utils.report_export -o reports/                 # 候補者ごとの最新の評価
+    python -m utils.report_export -o reports/ --all --start 2026-04-01 --workers 8
+
+結果画面と同じ内容（称号・レーダーチャート・3つの強み・上位10職種・アドバイス）を、
+インライン SVG と埋め込み CSS だけで描画します（外部のフォント・スクリプトは読み込みません）。
+描画はプロセスプールで行い、評価を chunk_size 件ずつのまとまりにして各プロセスへ配ります。
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from html import escape
+
+from evaluator.feedback import (
+    RADAR_CATEGORIES, STRENGTH_MESSAGES, get_strength_feedback, radar_values, to_display_scores,
+)
+from evaluator.job_catalog import DEFAULT_DB_PATH, JobCatalog
+from svg_charts import bar_chart_svg, radar_chart_svg
+from utils.evaluation_store import DEFAULT_STORE_PATH, EvaluationStore
+
+STYLE = """
+body { font-family: sans-serif; color: #333; max-width: 960px; margin: 24px auto; padding: 0 16px; }
+.banner { background-color: #FFF9E6; padding: 30px; border-radius: 15px; border: 3px solid #FFD700; text-align: center; }
+.banner h2 { color: #B8860B; margin: 0; }
+.banner h1 { font-size: 2.4em; margin: 15px 0; }
+.banner p { font-size: 1.1em; color: #666; }
+.columns { display: flex; gap: 24px; margin-top: 24px; }
+.columns > div { flex: 1; }
+.strength { background: #E8F1FB; border-radius: 8px; padding: 12px 16px; margin-bottom: 10px; }
+.advice { background: #E9F7EF; border-radius: 8px; padding: 16px; margin-top: 16px; }
+.meta { color: #888; font-size: 0.9em; }
+@media print { .columns { break-inside: avoid; } body { margin: 0 auto; } }
+"""
+
+_UNSAFE_FILENAME = re.compile(r'[^0-9A-Za-z_-]+')
+
+# ワーカープロセスごとに1回だけ読み込む職種カタログ
+_catalog = None
+
+
+def report_filename(evaluation):
+    """評価ごとのファイル名（候補者ID_日時.html）を返します。"""
+    stem = f"{evaluation.get('candidate_id', 'unknown')}_{evaluation.get('timestamp', '')}"
+    return _UNSAFE_FILENAME.sub('', stem.replace(':', '').replace('T', '_')) + '.html'
+
+
+def report_filenames(evaluations):
+    """
+    評価のリストに対するファイル名のリストを返します。
+    同じ候補者の同じ秒の評価（--all で起こりうる）は、2件目以降に _2, _3 ... を付けて区別します。
+    """
+    names, used = [], set()
+    for evaluation in evaluations:
+        name = report_filename(evaluation)
+        stem, n = name[:-len('.html')], 1
+        while name in used:
+            n += 1
+            name = f"{stem}_{n}.html"
+        used.add(name)
+        names.append(name)
+    return names
+
+
+def render_report(evaluation, catalog=None):
+    """
+    1件の評価（EvaluationStore の payload）からレポートの HTML を作ります。
+    職種のサポート内容は catalog から job_id で引きます（削除済みの職種なら省略）。
+    """
+    scores = to_display_scores(evaluation.get('scores') or {})
+    matches = evaluation.get('job_matches') or []
+    main_title, top_3 = get_strength_feedback(scores)
+    label = evaluation.get('label') or f"候補者 {str(evaluation.get('candidate_id', ''))[:8]}"
+
+    parts = [
+        "<!DOCTYPE html><html lang='ja'><head><meta charset='utf-8'>",
+        f"<title>{escape(label)} - O-lys 評価レポート</title><style>{STYLE}</style></head><body>",
+        "<div class='banner'>",
+        f"<h2>AIが見つけた {escape(label)} さんの可能性</h2>",
+        f"<h1>✨ {escape(main_title)} ✨</h1>",
+        "<p>この診断は、あなたの新しい一歩を応援するためのものです。</p></div>",
+        f"<p class='meta'>評価日時: {escape(str(evaluation.get('timestamp', '')))}</p>",
+        "<div class='columns'><div><h3>📊 強みチャート</h3>",
+        radar_chart_svg(RADAR_CATEGORIES, radar_values(scores)),
+        "</div><div><h3>💡 引き出された3つの強み</h3>",
+    ]
+    for i, (strength, message) in enumerate(zip(top_3, STRENGTH_MESSAGES)):
+        parts.append(f"<div class='strength'><b>{i + 1}. {escape(str(strength))}</b><br>"
+                     f"{escape(message)}</div>")
+    parts.append("</div></div>")
+
+    if matches:
+        top = matches[:10]
+        parts.append(f"<h3>🎯 力を発揮しやすいお仕事（上位{len(top)}職種）</h3>")
+        parts.append(bar_chart_svg(tuple(str(m.get('name')) for m in top),
+                                   tuple(float(m.get('match_rate') or 0) for m in top)))
+        best = matches[0]
+        job = catalog.get(best.get('job_id')) if catalog is not None else None
+        support = f"{escape(job['support'])}などのサポートを受けながら、" \
+            if job and job.get('support') else ""
+        parts.append(
+            f"<div class='advice'><b>{escape(label)}さんへのアドバイス</b><br><br>"
+            f"最も適性が高いのは <b>{escape(str(best.get('name')))}</b> です。<br>"
+            f"{support}あなたの「{escape(str(top_3[0]))}」を存分に活かしてください。</div>")
+
+    parts.append("</body></html>")
+    return ''.join(parts)
+
+
+def _init_worker(db_path):
+    global _catalog
+    _catalog = JobCatalog.load(db_path) if db_path and os.path.exists(db_path) else None
+
+
+def _render_chunk(args):
+    """ワーカーで1まとまり分を描画してファイルに書き出し、(件数, バイト数) を返します。"""
+    evaluations, filenames, out_dir = args
+    written = 0
+    for evaluation, filename in zip(evaluations, filenames):
+        html = render_report(evaluation, _catalog).encode('utf-8')
+        with open(os.path.join(out_dir, filename), 'wb') as f:
+            f.write(html)
+        written += len(html)
+    return len(evaluations), written
+
+
+def write_index(evaluations, out_dir, filenames=None):
+    """レポートの一覧ページ（index.html）を書き出します。filenames は report_filenames の戻り値です。"""
+    filenames = filenames or report_filenames(evaluations)
+    rows = []
+    for e, filename in zip(evaluations, filenames):
+        top = (e.get('job_matches') or [{}])[0]
+        rows.append(f"<tr><td><a href='{escape(filename)}'>"
+                    f"{escape(str(e.get('candidate_id', ''))[:8])}</a></td>"
+                    f"<td>{escape(str(e.get('timestamp', '')))}</td>"
+                    f"<td>{escape(str(top.get('name', '')))}</td>"
+                    f"<td>{escape(str(top.get('match_rate', '')))}</td></tr>")
+    html = ("<!DOCTYPE html><html lang='ja'><head><meta charset='utf-8'>"
+            f"<title>O-lys 評価レポート一覧</title><style>{STYLE}"
+            "table { border-collapse: collapse; width: 100%; } td, th { border-bottom: 1px solid #ddd; padding: 6px; }"
+            "</style></head><body><h1>O-lys 評価レポート一覧</h1>"
+            "<table><tr><th>候補者</th><th>評価日時</th><th>最も適性が高い職種</th><th>適合度</th></tr>"
+            + ''.join(rows) + "</table></body></html>")
+    with open(os.path.join(out_dir, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write(html)
+
+
+def export_reports(evaluations, out_dir, db_path=DEFAULT_DB_PATH, workers=None, chunk_size=64,
+                   progress_interval=5.0, stream=sys.stderr):
+    """
+    評価のリストをレポートとして書き出します。workers=1 ならプロセスを使わずに描画します。
+
+    Returns:
+        dict: 件数・バイト数・経過秒数・reports/s
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    # ファイル名はワーカーに配る前にまとめて決める（チャンクをまたいだ重複も区別するため）
+    filenames = report_filenames(evaluations)
+    chunks = [(evaluations[i:i + chunk_size], filenames[i:i + chunk_size], out_dir)
+              for i in range(0, len(evaluations), chunk_size)]
+    started = last_report = time.monotonic()
+    count = total_bytes = 0
+
+    def progress(done, written):
+        nonlocal count, total_bytes, last_report
+        count += done
+        total_bytes += written
+        now = time.monotonic()
+        if stream is not None and now - last_report >= progress_interval:
+            last_report = now
+            print(f"[report] {count}/{len(evaluations)} reports, "
+                  f"{count / max(now - started, 1e-9):.1f} reports/s", file=stream, flush=True)
+
+    if workers == 1:
+        _init_worker(db_path)
+        for chunk in chunks:
+            progress(*_render_chunk(chunk))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(db_path,)) as pool:
+            for done, written in pool.map(_render_chunk, chunks):
+                progress(done, written)
+
+    write_index(evaluations, out_dir, filenames)
+    elapsed = time.monotonic() - started
+    return {'reports': count, 'bytes': total_bytes, 'seconds': round(elapsed, 3),
+            'reports_per_second': round(count / elapsed, 1) if elapsed > 0 else None}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='保存済みの評価から印刷用の HTML レポートを作成します')
+    parser.add_argument('-o', '--output', required=True, help='出力ディレクトリ')
+    parser.add_argument('--store', default=DEFAULT_STORE_PATH, help='評価ストア（SQLite）のパス')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help='job_database.json のパス')
+    parser.add_argument('--all', action='store_true', help='候補者ごとの最新だけでなく全評価を出力する')
+    parser.add_argument('--start', help='この日時以降の評価だけを出力する（--all と併用）')
+    parser.add_argument('--end', help='この日時より前の評価だけを出力する（--all と併用）')
+    parser.add_argument('--workers', type=int, default=None, help='プロセス数（既定: CPU数）')
+    parser.add_argument('--chunk-size', type=int, default=64, help='1回の受け渡しで描画する件数')
+    args = parser.parse_args(argv)
+
+    store = EvaluationStore(args.store)
+    try:
+        if args.all or args.start or args.end:
+            evaluations = store.in_range(args.start, args.end)
+        else:
+            evaluations = store.latest_per_candidate()
+    finally:
+        store.close()
+
+    summary = export_reports(evaluations, args.output, db_path=args.db, workers=args.workers,
+                             chunk_size=args.chunk_size)
+    print(f"wrote {summary['reports']} reports ({summary['bytes'] / 1e6:.1f} MB) to {args.output} "
+          f"in {summary['seconds']:.1f}s ({summary['reports_per_second']} reports/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,22 @@
-import json
-import os
 from datetime import datetime
 
+from utils.evaluation_store import get_evaluation_store, pseudonymous_id
+
 def save_evaluation(name, age, gender, disability_type, scores, job_matches):
-    os.makedirs('data/evaluations', exist_ok=True)
-    
+    # 1評価1ファイルではなく、インデックス付きの評価ストアへ保存する
+    # 氏名はそのまま保存せず、仮名化した候補者IDに置き換える
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = f"data/evaluations/eval_{name}_{timestamp}.json"
+    candidate_id = pseudonymous_id(name)
     
     data = {
+        'candidate_id': candidate_id,
         'timestamp': timestamp,
-        'name': name,
         'age': age,
         'gender': gender,
+        'disability_type': disability_type,
+        'scores': scores,
+        'job_matches': job_matches
+    }
+    
+    get_evaluation_store().add(data)
+    return candidate_id
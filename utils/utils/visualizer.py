@@ -1,14 +1,26 @@
-import plotly.graph_objects as go
+from functools import lru_cache
 
-def create_radar_chart(scores, title="スキル評価レーダーチャート"):
-    categories = list(scores.keys())
-    values = list(scores.values())
+from svg_charts import bar_chart_svg, radar_chart_svg
+
+FIGURE_CACHE_SIZE = 64
+
+def create_radar_chart(scores, title="スキル評価レーダーチャート", render="plotly"):
+    categories = tuple(scores.keys())
+    values = tuple(float(v) for v in scores.values())
+    
+    if render == "svg":
+        return radar_chart_svg(categories, values, title=title)
+    return _radar_figure(categories, values, title)
+
+@lru_cache(maxsize=FIGURE_CACHE_SIZE)
+def _radar_figure(categories, values, title):
+    import plotly.graph_objects as go
     
     fig = go.Figure()
     
     fig.add_trace(go.Scatterpolar(
-        r=values,
-        theta=categories,
+        r=list(values),
+        theta=list(categories),
         fill='toself',
         name='評価スコア'
     ))
@@ -26,20 +38,28 @@ def create_radar_chart(scores, title="スキル評価レーダーチャート"):
     
     return fig
 
-def create_job_match_chart(matches, top_n=10):
+def create_job_match_chart(matches, top_n=10, render="plotly"):
     top_matches = matches[:top_n]
     
-    job_names = [m['job']['name'] for m in top_matches]
-    match_rates = [m['match_rate'] for m in top_matches]
+    job_names = tuple(m['job']['name'] for m in top_matches)
+    match_rates = tuple(m['match_rate'] for m in top_matches)
+    
+    if render == "svg":
+        return bar_chart_svg(job_names, match_rates, title=f"職務マッチング率 Top {top_n}")
+    return _job_match_figure(job_names, match_rates, top_n)
+
+@lru_cache(maxsize=FIGURE_CACHE_SIZE)
+def _job_match_figure(job_names, match_rates, top_n):
+    import plotly.graph_objects as go
     
     fig = go.Figure()
     
     fig.add_trace(go.Bar(
-        y=job_names,
-        x=match_rates,
+        y=list(job_names),
+        x=list(match_rates),
         orientation='h',
         marker=dict(
-            color=match_rates,
+            color=list(match_rates),
             colorscale='Viridis'
         )
     ))
@@ -1,24 +1,40 @@
-import plotly.graph_objects as go
+from functools import lru_cache
 
-def create_radar_chart(scores, title="スキル評価レーダーチャート"):
+from svg_charts import bar_chart_svg, radar_chart_svg
+
+# 図のキャッシュ件数（Streamlit の再実行ごとに同じ図を作り直さないため）
+# plotly は起動時間を抑えるため、図を作る時点で読み込みます
+FIGURE_CACHE_SIZE = 64
+
+def create_radar_chart(scores, title="スキル評価レーダーチャート", render="plotly"):
     """
     スキル評価のレーダーチャートを作成
     
     Args:
         scores (dict): スキル名とスコアの辞書
         title (str): チャートのタイトル
+        render (str): "plotly"（Figure）または "svg"（静的なSVG文字列）
     
     Returns:
-        plotly.graph_objects.Figure: レーダーチャート
+        plotly.graph_objects.Figure or str: レーダーチャート
+        （Figure はキャッシュで共有されるため、変更しないでください）
     """
-    categories = list(scores.keys())
-    values = list(scores.values())
+    categories = tuple(scores.keys())
+    values = tuple(float(v) for v in scores.values())
+    
+    if render == "svg":
+        return radar_chart_svg(categories, values, title=title)
+    return _radar_figure(categories, values, title)
+
+@lru_cache(maxsize=FIGURE_CACHE_SIZE)
+def _radar_figure(categories, values, title):
+    import plotly.graph_objects as go
     
     fig = go.Figure()
     
     fig.add_trace(go.Scatterpolar(
-        r=values,
-        theta=categories,
+        r=list(values),
+        theta=list(categories),
         fill='toself',
         name='評価スコア'
     ))
@@ -36,30 +52,40 @@ def create_radar_chart(scores, title="スキル評価レーダーチャート"):
     
     return fig
 
-def create_job_match_chart(matches, top_n=10):
+def create_job_match_chart(matches, top_n=10, render="plotly"):
     """
     職務マッチング率の横棒グラフを作成
     
     Args:
         matches (list): 職務マッチング情報のリスト
         top_n (int): 表示する上位職種の数
+        render (str): "plotly"（Figure）または "svg"（静的なSVG文字列）
     
     Returns:
-        plotly.graph_objects.Figure: 横棒グラフ
+        plotly.graph_objects.Figure or str: 横棒グラフ
+        （Figure はキャッシュで共有されるため、変更しないでください）
     """
     top_matches = matches[:top_n]
     
-    job_names = [m['job']['name'] for m in top_matches]
-    match_rates = [m['match_rate'] for m in top_matches]
+    job_names = tuple(m['job']['name'] for m in top_matches)
+    match_rates = tuple(m['match_rate'] for m in top_matches)
+    
+    if render == "svg":
+        return bar_chart_svg(job_names, match_rates, title=f"職務マッチング率 Top {top_n}")
+    return _job_match_figure(job_names, match_rates, top_n)
+
+@lru_cache(maxsize=FIGURE_CACHE_SIZE)
+def _job_match_figure(job_names, match_rates, top_n):
+    import plotly.graph_objects as go
     
     fig = go.Figure()
     
     fig.add_trace(go.Bar(
-        y=job_names,
-        x=match_rates,
+        y=list(job_names),
+        x=list(match_rates),
         orientation='h',
         marker=dict(
-            color=match_rates,
+            color=list(match_rates),
             colorscale='Viridis'
         )
     ))